@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga y guardado de user_times.json con los distintos codecs.
+
+Uso: python benchmarks/bench_codecs.py [cantidad_usuarios ...]
+(por defecto 10000 y 100000 usuarios sintéticos)
+
+`json-pretty` es el formato anterior (indent=2); el resto son las opciones de `codec`.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_codec
+from records import UserRecord, Initiator, Link, Session
+from storage import JsonStorage
+
+
+def make_users(count: int) -> dict:
+    """Generar usuarios sintéticos con una forma parecida a los reales"""
+    rng = random.Random(42)
+    base = time.time() - 30 * 86400
+    users = {}
+    for i in range(count):
+        sessions = []
+        start = base + rng.uniform(0, 86400)
+        for _ in range(rng.randint(0, 6)):
+            duration = rng.uniform(600, 7200)
+            sessions.append(Session(start, start + duration, duration))
+            start += duration + rng.uniform(3600, 86400)
+        is_active = rng.random() < 0.2
+        users[str(10**17 + i)] = UserRecord(
+            name=f"Usuario {i}",
+            total_time=sum(session.duration for session in sessions),
+            sessions=sessions,
+            is_active=is_active,
+            pause_count=rng.randint(0, 3),
+            highest_notified_hour=rng.randint(0, 3),
+            last_start=start if is_active else None,
+            time_initiator=Initiator(rng.randint(1, 50), f"Admin {rng.randint(1, 50)}", base),
+            linked_to=Link(rng.randint(1, 50), "Admin", base) if rng.random() < 0.3 else None
+        )
+    return users
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int) -> None:
+    users = make_users(count)
+    variants = [(codec, False) for codec in ['json-pretty', 'json', 'orjson', 'msgpack']]
+    variants += [('json', True), ('orjson', True)]
+
+    print(f"\n{count} usuarios")
+    print(f"{'codec':<20}{'guardar (s)':>14}{'cargar (s)':>14}{'tamaño (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec, compress in variants:
+            if codec not in data_codec.available_codecs():
+                print(f"{codec:<20}{'(no instalado)':>14}")
+                continue
+            path = os.path.join(tmp, f"users_{codec}_{compress}")
+            storage = JsonStorage(data_file=path, codec=codec, compress=compress)
+            save_time = best_of(lambda: storage.save_users(users))
+            load_time = best_of(lambda: storage.load_users())
+            size = os.path.getsize(path) / (1024 * 1024)
+            label = codec + (" + gzip" if compress else "")
+            print(f"{label:<20}{save_time:>14.3f}{load_time:>14.3f}{size:>14.1f}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        run(count)
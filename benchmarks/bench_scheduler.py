@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los temporizadores: min-heap (DeadlineScheduler) contra rueda de tiempo
+jerárquica (TimingWheelScheduler).
+
+Uso: python benchmarks/bench_scheduler.py [cantidad_temporizadores]
+(por defecto 100000)
+
+Simula sesiones con vencimientos a 1, 2 y 4 horas, reprogramaciones como las de
+/pausar_tiempo y /despausar_tiempo, cancelaciones y el vencimiento de todo con un reloj
+simulado que avanza de a 1 segundo.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scheduler import DeadlineScheduler, TimingWheelScheduler
+
+
+async def noop():
+    pass
+
+
+def run(scheduler_class, count: int) -> dict:
+    rng = random.Random(7)
+    now = [1_700_000_000.0]
+    scheduler = scheduler_class(clock=lambda: now[0])
+    results = {}
+
+    start = time.perf_counter()
+    for i in range(count):
+        hours = rng.choice((1, 2, 4))
+        scheduler.schedule(("milestone", i), now[0] + hours * 3600 - rng.uniform(0, 3600), noop)
+    results['programar'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        i = rng.randrange(count)
+        scheduler.schedule(("milestone", i), now[0] + rng.uniform(60, 4 * 3600), noop)
+    results['reprogramar'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, count, 2):
+        scheduler.cancel(("milestone", i))
+    results['cancelar'] = time.perf_counter() - start
+
+    remaining = len(scheduler)
+    start = time.perf_counter()
+    fired = 0
+    end = now[0] + 5 * 3600
+    while now[0] < end:
+        now[0] += 1.0
+        fired += len(scheduler.pop_due(now[0]))
+    results['vencer'] = time.perf_counter() - start
+    assert fired == remaining, (fired, remaining)
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{count} temporizadores (tiempos en segundos)")
+    print(f"{'':<24}{'programar':>12}{'reprogramar':>13}{'cancelar':>11}{'vencer':>10}")
+    for scheduler_class in (DeadlineScheduler, TimingWheelScheduler):
+        results = run(scheduler_class, count)
+        print(f"{scheduler_class.__name__:<24}{results['programar']:>12.3f}{results['reprogramar']:>13.3f}"
+              f"{results['cancelar']:>11.3f}{results['vencer']:>10.3f}")
@@ -46,9 +46,22 @@ import json
 import os
 from datetime import datetime, timedelta
 import asyncio
+import atexit
+import signal
+import time
 import pytz
 
 from time_tracker import TimeTracker
+from records import UserRecord
+from scheduler import TimingWheelScheduler
+from daily_schedule import DailySchedule, next_week_start
+from worker_pool import AdaptiveWorkerPool
+from supervisor import TaskSupervisor
+from notifications import NotificationOutbox, OutboxJournal
+from rate_limiter import PRIORITY_DIAGNOSTICS, RateLimiter
+from channel_registry import ChannelRegistry
+from live_board import LiveBoard
+from storage import JsonStorage, SQLiteStorage
 
 # Configuración del bot
 intents = discord.Intents.default()
@@ -57,8 +70,29 @@ intents.guilds = True
 intents.members = True  # Necesario para acceder a información de miembros y roles
 intents.message_content = True  # Para evitar warnings
 
-bot = commands.Bot(command_prefix='!', intents=intents)
-time_tracker = TimeTracker()
+class TimeTrackerBot(commands.Bot):
+    """Bot que guarda los cambios pendientes al cerrarse, también cuando el host lo detiene"""
+
+    async def setup_hook(self) -> None:
+        # Los hosts detienen el proceso con SIGTERM: cerrarlo igual que con Ctrl+C
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, self._close_from_signal)
+        except (NotImplementedError, RuntimeError):
+            # Windows no tiene add_signal_handler
+            signal.signal(signal.SIGTERM, lambda signum, frame: loop.call_soon_threadsafe(self._close_from_signal))
+
+    def _close_from_signal(self) -> None:
+        print("🛑 SIGTERM recibido, cerrando el bot...")
+        self._close_task = asyncio.ensure_future(self.close())
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            shutdown_persistence()
+
+bot = TimeTrackerBot(command_prefix='!', intents=intents)
 
 
 # Rol especial para tiempo ilimitado (se carga desde config.json)
@@ -104,16 +138,83 @@ except Exception as e:
     CANCELLATION_NOTIFICATION_CHANNEL_ID = 1385005232685318284
     ATTENDANCE_NOTIFICATION_CHANNEL_ID = 1390478447901675660
 
-# Task para verificar milestones periódicamente
-milestone_check_task = None
-
-# Sistema de pre-registro con horario Colombia
+# Inicializar el tracker con la configuración de persistencia
+time_tracking_config = config.get('time_tracking', {})
+journal_file = None
+if time_tracking_config.get('journal_mode', False):
+    journal_file = time_tracking_config.get('journal_file', 'user_times.journal')
+json_storage = JsonStorage(
+    journal_file=journal_file,
+    checkpoint_every=time_tracking_config.get('journal_checkpoint_entries', 500),
+    codec=time_tracking_config.get('codec', 'json'),
+    compress=time_tracking_config.get('compress_snapshots', False)
+)
+if time_tracking_config.get('storage_backend', 'json') == 'sqlite':
+    # Al crear la base de datos por primera vez se importan los archivos JSON existentes
+    storage_backend = SQLiteStorage(time_tracking_config.get('sqlite_file', 'time_tracker.db'), migrate_from=json_storage)
+    print(f"✅ Almacenamiento SQLite activo ({storage_backend.db_file})")
+else:
+    storage_backend = json_storage
+    if json_storage.journal_file:
+        print(f"✅ Modo journal activo ({json_storage.journal_file})")
+
+# Write-behind: los cambios se escriben como máximo una vez por save_interval_minutes,
+# o antes si se acumulan max_pending_changes cambios o superan max_pending_age_seconds
+save_interval_seconds = time_tracking_config.get('save_interval_minutes', 0) * 60
+# Hora de Colombia para pre-registros y para los días y semanas de asistencias
 colombia_tz = pytz.timezone('America/Bogota')
-daily_preregistration_task = None
 
-# Configuración de hora de inicio automático (puedes cambiar estos valores)
-AUTO_START_HOUR = 20      # Hora en formato 24h (17 = 5 PM)
-AUTO_START_MINUTE = 16    # Minuto (0-59)
+time_tracker = TimeTracker(
+    storage=storage_backend,
+    save_interval=save_interval_seconds,
+    max_pending_changes=time_tracking_config.get('max_pending_changes', 500),
+    max_pending_age=time_tracking_config.get('max_pending_age_seconds'),
+    background_writes=time_tracking_config.get('background_writes', True),
+    timezone=colombia_tz
+)
+if save_interval_seconds > 0:
+    print(f"✅ Guardado diferido activo: cada {time_tracking_config.get('save_interval_minutes')} minuto(s)")
+
+# Límite absoluto de horas por usuario; los límites por rol nunca lo superan
+MAX_TIME_HOURS = time_tracking_config.get('max_time_hours', 168)
+
+# Trabajos en segundo plano (temporizadores, milestones perdidos, guardado diferido):
+# el supervisor los reinicia si fallan o se bloquean
+task_supervisor = TaskSupervisor()
+MISSING_MILESTONES_CHECK_SECONDS = 60
+
+# Temporizadores por fecha exacta compartidos por los subsistemas del bot (claves como
+# ("milestone", user_id)); reemplazan el sondeo cada 5 segundos
+timer_scheduler = TimingWheelScheduler()
+
+# Pool de concurrencia acotada para procesar milestones. Desde que las notificaciones
+# van al outbox, sus tareas ya no esperan a Discord: el pool solo acota el trabajo local
+# (asistencias, marcas y guardado) y se adapta a su duración. La latencia de Discord la
+# absorben el outbox y el limitador de envíos
+milestone_pool = AdaptiveWorkerPool(min_concurrency=2, max_concurrency=20, target_latency=2.0, task_timeout=15.0)
+SESSION_MILESTONE_SECONDS = 3600
+MILESTONE_RETRY_SECONDS = 60
+# Recuperación al iniciar: milestones que vencieron con el bot apagado. Hasta que
+# termina no se disparan temporizadores ni la revisión periódica
+startup_catch_up_done = asyncio.Event()
+startup_catch_up_report = None
+# Cohortes de sesiones iniciadas en el mismo instante (activación de pre-registros):
+# fecha del milestone -> usuarios, y usuario -> fecha de su cohorte
+milestone_cohorts = {}
+milestone_cohort_of = {}
+# Generación del tracker en la última revisión completa de milestones perdidos
+last_milestone_sweep_generation = None
+
+# Intervalo del guardado diferido de los cambios pendientes del tracker
+DATA_FLUSH_CHECK_SECONDS = 5
+
+# Sistema de pre-registro con horario Colombia: ventanas diarias de inicio automático
+# (config.json -> preregistration.windows). Por defecto una ventana desde las 20:16 hasta medianoche
+try:
+    preregistration_schedule = DailySchedule.from_config(colombia_tz, config.get('preregistration', {}))
+except (KeyError, ValueError) as e:
+    print(f"⚠️ Ventanas de pre-registro inválidas en config.json ({e}), se usa 20:16")
+    preregistration_schedule = DailySchedule.from_config(colombia_tz, {})
 
 # AUTO-LIGADO: Los cargos altos auto-ligan tiempos al usar /iniciar_tiempo
 # (ya no se basa en hora específica)
@@ -123,15 +224,22 @@ AUTO_START_MINUTE = 16    # Minuto (0-59)
 async def on_ready():
     print(f'{bot.user} se ha conectado a Discord!')
 
-    # Verificar que el canal de notificaciones existe
-    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-    if channel:
-        if hasattr(channel, 'name'):
-            print(f'Canal de notificaciones encontrado: {channel.name} (ID: {channel.id})')
+    # Resolver una sola vez los canales de notificación configurados
+    channel_registry.configure({
+        'milestones': NOTIFICATION_CHANNEL_ID,
+        'pausas': PAUSE_NOTIFICATION_CHANNEL_ID,
+        'cancelaciones': CANCELLATION_NOTIFICATION_CHANNEL_ID,
+        'asistencias': ATTENDANCE_NOTIFICATION_CHANNEL_ID,
+        'despausas': config.get("notification_channels", {}).get("unpause"),
+    })
+    try:
+        missing_channels = await channel_registry.refresh()
+        if missing_channels:
+            print(f'⚠️ Canales de notificación no encontrados: {", ".join(missing_channels)}')
         else:
-            print(f'Canal de notificaciones encontrado (ID: {channel.id})')
-    else:
-        print(f'⚠️ Canal de notificaciones no encontrado con ID: {NOTIFICATION_CHANNEL_ID}')
+            print(f'✅ Canales de notificación resueltos: {len(channel_registry.names)}')
+    except Exception as e:
+        print(f'⚠️ Error resolviendo canales de notificación: {e}')
 
     try:
         # Sincronización global primero
@@ -178,6 +286,15 @@ async def on_ready():
 
     # Iniciar task de verificación de milestones se hará después de definir la función
 
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Mantener al día la caché de canales de notificación"""
+    channel_registry.update(after)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    channel_registry.remove(channel.id)
+
 # @bot.event
 # async def on_voice_state_update(member, before, after):
 #     """Función deshabilitada - el seguimiento de tiempo ahora es solo manual"""
@@ -265,6 +382,17 @@ def has_unlimited_time_role(member: discord.Member) -> bool:
             return True
     return False
 
+def get_time_cap_hours(member) -> float:
+    """Límite de horas de tiempo total de un usuario según su rol.
+
+    Gold, Medios y usuarios sin rol especial (o externos, sin miembro): 2 horas; rol de
+    tiempo ilimitado: 4 horas. Nunca más que time_tracking.max_time_hours.
+    """
+    hours = 2.0
+    if member is not None and has_unlimited_time_role(member) and get_user_role_type(member) not in ("gold", "medios"):
+        hours = 4.0
+    return min(hours, MAX_TIME_HOURS)
+
 def has_attendance_role(member: discord.Member) -> bool:
     """Verificar si el usuario tiene un rol que puede obtener asistencias"""
     role_type = get_user_role_type(member)
@@ -341,57 +469,30 @@ async def iniciar_tiempo(interaction: discord.Interaction, usuario: discord.Memb
 
     # Obtener hora actual en Colombia
     colombia_now = datetime.now(colombia_tz)
-    current_hour = colombia_now.hour
-    current_minute = colombia_now.minute
-
-    # Verificar si el usuario tiene el rol de tiempo ilimitado
-    has_unlimited_role = has_unlimited_time_role(usuario)
 
-    # Verificar límites según el rol del usuario
+    # Verificar límites según el rol del usuario (los mismos que aplican los temporizadores de límite)
     total_time = time_tracker.get_total_time(usuario.id)
     total_hours = total_time / 3600
+    max_hours = get_time_cap_hours(usuario)
 
-    # Verificar el tipo de rol del usuario
-    role_type = get_user_role_type(usuario)
-
-    if role_type in ["gold", "medios"]:
-        # Usuarios con rol Gold o Medios: límite de 2 horas
-        if total_hours >= 2.0:
-            formatted_time = time_tracker.format_time_human(total_time)
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 2 horas (Tiempo actual: {formatted_time}). "
-                f"No se puede registrar más seguimiento."
-            )
-            return
-    elif not has_unlimited_role:
-        # Usuarios sin rol específico: límite de 2 horas
-        if total_hours >= 2.0:
-            formatted_time = time_tracker.format_time_human(total_time)
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 2 horas (Tiempo actual: {formatted_time}). "
-                f"No se puede registrar más seguimiento."
-            )
-            return
-    else:
-        # Usuarios con rol especial: límite de 4 horas
-        if total_hours >= 4.0:
-            formatted_time = time_tracker.format_time_human(total_time)
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 4 horas (Tiempo actual: {formatted_time}). "
-                f"No se puede registrar más seguimiento."
-            )
-            return
+    if total_hours >= max_hours:
+        formatted_time = time_tracker.format_time_human(total_time)
+        await interaction.response.send_message(
+            f"❌ {usuario.mention} ya ha alcanzado el límite máximo de {max_hours:g} horas (Tiempo actual: {formatted_time}). "
+            f"No se puede registrar más seguimiento."
+        )
+        return
 
     # Verificar si el usuario tiene tiempo pausado
     user_data = time_tracker.get_user_data(usuario.id)
-    if user_data and user_data.get('is_paused', False):
+    if user_data and user_data.is_paused:
         await interaction.response.send_message(
             f"⚠️ {usuario.mention} tiene tiempo pausado. Usa `/despausar_tiempo` para continuar el tiempo."
         )
         return
 
-    # Si es la hora configurada o después, iniciar inmediatamente
-    if current_hour > AUTO_START_HOUR or (current_hour == AUTO_START_HOUR and current_minute >= AUTO_START_MINUTE):
+    # Dentro de una ventana de inicio, iniciar inmediatamente
+    if preregistration_schedule.is_open(colombia_now):
         success = time_tracker.start_tracking(usuario.id, usuario.display_name)
         if success:
             # Registrar quién inició el tiempo para asistencias
@@ -423,10 +524,11 @@ async def iniciar_tiempo(interaction: discord.Interaction, usuario: discord.Memb
         else:
             await interaction.response.send_message(f"⚠️ El tiempo de {usuario.mention} ya está activo")
     else:
-        # Antes de la hora configurada: PRE-REGISTRAR
-        success = time_tracker.preregister_user(usuario.id, usuario.display_name, interaction.user.id, interaction.user.display_name)
+        # Fuera de las ventanas: PRE-REGISTRAR para el inicio de la siguiente
+        next_start_time = preregistration_schedule.next_start(colombia_now)
+        success = time_tracker.preregister_user(usuario.id, usuario.display_name, interaction.user.id,
+                                                interaction.user.display_name, activate_at=next_start_time)
         if success:
-            next_start_time = colombia_now.replace(hour=AUTO_START_HOUR, minute=AUTO_START_MINUTE, second=0, microsecond=0)
             time_until_start = next_start_time - colombia_now
             
             hours_left = int(time_until_start.total_seconds() // 3600)
@@ -441,7 +543,7 @@ async def iniciar_tiempo(interaction: discord.Interaction, usuario: discord.Memb
                 else:
                     time_left_str = f"{minutes_left} minuto{'s' if minutes_left != 1 else ''}"
             
-            start_time_formatted = f"{AUTO_START_HOUR:02d}:{AUTO_START_MINUTE:02d}"
+            start_time_formatted = preregistration_schedule.start_label(next_start_time)
             await interaction.response.send_message(
                 f"📝 El tiempo de {usuario.mention} ha sido registrado por {interaction.user.mention}\n"              
             )
@@ -586,6 +688,8 @@ class TimesView(discord.ui.View):
 
         current_users = self.sorted_users[start_idx:end_idx]
         user_list = []
+        # Todos los totales de la página se calculan con el mismo instante
+        total_times = time_tracker.get_total_times(user_id for _, user_id, _ in current_users)
 
         for _, user_id, data in current_users:
             try:
@@ -596,23 +700,23 @@ class TimesView(discord.ui.View):
                         user_mention = member.mention
                         role_type = get_user_role_type(member)
                 else:
-                        user_name = data.get('name', f'Usuario {user_id}')
+                        user_name = data.name or f'Usuario {user_id}'
                         user_mention = f"**{user_name}** `(ID: {user_id})`"
                         # Usuario no está en el servidor, asumir rol normal
                         role_type = "normal"
 
                 # Obtener tiempo total
-                total_time = time_tracker.get_total_time(user_id_int)
+                total_time = total_times[user_id]
                 formatted_time = time_tracker.format_time_human(total_time)
 
                 # Determinar estado
                 status = "🔴 Inactivo"
-                if data.get('is_active', False):
+                if data.is_active:
                     status = "🟢 Activo"
-                elif data.get('is_paused', False):
+                elif data.is_paused:
                     total_hours = total_time / 3600
                     has_special_role = has_unlimited_time_role(member) if member else False
-                    if data.get("milestone_completed", False) or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
+                    if data.milestone_completed or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
                         status = "✅ Terminado"
                     else:
                         status = "⏸️ Pausado"
@@ -719,11 +823,8 @@ async def ver_tiempos(interaction: discord.Interaction):
             return
 
     try:
-        # Obtener usuarios con timeout
-        tracked_users = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_all_tracked_users),
-            timeout=5.0
-        )
+        # Lectura en memoria: no toca el disco, se puede hacer en el event loop
+        tracked_users = time_tracker.users
 
         # Obtener pre-registros
         preregistered_users = time_tracker.get_preregistered_users()
@@ -751,12 +852,13 @@ async def ver_tiempos(interaction: discord.Interaction):
             # Ordenar usuarios alfabéticamente por nombre
             sorted_users = []
             for user_id, data in tracked_users.items():
-                user_name = data.get('name', f'Usuario {user_id}')
+                user_name = data.name or f'Usuario {user_id}'
                 sorted_users.append((user_name.lower(), user_id, data))
 
             sorted_users.sort(key=lambda x: x[0])
 
             user_list = []
+            total_times = time_tracker.get_total_times(user_id for _, user_id, _ in sorted_users[:15])
             for _, user_id, data in sorted_users[:15]:  # Limitar a 15 para dejar espacio a pre-registros
                 try:
                     user_id_int = int(user_id)
@@ -766,20 +868,20 @@ async def ver_tiempos(interaction: discord.Interaction):
                         user_mention = member.mention
                         role_type = get_user_role_type(member)
                     else:
-                        user_name = data.get('name', f'Usuario {user_id}')
+                        user_name = data.name or f'Usuario {user_id}'
                         user_mention = f"**{user_name}** `(ID: {user_id})`"
                         role_type = "normal"
 
-                    total_time = time_tracker.get_total_time(user_id_int)
+                    total_time = total_times[user_id]
                     formatted_time = time_tracker.format_time_human(total_time)
 
                     status = "🔴 Inactivo"
-                    if data.get('is_active', False):
+                    if data.is_active:
                         status = "🟢 Activo"
-                    elif data.get('is_paused', False):
+                    elif data.is_paused:
                         total_hours = total_time / 3600
                         has_special_role = has_unlimited_time_role(member) if member else False
-                        if (data.get("milestone_completed", False) or 
+                        if (data.milestone_completed or 
                             (has_special_role and total_hours >= 4.0) or 
                             (not has_special_role and total_hours >= 2.0)):
                             status = "✅ Terminado"
@@ -853,9 +955,9 @@ async def ver_tiempos(interaction: discord.Interaction):
                     inline=False
                 )
                 
-                # Calcular tiempo hasta la hora configurada
-                if colombia_now.hour < AUTO_START_HOUR or (colombia_now.hour == AUTO_START_HOUR and colombia_now.minute < AUTO_START_MINUTE):
-                    next_start_time = colombia_now.replace(hour=AUTO_START_HOUR, minute=AUTO_START_MINUTE, second=0, microsecond=0)
+                # Calcular tiempo hasta la próxima ventana de inicio
+                if not preregistration_schedule.is_open(colombia_now):
+                    next_start_time = preregistration_schedule.next_start(colombia_now)
                     time_until_start = next_start_time - colombia_now
                     
                     hours_left = int(time_until_start.total_seconds() // 3600)
@@ -863,7 +965,7 @@ async def ver_tiempos(interaction: discord.Interaction):
                     
                     time_left_str = f"{hours_left:02d}:{minutes_left:02d}"
                     
-                    start_time_formatted = f"{AUTO_START_HOUR:02d}:{AUTO_START_MINUTE:02d}"
+                    start_time_formatted = preregistration_schedule.start_label(next_start_time)
                     embed.add_field(
                         name="⏰ Inicio Automático",
                         value=f"Pre-registros iniciarán a las **{start_time_formatted}** (Colombia)\n⏳ Tiempo restante: **{time_left_str}**",
@@ -903,6 +1005,23 @@ async def ver_tiempos(interaction: discord.Interaction):
         except Exception as e2:
             print(f"No se pudo enviar mensaje de error final: {e2}")
 
+@bot.tree.command(name="tablero_en_vivo", description="Publicar en este canal un tablero de tiempos que se actualiza solo")
+@discord.app_commands.describe(activar="True para activar el tablero en este canal, False para dejar de actualizarlo")
+@is_admin()
+async def tablero_en_vivo(interaction: discord.Interaction, activar: bool = True):
+    """Activar o desactivar el tablero en vivo en el canal actual"""
+    if activar:
+        live_board.add_channel(interaction.channel_id)
+        await interaction.response.send_message(
+            f"📺 Tablero en vivo activado en este canal. Se actualiza solo, como máximo cada "
+            f"{live_board.min_interval:.0f} segundos, cuando cambian los tiempos.",
+            ephemeral=True
+        )
+    elif live_board.remove_channel(interaction.channel_id):
+        await interaction.response.send_message("📺 Tablero en vivo desactivado en este canal", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ No hay un tablero en vivo activo en este canal", ephemeral=True)
+
 @bot.tree.command(name="reiniciar_tiempo", description="Reiniciar el tiempo de un usuario a cero")
 @discord.app_commands.describe(usuario="El usuario cuyo tiempo se reiniciará")
 @is_admin()
@@ -926,8 +1045,7 @@ async def reiniciar_todos_tiempos(interaction: discord.Interaction):
 @is_admin()
 async def limpiar_base_datos(interaction: discord.Interaction):
     # Obtener conteo actual de usuarios antes de limpiar
-    tracked_users = time_tracker.get_all_tracked_users()
-    user_count = len(tracked_users)
+    user_count = len(time_tracker.users)
 
     if user_count == 0:
         await interaction.response.send_message("❌ No hay usuarios registrados en la base de datos")
@@ -981,8 +1099,7 @@ async def limpiar_base_datos_confirmar(interaction: discord.Interaction, confirm
         return
 
     # Obtener información antes de limpiar
-    tracked_users = time_tracker.get_all_tracked_users()
-    user_count = len(tracked_users)
+    user_count = len(time_tracker.users)
 
     if user_count == 0:
         await interaction.response.send_message("❌ No hay usuarios registrados en la base de datos")
@@ -1044,108 +1161,184 @@ async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
 
 
 
+async def deliver_notification(channel_id: int, content: str):
+    """Enviar un mensaje ya armado por el outbox de notificaciones"""
+    channel = await channel_registry.resolve(channel_id)
+    if not channel:
+        raise LookupError(f"Canal no encontrado: {channel_id}")
+    await asyncio.wait_for(channel.send(content), timeout=15.0)
+
+def is_permanent_send_error(error: Exception) -> bool:
+    """Errores de envío que no se arreglan reintentando (canal inexistente, sin permisos, mensaje inválido)"""
+    if isinstance(error, (LookupError, discord.NotFound, discord.Forbidden)):
+        return True
+    return isinstance(error, discord.HTTPException) and getattr(error, 'code', None) in (50013, 50035)
+
+def send_rate_limit(error: Exception):
+    """(segundos de retry-after, si es global) de un 429 de Discord, o None si no lo es"""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after, False
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        headers = getattr(error.response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+        return (float(retry_after) if retry_after else 1.0), headers.get('X-RateLimit-Global') == 'true'
+    return None
+
+# Canales de notificación resueltos en on_ready; si falta uno se consulta una vez a la API
+channel_registry = ChannelRegistry(bot.get_channel, bot.fetch_channel,
+                                   not_found_errors=(discord.NotFound, discord.Forbidden))
+
+# Límites de envío a Discord (tokens por segundo y ráfaga, en total y por canal)
+rate_limit_config = config.get('rate_limits', {})
+send_rate_limiter = RateLimiter(
+    global_rate=rate_limit_config.get('global_per_second', 40.0),
+    global_burst=rate_limit_config.get('global_burst', 40),
+    channel_rate=rate_limit_config.get('channel_per_second', 1.0),
+    channel_burst=rate_limit_config.get('channel_burst', 5)
+)
+
+# Outbox central: las notificaciones de cada canal que llegan juntas se envían en la
+# menor cantidad de mensajes posible, con reintentos en un solo lugar. Los milestones
+# se guardan en su journal para entregarlos aunque el bot se reinicie
+notification_outbox = NotificationOutbox(
+    deliver_notification,
+    is_permanent_error=is_permanent_send_error,
+    linger=config.get('notification_linger_seconds', 1.0),
+    journal=OutboxJournal(time_tracking_config.get('notification_outbox_file', 'notification_outbox.jsonl')),
+    rate_limiter=send_rate_limiter,
+    rate_limit_of=send_rate_limit
+)
+
+LIVE_BOARD_SECTION_LIMIT = 15
+
+# Último texto del tablero por servidor y generación del tracker: los canales del
+# mismo servidor comparten el recorrido de usuarios mientras no haya cambios
+_live_board_cache = {}
+
+def render_live_board(channel_id: int) -> str:
+    """Texto del tablero en vivo: usuarios activos, pausados y terminados.
+
+    El tiempo de las sesiones en curso se muestra con una marca de tiempo relativa de
+    Discord, que avanza sola en el cliente: el texto solo cambia cuando cambia el tracker.
+    """
+    channel = channel_registry.get(channel_id)
+    guild = getattr(channel, 'guild', None)
+    guild_id = guild.id if guild else None
+    cached = _live_board_cache.get(guild_id)
+    if cached is not None and cached[0] == time_tracker.generation:
+        return cached[1]
+
+    now = time.time()
+    active, paused, finished = [], [], []
+
+    for user_id_str, data in time_tracker.iter_users():
+        member = guild.get_member(int(user_id_str)) if guild else None
+        user_name = data.name or f'Usuario {user_id_str}'
+        reference = member.mention if member else f"**{user_name}**"
+        total_time = data.total_time
+        if data.is_active:
+            started = int(data.last_start or now)
+            active.append((user_name.lower(), f"🟢 {reference} - ⏱️ {time_tracker.format_time_human(total_time)} "
+                                              f"+ sesión desde <t:{started}:R>"))
+            continue
+
+        completed = data.milestone_completed or total_time >= get_time_cap_hours(member) * 3600
+        if data.is_paused and not completed:
+            paused.append((user_name.lower(), f"⏸️ {reference} - ⏱️ {time_tracker.format_time_human(total_time)}"))
+        elif total_time > 0 and (completed or data.highest_notified_hour > 0):
+            finished.append((user_name.lower(), f"✅ {reference} - ⏱️ {time_tracker.format_time_human(total_time)}"))
+
+    sections = []
+    for title, entries in (("Activos", active), ("Pausados", paused), ("Terminados", finished)):
+        entries.sort(key=lambda entry: entry[0])
+        lines = [line for _, line in entries[:LIVE_BOARD_SECTION_LIMIT]]
+        if len(entries) > LIVE_BOARD_SECTION_LIMIT:
+            lines.append(f"… y {len(entries) - LIVE_BOARD_SECTION_LIMIT} más")
+        sections.append(f"**{title} ({len(entries)})**\n" + ("\n".join(lines) if lines else "—"))
+    body = "\n\n".join(sections)
+    _live_board_cache[guild_id] = (time_tracker.generation, body)
+    return body
+
+async def publish_live_board(channel_id: int, message_id, body: str) -> int:
+    """Editar el mensaje del tablero en vivo, o publicarlo si todavía no existe o se borró"""
+    channel = await channel_registry.resolve(channel_id)
+    if not channel:
+        raise LookupError(f"Canal no encontrado: {channel_id}")
+
+    embed = discord.Embed(
+        title="📺 Tablero de Tiempos en Vivo",
+        description=body[:4096],
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    embed.set_footer(text="Última actualización")
+
+    # Las ediciones compiten por los mismos límites que las notificaciones, con la menor prioridad
+    await send_rate_limiter.acquire(channel_id, PRIORITY_DIAGNOSTICS)
+    if message_id is not None:
+        try:
+            await channel.get_partial_message(message_id).edit(embed=embed)
+            return message_id
+        except discord.NotFound:
+            print(f"⚠️ El mensaje del tablero en vivo del canal {channel_id} ya no existe; se publica uno nuevo")
+            await send_rate_limiter.acquire(channel_id, PRIORITY_DIAGNOSTICS)
+    message = await channel.send(embed=embed)
+    return message.id
+
+# Tablero en vivo (opcional, se activa por canal con /tablero_en_vivo)
+live_board_config = config.get('live_board', {})
+live_board = LiveBoard(
+    render_live_board,
+    publish_live_board,
+    state_file=live_board_config.get('state_file', 'live_board.json'),
+    min_interval=live_board_config.get('interval_seconds', 30)
+)
+time_tracker.add_user_listener(live_board.mark_dirty)
+
 async def send_auto_cancellation_notification(user_name: str, total_time: str, cancelled_by: str, pause_count: int):
     """Enviar notificación cuando un usuario es cancelado automáticamente por 3 pausas"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
-    if channel:
-        try:
-            message = f"🚫 **CANCELACIÓN AUTOMÁTICA**\n**{user_name}** ha sido cancelado automáticamente por exceder el límite de pausas\n**Tiempo total perdido:** {total_time}\n**Pausas alcanzadas:** {pause_count}/3\n**Última pausa ejecutada por:** {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación automática enviada para {user_name}")
-        except Exception as e:
-            print(f"❌ Error enviando notificación de cancelación automática: {e}")
-    else:
-        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {CANCELLATION_NOTIFICATION_CHANNEL_ID}")
+    message = f"🚫 **CANCELACIÓN AUTOMÁTICA**\n**{user_name}** ha sido cancelado automáticamente por exceder el límite de pausas\n**Tiempo total perdido:** {total_time}\n**Pausas alcanzadas:** {pause_count}/3\n**Última pausa ejecutada por:** {cancelled_by}"
+    notification_outbox.enqueue(CANCELLATION_NOTIFICATION_CHANNEL_ID, "cancellation", message)
+    print(f"✅ Notificación de cancelación automática encolada para {user_name}")
 
 async def send_cancellation_notification(user_name: str, cancelled_by: str, cancelled_time: str = ""):
     """Enviar notificación cuando un usuario es cancelado"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
-    if channel:
-        try:
-            if cancelled_time:
-                message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado\n**Tiempo cancelado:** {cancelled_time}\n**Cancelado por:** {cancelled_by}"
-            else:
-                message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado por {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación enviada para {user_name}")
-        except Exception as e:
-            print(f"❌ Error enviando notificación de cancelación: {e}")
+    if cancelled_time:
+        message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado\n**Tiempo cancelado:** {cancelled_time}\n**Cancelado por:** {cancelled_by}"
     else:
-        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {CANCELLATION_NOTIFICATION_CHANNEL_ID}")
+        message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado por {cancelled_by}"
+    notification_outbox.enqueue(CANCELLATION_NOTIFICATION_CHANNEL_ID, "cancellation", message)
+    print(f"✅ Notificación de cancelación encolada para {user_name}")
 
 async def send_pause_notification(user_name: str, total_time: float, paused_by: str, session_time: str = "", pause_count: int = 0):
     """Enviar notificación cuando un usuario es pausado"""
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        try:
-            channel = bot.get_channel(PAUSE_NOTIFICATION_CHANNEL_ID)
-            if not channel:
-                print(f"❌ Canal de pausas no encontrado: {PAUSE_NOTIFICATION_CHANNEL_ID}")
-                return
-
-            formatted_total_time = time_tracker.format_time_human(total_time)
-            pause_text = f"pausa" if pause_count == 1 else f"pausas"
+    formatted_total_time = time_tracker.format_time_human(total_time)
+    pause_text = f"pausa" if pause_count == 1 else f"pausas"
 
-            if session_time and session_time != "0 Segundos":
-                message = f"⏸️ El tiempo de **{user_name}** ha sido pausado\n**Tiempo de sesión pausado:** {session_time}\n**Tiempo total acumulado:** {formatted_total_time}\n**Pausado por:** {paused_by}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
-            else:
-                message = f"⏸️ El tiempo de **{user_name}** ha sido pausado por {paused_by}\n**Tiempo total acumulado:** {formatted_total_time}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
-
-            await asyncio.wait_for(channel.send(message), timeout=10.0)
-            print(f"✅ Notificación de pausa enviada para {user_name}")
-            return
-
-        except asyncio.TimeoutError:
-            print(f"⚠️ Timeout enviando notificación de pausa para {user_name} (intento {attempt + 1}/{max_retries})")
-        except discord.HTTPException as e:
-            print(f"⚠️ Error HTTP enviando notificación de pausa para {user_name}: {e}")
-            if "50013" in str(e):  # No permissions
-                return
-        except Exception as e:
-            print(f"⚠️ Error enviando notificación de pausa para {user_name} (intento {attempt + 1}): {e}")
+    if session_time and session_time != "0 Segundos":
+        message = f"⏸️ El tiempo de **{user_name}** ha sido pausado\n**Tiempo de sesión pausado:** {session_time}\n**Tiempo total acumulado:** {formatted_total_time}\n**Pausado por:** {paused_by}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
+    else:
+        message = f"⏸️ El tiempo de **{user_name}** ha sido pausado por {paused_by}\n**Tiempo total acumulado:** {formatted_total_time}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
 
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)  # Backoff exponencial
+    notification_outbox.enqueue(PAUSE_NOTIFICATION_CHANNEL_ID, "pause", message)
+    print(f"✅ Notificación de pausa encolada para {user_name}")
 
 async def send_unpause_notification(user_name: str, total_time: float, unpaused_by: str, paused_duration: str = ""):
     """Enviar notificación cuando un usuario es despausado"""
-    max_retries = 3
-
     channel_id = config.get("notification_channels", {}).get("unpause")
     if not channel_id:
         print("❌ Canal de despausas no configurado")
         return
 
-    for attempt in range(max_retries):
-        try:
-            channel = bot.get_channel(channel_id)
-            if not channel:
-                print(f"❌ Canal de despausas no encontrado: {channel_id}")
-                return
+    formatted_total_time = time_tracker.format_time_human(total_time)
 
-            formatted_total_time = time_tracker.format_time_human(total_time)
-
-            if paused_duration:
-                message = f"▶️ El tiempo de **{user_name}** ha sido despausado\n**Tiempo total acumulado:** {formatted_total_time}\n**Tiempo pausado:** {paused_duration}\n**Despausado por:** {unpaused_by}"
-            else:
-                message = f"▶️ **{user_name}** ha sido despausado por {unpaused_by}. Tiempo acumulado: {formatted_total_time}"
-
-            await asyncio.wait_for(channel.send(message), timeout=10.0)
-            print(f"✅ Notificación de despausa enviada para {user_name}")
-            return
-
-        except asyncio.TimeoutError:
-            print(f"⚠️ Timeout enviando notificación de despausa para {user_name} (intento {attempt + 1}/{max_retries})")
-        except discord.HTTPException as e:
-            print(f"⚠️ Error HTTP enviando notificación de despausa para {user_name}: {e}")
-            if "50013" in str(e):  # No permissions
-                return
-        except Exception as e:
-            print(f"⚠️ Error enviando notificación de despausa para {user_name} (intento {attempt + 1}): {e}")
+    if paused_duration:
+        message = f"▶️ El tiempo de **{user_name}** ha sido despausado\n**Tiempo total acumulado:** {formatted_total_time}\n**Tiempo pausado:** {paused_duration}\n**Despausado por:** {unpaused_by}"
+    else:
+        message = f"▶️ **{user_name}** ha sido despausado por {unpaused_by}. Tiempo acumulado: {formatted_total_time}"
 
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)  # Backoff exponencial
+    notification_outbox.enqueue(channel_id, "pause", message)
+    print(f"✅ Notificación de despausa encolada para {user_name}")
 
 async def check_time_milestone(user_id: int, user_name: str):
     """Verificar si el usuario ha alcanzado milestones de tiempo y enviar notificaciones"""
@@ -1166,7 +1359,7 @@ async def check_time_milestone(user_id: int, user_name: str):
 
         # Para usuarios externos (comandos de prefijo), asumir sin rol especial
         has_unlimited_role = False
-        is_external_user = user_data.get('is_external_user', False)
+        is_external_user = user_data.extra.get('is_external_user', False)
 
         if member:
             try:
@@ -1179,123 +1372,74 @@ async def check_time_milestone(user_id: int, user_name: str):
             has_unlimited_role = False
 
         # Solo verificar si el usuario está activo o pausado (pero no completamente detenido)
-        if not user_data.get('is_active', False):
+        if not user_data.is_active:
             return
 
         # Calcular tiempo de la sesión actual
-        if not user_data.get('last_start'):
-            return
-
-        try:
-            session_start = datetime.fromisoformat(user_data['last_start'])
-        except (ValueError, TypeError) as e:
-            print(f"⚠️ Error parseando fecha de inicio para {user_name}: {e}")
+        if user_data.last_start is None:
             return
 
         # Si está pausado, calcular tiempo hasta la pausa
-        if user_data.get('is_paused', False) and user_data.get('pause_start'):
-            try:
-                pause_start = datetime.fromisoformat(user_data['pause_start'])
-                session_time = (pause_start - session_start).total_seconds()
-            except (ValueError, TypeError) as e:
-                print(f"⚠️ Error parseando fecha de pausa para {user_name}: {e}")
-                return
+        if user_data.is_paused and user_data.pause_start is not None:
+            session_time = user_data.pause_start - user_data.last_start
         else:
             # Si está activo, calcular tiempo hasta ahora
-            current_time = datetime.now()
-            session_time = (current_time - session_start).total_seconds()
+            session_time = time.time() - user_data.last_start
 
         # Solo proceder si la sesión actual ha alcanzado 1 hora
         if session_time < 3600:
             return
 
         total_time = time_tracker.get_total_time(user_id)
+        await notify_pending_milestone(user_id, user_name, user_data, total_time,
+                                       member, is_external_user, has_unlimited_role)
 
-        # Asegurar que existe el campo notified_milestones
-        if 'notified_milestones' not in user_data:
-            user_data['notified_milestones'] = []
-            try:
-                time_tracker.save_data()
-            except Exception as e:
-                print(f"⚠️ Error guardando datos para {user_name}: {e}")
-
-        notified_milestones = user_data.get('notified_milestones', [])
-
-        # Calcular cuántas horas totales tiene el usuario
-        total_hours = int(total_time // 3600)
-        hour_milestone = total_hours * 3600
-
-        # Verificar si hay milestones perdidos (usuario tiene tiempo acumulado pero sin notificaciones)
-        missing_milestones = []
-        for h in range(1, total_hours + 1):
-            milestone = h * 3600
-            if milestone not in notified_milestones:
-                missing_milestones.append((milestone, h))
-
-        # Si hay milestones perdidos, notificar el más reciente
-        if missing_milestones:
-            milestone_to_notify, hours_to_notify = missing_milestones[-1]
-
-            # AGREGAR ASISTENCIA ANTES DE DETENER EL TRACKING
-            if member:
-                await add_attendance_for_milestone(member, hours_to_notify)
-
-            # Marcar TODOS los milestones perdidos como notificados
-            for milestone, _ in missing_milestones:
-                if milestone not in notified_milestones:
-                    notified_milestones.append(milestone)
-            user_data['notified_milestones'] = notified_milestones
-
-            try:
-                time_tracker.save_data()
-            except Exception as e:
-                print(f"⚠️ Error guardando milestones para {user_name}: {e}")
-
-            # Detener el seguimiento después de completar 1 hora de sesión
-            try:
-                time_tracker.stop_tracking(user_id)
-            except Exception as e:
-                print(f"⚠️ Error deteniendo tracking para {user_name}: {e}")
-
-            # Enviar notificación con retry y timeout
-            await send_milestone_notification(user_name, member, is_external_user, hours_to_notify, total_time)
-
-            return
+    except Exception as e:
+        print(f"❌ Error crítico en check_time_milestone para {user_name}: {e}")
+        import traceback
+        traceback.print_exc()
 
-        # Verificar si ya se notificó este milestone específico
-        elif hour_milestone not in notified_milestones:
-            # AGREGAR ASISTENCIA ANTES DE DETENER EL TRACKING
-            if member:
-                await add_attendance_for_milestone(member, total_hours)
+async def notify_pending_milestone(user_id: int, user_name: str, user_data: UserRecord, total_time: float,
+                                   member, is_external_user: bool, has_unlimited_role: bool) -> bool:
+    """Notificar el milestone pendiente más alto del usuario, si lo hay.
 
-            # Marcar este milestone como notificado
-            notified_milestones.append(hour_milestone)
-            user_data['notified_milestones'] = notified_milestones
+    Los milestones anteriores que no se notificaron quedan marcados junto con este. Lo
+    usan tanto el temporizador de la sesión como la revisión de milestones perdidos.
+    Devuelve True si había un milestone pendiente.
+    """
+    hours_to_notify = user_data.pending_milestone_hour(total_time)
+    if hours_to_notify is None:
+        return False
 
-            try:
-                time_tracker.save_data()
-            except Exception as e:
-                print(f"⚠️ Error guardando milestone para {user_name}: {e}")
+    # La notificación queda en el journal del outbox antes de guardar la marca del
+    # milestone: si el bot se cae entre ambos pasos se entrega igual, y si se vuelve a
+    # detectar el milestone la clave evita el duplicado. La clave incluye el inicio de
+    # la sesión para que, tras reiniciar o cancelar el tiempo, la misma hora se notifique
+    session_start = int(user_data.last_start or 0)
+    await send_milestone_notification(user_name, member, is_external_user, hours_to_notify, total_time,
+                                      key=f"milestone:{user_id}:{session_start}:{hours_to_notify}")
 
-            # Detener seguimiento para todos los usuarios
-            try:
-                time_tracker.stop_tracking(user_id)
-                # Marcar como milestone completado para usuarios con rol especial
-                if has_unlimited_role:
-                    user_data_refresh = time_tracker.get_user_data(user_id)
-                    if user_data_refresh:
-                        user_data_refresh['milestone_completed'] = True
-                        time_tracker.save_data()
-            except Exception as e:
-                print(f"⚠️ Error deteniendo tracking final para {user_name}: {e}")
+    # AGREGAR ASISTENCIA ANTES DE DETENER EL TRACKING
+    if member:
+        await add_attendance_for_milestone(member, hours_to_notify)
 
-            # Enviar notificación con retry y timeout
-            await send_milestone_notification(user_name, member, is_external_user, total_hours, total_time)
+    # Marcar este milestone y todos los anteriores como notificados
+    user_data.mark_milestone_notified(hours_to_notify)
+    time_tracker.save_user_data(user_id)
 
+    # Detener el seguimiento después de completar el milestone
+    try:
+        time_tracker.stop_tracking(user_id)
+        # Marcar como milestone completado para usuarios con rol especial
+        if has_unlimited_role:
+            user_data_refresh = time_tracker.get_user_data(user_id)
+            if user_data_refresh:
+                user_data_refresh.milestone_completed = True
+                time_tracker.save_user_data(user_id)
     except Exception as e:
-        print(f"❌ Error crítico en check_time_milestone para {user_name}: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"⚠️ Error deteniendo tracking para {user_name}: {e}")
+
+    return True
 
 async def add_attendance_for_milestone(member: discord.Member, hours_completed: int):
     """Agregar asistencia cuando alguien completa milestone - considera tiempo ligado"""
@@ -1306,8 +1450,8 @@ async def add_attendance_for_milestone(member: discord.Member, hours_completed:
         linked_info = time_tracker.get_linked_user(member.id)
         if linked_info:
             # El tiempo está ligado - dar asistencia al usuario ligado
-            admin_id = linked_info['admin_id']
-            admin_name = linked_info['admin_name']
+            admin_id = linked_info.admin_id
+            admin_name = linked_info.admin_name
             print(f"🔗 Tiempo ligado encontrado: {admin_name} (ID: {admin_id})")
         else:
             # No está ligado - usar el iniciador original
@@ -1316,8 +1460,8 @@ async def add_attendance_for_milestone(member: discord.Member, hours_completed:
                 print(f"❌ No se encontró información del iniciador para {member.display_name}")
                 return
 
-            admin_id = initiator_info['admin_id']
-            admin_name = initiator_info['admin_name']
+            admin_id = initiator_info.admin_id
+            admin_name = initiator_info.admin_name
             print(f"🔍 Iniciador encontrado: {admin_name} (ID: {admin_id})")
 
         # Verificar si el admin puede recibir asistencias
@@ -1358,183 +1502,152 @@ async def add_attendance_for_milestone(member: discord.Member, hours_completed:
 async def send_attendance_notification(admin_member: discord.Member, hours_completed: int, user_member, attendance_info: dict):
     """Enviar notificación de asistencia agregada"""
     try:
-        channel = bot.get_channel(ATTENDANCE_NOTIFICATION_CHANNEL_ID)
-        if channel:
-            attendances_text = "asistencia" if hours_completed == 1 else "asistencias"
-
-            # Obtener el cargo del usuario
-            cargo_info = get_cargo_info(admin_member)
-
-            # Determinar referencia del usuario (puede ser member o nombre de usuario externo)
-            if user_member and hasattr(user_member, 'mention'):
-                user_reference = user_member.mention
-            elif user_member and hasattr(user_member, 'display_name'):
-                user_reference = f"**{user_member.display_name}**"
-            else:
-                user_reference = "**Usuario externo**"
+        attendances_text = "asistencia" if hours_completed == 1 else "asistencias"
+
+        # Obtener el cargo del usuario
+        cargo_info = get_cargo_info(admin_member)
+
+        # Determinar referencia del usuario (puede ser member o nombre de usuario externo)
+        if user_member and hasattr(user_member, 'mention'):
+            user_reference = user_member.mention
+        elif user_member and hasattr(user_member, 'display_name'):
+            user_reference = f"**{user_member.display_name}**"
+        else:
+            user_reference = "**Usuario externo**"
 
-            message = (f"📋 **ASISTENCIA REGISTRADA**\n"
-                      f"{admin_member.mention} {cargo_info} ha recibido {hours_completed} {attendances_text} "
-                      f"por completar tiempo de {user_reference}\n"
-                      f"📊 **Asistencias:** Hoy: {attendance_info['daily']}/3 | Semana: {attendance_info['weekly']}/15 | Total: {attendance_info['total']}")
+        message = (f"📋 **ASISTENCIA REGISTRADA**\n"
+                  f"{admin_member.mention} {cargo_info} ha recibido {hours_completed} {attendances_text} "
+                  f"por completar tiempo de {user_reference}\n"
+                  f"📊 **Asistencias:** Hoy: {attendance_info['daily']}/3 | Semana: {attendance_info['weekly']}/15 | Total: {attendance_info['total']}")
 
-            await channel.send(message)
-            print(f"✅ Asistencia registrada: {admin_member.display_name} (+{hours_completed})")
+        notification_outbox.enqueue(ATTENDANCE_NOTIFICATION_CHANNEL_ID, "attendance", message)
+        print(f"✅ Asistencia registrada: {admin_member.display_name} (+{hours_completed})")
     except Exception as e:
         print(f"Error enviando notificación de asistencia: {e}")
 
-async def send_milestone_notification(user_name: str, member, is_external_user: bool, hours: int, total_time: float):
-    """Enviar notificación de milestone con sistema de retry ultra-robusto"""
-    max_retries = 5  # Aumentado a 5 intentos
-    base_delay = 1  # Delay inicial reducido
-    max_timeout = 30  # Timeout máximo aumentado
+async def send_milestone_notification(user_name: str, member, is_external_user: bool, hours: int, total_time: float,
+                                      key: str = None):
+    """Enviar notificación de milestone; el outbox la agrupa con las demás del canal y la reintenta.
 
-    for attempt in range(max_retries):
-        try:
-            # Intentar obtener el canal con timeout
-            channel = await asyncio.wait_for(
-                asyncio.to_thread(bot.get_channel, NOTIFICATION_CHANNEL_ID),
-                timeout=5.0
-            )
-            
-            if not channel:
-                print(f"❌ Canal de notificaciones no encontrado: {NOTIFICATION_CHANNEL_ID}")
-                return
-
-            formatted_time = time_tracker.format_time_human(total_time)
+    Con `key` la notificación es durable (ver NotificationOutbox) y no se repite.
+    """
+    formatted_time = time_tracker.format_time_human(total_time)
 
-            # Decidir formato según si es usuario externo o de servidor
-            if member and not is_external_user:
-                user_reference = member.mention
-            else:
-                user_reference = f"**{user_name}**"
+    # Decidir formato según si es usuario externo o de servidor
+    if member and not is_external_user:
+        user_reference = member.mention
+    else:
+        user_reference = f"**{user_name}**"
 
-            if hours == 1:
-                message = f"🎉 {user_reference} ha completado 1 Hora! Tiempo acumulado: {formatted_time} "
-            else:
-                message = f"🎉 {user_reference} ha completado {hours} Horas! Tiempo acumulado: {formatted_time} "
+    if hours == 1:
+        message = f"🎉 {user_reference} ha completado 1 Hora! Tiempo acumulado: {formatted_time} "
+    else:
+        message = f"🎉 {user_reference} ha completado {hours} Horas! Tiempo acumulado: {formatted_time} "
 
-            # Timeout progresivo: aumenta con cada intento
-            current_timeout = min(10 + (attempt * 5), max_timeout)
-            
-            # Enviar con timeout progresivo
-            await asyncio.wait_for(channel.send(message), timeout=current_timeout)
-            print(f"✅ Notificación enviada exitosamente: {user_name} completó {hours} hora(s) (intento {attempt + 1}, timeout: {current_timeout}s)")
-            return
+    if notification_outbox.enqueue(NOTIFICATION_CHANNEL_ID, "milestone", message, key=key) is None:
+        print(f"ℹ️ Notificación de {user_name} ({hours} hora(s)) ya estaba en el outbox")
+        return
+    print(f"✅ Notificación encolada: {user_name} completó {hours} hora(s)")
+
+def preregistration_activation_time(prereg_data: dict):
+    """Momento (hora Colombia) en que se debe activar un pre-registro"""
+    activate_at = prereg_data.get('activate_at')
+    if activate_at:
+        return datetime.fromisoformat(activate_at).astimezone(colombia_tz)
+    # Pre-registros del formato anterior: el primer inicio de ventana después del registro
+    registered_at = prereg_data.get('registered_at')
+    if registered_at:
+        return preregistration_schedule.next_start(datetime.fromisoformat(registered_at).astimezone(colombia_tz))
+    return None
 
-        except asyncio.TimeoutError:
-            delay = base_delay * (2 ** attempt)  # Backoff exponencial más agresivo
-            print(f"⚠️ Timeout ({current_timeout if 'current_timeout' in locals() else 'N/A'}s) enviando notificación para {user_name} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"🔄 Reintentando en {delay}s...")
-                await asyncio.sleep(delay)
-        except discord.HTTPException as e:
-            if "50013" in str(e):  # No permissions
-                print(f"❌ Sin permisos para enviar mensaje en canal {NOTIFICATION_CHANNEL_ID}")
-                return
-            elif "50035" in str(e):  # Invalid form body
-                print(f"❌ Mensaje inválido para {user_name}: {e}")
-                return
-            print(f"⚠️ Error HTTP enviando notificación para {user_name} (intento {attempt + 1}): {e}")
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                await asyncio.sleep(delay)
-        except discord.NotFound:
-            print(f"❌ Canal de notificaciones no encontrado: {NOTIFICATION_CHANNEL_ID}")
-            return
-        except Exception as e:
-            print(f"⚠️ Error inesperado enviando notificación para {user_name} (intento {attempt + 1}): {e}")
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                await asyncio.sleep(delay)
+def schedule_preregistration_activation() -> None:
+    """Programar el temporizador del próximo inicio de ventana"""
+    next_start = preregistration_schedule.next_start()
+    timer_scheduler.schedule(("preregistration",), next_start.timestamp(), run_preregistration_activation)
 
-    # Si fallan todos los intentos, intentar una notificación de emergencia simplificada
-    print(f"🚨 TODOS LOS INTENTOS FALLARON para {user_name}. Intentando notificación de emergencia...")
+async def run_preregistration_activation():
+    """Temporizador del inicio de ventana: activar pre-registros y programar el siguiente"""
     try:
-        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if channel:
-            emergency_message = f"⚠️ {user_reference if 'user_reference' in locals() else user_name} completó {hours}h - Notificación de emergencia"
-            await asyncio.wait_for(channel.send(emergency_message), timeout=10.0)
-            print(f"✅ Notificación de emergencia enviada para {user_name}")
-            return
-    except Exception as emergency_error:
-        print(f"❌ Falló notificación de emergencia para {user_name}: {emergency_error}")
+        await process_due_preregistrations()
+    finally:
+        schedule_preregistration_activation()
 
-    print(f"❌ CRÍTICO: No se pudo enviar notificación para {user_name} después de {max_retries} intentos + emergencia")
+def schedule_weekly_rollover() -> None:
+    """Programar el cierre de semana de asistencias para el próximo lunes 00:00 (Colombia)"""
+    week_start = next_week_start(colombia_tz, datetime.now(colombia_tz))
+    timer_scheduler.schedule(("weekly_rollover",), week_start.timestamp(), run_weekly_rollover)
 
-async def daily_preregistration_monitor():
-    """Monitorear pre-registros y activarlos automáticamente a la hora configurada Colombia"""
-    print(f"🔄 Iniciando monitoreo de pre-registro diario ({AUTO_START_HOUR:02d}:{AUTO_START_MINUTE:02d} Colombia)")
-    
-    while True:
-        try:
-            # Verificar cada 30 segundos
-            await asyncio.sleep(30)
-            
-            # Obtener hora actual en Colombia
-            colombia_now = datetime.now(colombia_tz)
-            current_hour = colombia_now.hour
-            current_minute = colombia_now.minute
-            
-            # Verificar si es exactamente la hora configurada (con ventana de 1 minuto)
-            if current_hour == AUTO_START_HOUR and current_minute == AUTO_START_MINUTE:
-                print(f"🕐 ¡Son las {AUTO_START_HOUR:02d}:{AUTO_START_MINUTE:02d} en Colombia! Activando pre-registros...")
-                
-                # Activar todos los pre-registros
-                activated_users = await activate_all_preregistrations()
-                
-                if activated_users > 0:
-                    print(f"✅ {activated_users} usuario(s) pre-registrado(s) activado(s) automáticamente")
-                    
-                    # Enviar notificación al canal de asistencias
-                    try:
-                        channel = bot.get_channel(ATTENDANCE_NOTIFICATION_CHANNEL_ID)
-                        if channel:
-                            start_time_formatted = f"{AUTO_START_HOUR:02d}:{AUTO_START_MINUTE:02d}"
-                    except Exception as e:
-                        print(f"Error enviando notificación de activación: {e}")
-                else:
-                    print("ℹ️ No había usuarios pre-registrados para activar")
-                
-                # Esperar 2 minutos para evitar activaciones múltiples
-                await asyncio.sleep(120)
-            
-            # También verificar si hay pre-registros expirados (después de la hora configurada sin activar)
-            elif current_hour > AUTO_START_HOUR or (current_hour == AUTO_START_HOUR and current_minute > AUTO_START_MINUTE):
-                # Limpiar pre-registros expirados (si quedó alguno)
-                cleaned = time_tracker.clean_expired_preregistrations()
-                if cleaned > 0:
-                    print(f"🧹 {cleaned} pre-registro(s) expirado(s) limpiado(s)")
-        
-        except Exception as e:
-            print(f"❌ Error en monitoreo de pre-registro: {e}")
-            await asyncio.sleep(60)  # Esperar 1 minuto antes de continuar
+async def run_weekly_rollover():
+    """Archivar las asistencias de la semana que cerró y programar el siguiente cierre"""
+    try:
+        rolled = time_tracker.rollover_attendance_week()
+        if rolled:
+            print(f"📅 Semana de asistencias cerrada: {rolled} admin(s) archivado(s)")
+    finally:
+        schedule_weekly_rollover()
+
+async def process_due_preregistrations():
+    """Activar los pre-registros cuya hora ya llegó y descartar los de ventanas ya cerradas.
+
+    Se usa en cada inicio de ventana y al arrancar el bot, para activar lo que se perdió
+    mientras estaba apagado. Sin pre-registros pendientes no se escribe nada en disco.
+    """
+    preregistered_users = time_tracker.get_preregistered_users()
+    if not preregistered_users:
+        return
 
-async def activate_all_preregistrations():
-    """Activar todos los usuarios pre-registrados"""
+    colombia_now = preregistration_schedule.now()
+    window = preregistration_schedule.current_window(colombia_now)
+    due_ids, expired_ids = [], []
+    for user_id_str, prereg_data in preregistered_users.items():
+        try:
+            activate_at = preregistration_activation_time(prereg_data)
+        except ValueError:
+            activate_at = None
+        if activate_at is None:
+            expired_ids.append(user_id_str)
+        elif activate_at <= colombia_now:
+            # Solo se activa si su ventana sigue abierta
+            if window is not None and activate_at >= window[0]:
+                due_ids.append(user_id_str)
+            else:
+                expired_ids.append(user_id_str)
+
+    if due_ids:
+        print(f"🕐 Inicio de ventana {preregistration_schedule.start_label(window[0])} en Colombia. Activando pre-registros...")
+        activated_users = await activate_all_preregistrations(due_ids)
+        if activated_users > 0:
+            print(f"✅ {activated_users} usuario(s) pre-registrado(s) activado(s) automáticamente")
+        # Los que no se pudieron activar (por ejemplo, ya tenían tiempo activo) no se reintentan
+        expired_ids.extend(user_id_str for user_id_str in due_ids
+                           if user_id_str in time_tracker.preregistration_data)
+
+    if expired_ids:
+        cleaned = time_tracker.remove_preregistrations(expired_ids)
+        if cleaned > 0:
+            print(f"🧹 {cleaned} pre-registro(s) expirado(s) limpiado(s)")
+
+async def activate_all_preregistrations(user_ids=None):
+    """Activar los usuarios pre-registrados (todos, o solo `user_ids`)"""
     try:
         preregistered_users = time_tracker.get_preregistered_users()
-        activated_count = 0
-        
-        for user_id_str, prereg_data in preregistered_users.items():
-            try:
-                user_id = int(user_id_str)
-                user_name = prereg_data.get('name', f'Usuario {user_id}')
-                admin_id = prereg_data.get('registered_by_id')
-                admin_name = prereg_data.get('registered_by_name', 'Admin')
-                
-                # Activar el tracking
-                success = time_tracker.activate_preregistration(user_id)
-                if success:
-                    activated_count += 1
-                    print(f"✅ Activado: {user_name} (registrado por {admin_name})")
-                else:
-                    print(f"⚠️ Error activando: {user_name}")
-                    
-            except Exception as e:
-                print(f"Error activando usuario {user_id_str}: {e}")
-        
-        return activated_count
+        if user_ids is None:
+            user_ids = list(preregistered_users)
+
+        # Todos empiezan en el mismo instante y se guardan en una sola escritura
+        started_at = time.time()
+        activated = time_tracker.activate_preregistrations(user_ids, started_at)
+        for user_id_str in activated:
+            prereg_data = preregistered_users[user_id_str]
+            user_name = prereg_data.get('name', f'Usuario {user_id_str}')
+            admin_name = prereg_data.get('registered_by_name', 'Admin')
+            print(f"✅ Activado: {user_name} (registrado por {admin_name})")
+        for user_id_str in set(user_ids) - set(activated):
+            print(f"⚠️ Error activando: {preregistered_users.get(user_id_str, {}).get('name', user_id_str)}")
+
+        # Sus sesiones cumplen la hora a la vez: un solo temporizador para todo el grupo
+        register_milestone_cohort(activated, started_at)
+        return len(activated)
     
     except Exception as e:
         print(f"Error general activando pre-registros: {e}")
@@ -1543,57 +1656,35 @@ async def activate_all_preregistrations():
 async def check_missing_milestones():
     """Verificar y notificar milestones perdidos para todos los usuarios con procesamiento paralelo"""
     try:
-        # Timeout para obtener usuarios
-        tracked_users = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_all_tracked_users),
-            timeout=15.0  # Aumentado timeout inicial
-        )
-
-        # Procesar usuarios con limite aumentado para garantizar todas las confirmaciones
-        max_users_per_cycle = 100  # Aumentado significativamente
-        max_concurrent = 10  # Procesar hasta 10 usuarios en paralelo
+        global last_milestone_sweep_generation
 
-        # Dividir usuarios en chunks para procesamiento paralelo
-        user_items = list(tracked_users.items())[:max_users_per_cycle]
-        
-        async def process_user_chunk(chunk):
-            """Procesar un chunk de usuarios en paralelo"""
-            tasks = []
-            for user_id_str, data in chunk:
-                task = process_single_user_milestone(user_id_str, data)
-                tasks.append(task)
-            
-            # Ejecutar tasks en paralelo con timeout global
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Dividir en chunks pequeños para procesamiento paralelo controlado
-        chunk_size = max_concurrent
-        for i in range(0, len(user_items), chunk_size):
-            chunk = user_items[i:i + chunk_size]
-            try:
-                await asyncio.wait_for(process_user_chunk(chunk), timeout=30.0)
-                # Pausa pequeña entre chunks
-                await asyncio.sleep(0.2)
-            except asyncio.TimeoutError:
-                print(f"⚠️ Timeout procesando chunk {i//chunk_size + 1}")
-                continue
+        # Si no cambió ningún usuario desde la última revisión completa, solo los activos
+        # pueden tener milestones nuevos (su tiempo sigue corriendo)
+        if time_tracker.generation == last_milestone_sweep_generation:
+            user_items = list(time_tracker.iter_active())
+        else:
+            user_items = list(time_tracker.iter_users())
+            last_milestone_sweep_generation = time_tracker.generation
+
+        # Se revisan todos los usuarios del ciclo; el pool limita cuántos van a la vez
+        total_times = time_tracker.get_total_times(user_id_str for user_id_str, _ in user_items)
+        report = await milestone_pool.run_cycle(
+            "Milestones perdidos",
+            user_items,
+            lambda item: process_single_user_milestone(item[0], item[1], total_times[item[0]])
+        )
+        if report.eligible:
+            print(f"✅ {report}")
+        return report
 
-    except asyncio.TimeoutError:
-        print("⚠️ Timeout obteniendo usuarios tracked")
     except Exception as e:
         print(f"❌ Error verificando milestones perdidos: {e}")
 
-async def process_single_user_milestone(user_id_str: str, data: dict):
+async def process_single_user_milestone(user_id_str: str, data: UserRecord, total_time: float):
     """Procesar milestone de un solo usuario con manejo robusto de errores"""
     try:
         user_id = int(user_id_str)
-        user_name = data.get('name', f'Usuario {user_id}')
-
-        # Timeout para obtener tiempo total
-        total_time = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_total_time, user_id),
-            timeout=3.0
-        )
+        user_name = data.name or f'Usuario {user_id}'
 
         # Verificar si el usuario está en el servidor
         guild = None
@@ -1607,7 +1698,7 @@ async def process_single_user_milestone(user_id_str: str, data: dict):
 
         # Para usuarios externos, continuar con verificación
         has_unlimited_role = False
-        is_external_user = data.get('is_external_user', False)
+        is_external_user = data.extra.get('is_external_user', False)
 
         if member:
             try:
@@ -1616,159 +1707,218 @@ async def process_single_user_milestone(user_id_str: str, data: dict):
                 print(f"⚠️ Error verificando rol para {user_name}: {e}")
                 has_unlimited_role = False
 
-        # Asegurar que existe el campo notified_milestones
-        if 'notified_milestones' not in data:
-            data['notified_milestones'] = []
+        if await notify_pending_milestone(user_id, user_name, data, total_time,
+                                          member, is_external_user, has_unlimited_role):
+            # Marcar procesado
+            data.extra['last_milestone_check'] = total_time
+            time_tracker.save_user_data(user_id)
 
-        notified_milestones = data.get('notified_milestones', [])
-        total_hours = int(total_time // 3600)
+    except asyncio.TimeoutError:
+        print(f"⚠️ Timeout procesando usuario {user_id_str}")
+    except Exception as e:
+        print(f"⚠️ Error procesando usuario {user_id_str}: {e}")
 
-        # Verificar milestones perdidos
-        missing_milestones = []
-        for h in range(1, total_hours + 1):
-            milestone = h * 3600
-            if milestone not in notified_milestones:
-                missing_milestones.append((milestone, h))
 
-        # Notificar milestone más alto perdido
-        if missing_milestones:
-            milestone_to_notify, hours_to_notify = missing_milestones[-1]
 
-            # AGREGAR ASISTENCIA ANTES DE DETENER TRACKING
-            if member:
-                await add_attendance_for_milestone(member, hours_to_notify)
+def get_guild_member(user_id: int):
+    """Miembro del servidor, o None si no está (usuarios externos) o no hay guild"""
+    guild = bot.guilds[0] if bot.guilds else None
+    return guild.get_member(user_id) if guild else None
 
-            # Marcar todos los milestones perdidos como notificados
-            for milestone, _ in missing_milestones:
-                if milestone not in notified_milestones:
-                    notified_milestones.append(milestone)
-            data['notified_milestones'] = notified_milestones
+def schedule_session_cap(user_id_str: str, user_data) -> None:
+    """Programar (o cancelar) el temporizador que detiene la sesión al llegar al límite de horas"""
+    key = ("cap", user_id_str)
+    if user_data is not None and user_data.is_active and user_data.last_start is not None:
+        cap_seconds = get_time_cap_hours(get_guild_member(int(user_id_str))) * 3600
+        # El límite se alcanza cuando la sesión completa lo que le faltaba al total guardado
+        timer_scheduler.schedule(
+            key,
+            user_data.last_start + max(0.0, cap_seconds - user_data.total_time),
+            lambda: run_session_cap(user_id_str)
+        )
+    else:
+        timer_scheduler.cancel(key)
 
-            # Guardar datos con timeout corto
-            try:
-                await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.save_data),
-                    timeout=2.0
-                )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Timeout guardando milestones para {user_name}")
+async def run_session_cap(user_id_str: str):
+    """Temporizador vencido: el usuario llegó a su límite de horas, detener la sesión"""
+    user_data = time_tracker.get_user_data(user_id_str)
+    if not user_data or not user_data.is_active:
+        return
 
-            # Detener seguimiento
-            if hours_to_notify >= 1:
-                try:
-                    await asyncio.wait_for(
-                        asyncio.to_thread(time_tracker.stop_tracking, user_id),
-                        timeout=2.0
-                    )
+    user_id = int(user_id_str)
+    member = get_guild_member(user_id)
+    total_time = time_tracker.get_total_time(user_id)
+    max_hours = get_time_cap_hours(member)
+    if total_time < max_hours * 3600:
+        # Cambió el rol desde que se programó: reprogramar con el límite actual
+        schedule_session_cap(user_id_str, user_data)
+        return
+
+    user_name = user_data.name or f'Usuario {user_id}'
+    print(f"⏹️ {user_name} llegó a su límite de {max_hours:g} horas: se detiene su tiempo")
+    has_unlimited_role = member is not None and has_unlimited_time_role(member)
+    # Si el límite coincide con un milestone pendiente se notifica (y eso detiene la sesión)
+    if not await notify_pending_milestone(user_id, user_name, user_data, total_time, member,
+                                          user_data.extra.get('is_external_user', False), has_unlimited_role):
+        time_tracker.stop_tracking(user_id)
+
+def schedule_session_milestone(user_id_str: str, user_data) -> None:
+    """Programar (o cancelar) el temporizador de la sesión de 1 hora de un usuario"""
+    key = ("milestone", user_id_str)
+    if user_data is not None and user_data.is_active and user_data.last_start is not None:
+        deadline = user_data.last_start + SESSION_MILESTONE_SECONDS
+        if milestone_cohort_of.get(user_id_str) == deadline:
+            # Lo cubre el temporizador de su cohorte
+            timer_scheduler.cancel(key)
+            return
+        leave_milestone_cohort(user_id_str)
+        timer_scheduler.schedule(key, deadline, lambda: run_session_milestone(user_id_str))
+    else:
+        leave_milestone_cohort(user_id_str)
+        timer_scheduler.cancel(key)
 
-                    # Marcar como milestone completado para usuarios con rol especial
-                    if has_unlimited_role:
-                        user_data = time_tracker.get_user_data(user_id)
-                        if user_data:
-                            user_data['milestone_completed'] = True
-                            await asyncio.wait_for(
-                                asyncio.to_thread(time_tracker.save_data),
-                                timeout=2.0
-                            )
-                except asyncio.TimeoutError:
-                    print(f"⚠️ Timeout deteniendo tracking para {user_name}")
-
-            # Enviar notificación (esta función ya tiene su propio sistema de retry robusto)
-            await send_milestone_notification(user_name, member, is_external_user, hours_to_notify, total_time)
+def register_milestone_cohort(user_ids, started_at: float) -> None:
+    """Agrupar en un solo temporizador los milestones de usuarios que empezaron juntos"""
+    user_ids = list(user_ids)
+    if len(user_ids) < 2:
+        return
+    deadline = started_at + SESSION_MILESTONE_SECONDS
+    cohort = milestone_cohorts.setdefault(deadline, set())
+    for user_id_str in user_ids:
+        leave_milestone_cohort(user_id_str)
+        cohort.add(user_id_str)
+        milestone_cohort_of[user_id_str] = deadline
+        timer_scheduler.cancel(("milestone", user_id_str))
+    timer_scheduler.schedule(("milestone_cohort", deadline), deadline, lambda: run_milestone_cohort(deadline))
+
+def leave_milestone_cohort(user_id_str: str) -> None:
+    """Sacar a un usuario de su cohorte (pausó, se detuvo o cambió su inicio)"""
+    deadline = milestone_cohort_of.pop(user_id_str, None)
+    if deadline is None:
+        return
+    cohort = milestone_cohorts.get(deadline)
+    if cohort is not None:
+        cohort.discard(user_id_str)
+        if not cohort:
+            del milestone_cohorts[deadline]
+            timer_scheduler.cancel(("milestone_cohort", deadline))
+
+async def run_milestone_cohort(deadline: float):
+    """Temporizador de cohorte: procesar en un solo ciclo del pool las sesiones que cumplen la hora juntas"""
+    user_ids = milestone_cohorts.pop(deadline, set())
+    for user_id_str in user_ids:
+        milestone_cohort_of.pop(user_id_str, None)
+
+    report = await milestone_pool.run_cycle(
+        "Milestones de cohorte",
+        sorted(user_ids),
+        run_session_milestone
+    )
+    if report.eligible:
+        print(f"✅ {report}")
 
-            # Marcar procesado
-            data['last_milestone_check'] = total_time
-            try:
-                await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.save_data),
-                    timeout=2.0
-                )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Timeout guardando última verificación para {user_name}")
+def dispatch_timer(key, callback) -> None:
+    """Los temporizadores de un usuario van al pool; los de grupo corren en su propia task.
 
-    except asyncio.TimeoutError:
-        print(f"⚠️ Timeout procesando usuario {user_id_str}")
-    except Exception as e:
-        print(f"⚠️ Error procesando usuario {user_id_str}: {e}")
+    Los de grupo (cohortes, ventanas de pre-registro) no pueden ocupar un lugar del pool
+    ni quedar sujetos a su timeout por tarea: ellos mismos reparten el trabajo.
+    """
+    if key[0] in ("milestone", "cap"):
+        milestone_pool.submit(key, callback)
+    else:
+        timer_scheduler.spawn(key, callback)
+
+def on_tracked_user_changed(user_id_str) -> None:
+    """Mantener los temporizadores de milestones y de límite de horas al día con cada cambio del tracker"""
+    if user_id_str is None:
+        timer_scheduler.cancel_kind("milestone")
+        timer_scheduler.cancel_kind("cap")
+        for active_id, user_data in time_tracker.iter_active():
+            schedule_session_milestone(active_id, user_data)
+            schedule_session_cap(active_id, user_data)
+    else:
+        user_data = time_tracker.get_user_data(user_id_str)
+        schedule_session_milestone(user_id_str, user_data)
+        schedule_session_cap(user_id_str, user_data)
+
+async def run_session_milestone(user_id_str: str):
+    """Temporizador vencido: el usuario cumplió 1 hora de sesión"""
+    user_data = time_tracker.get_user_data(user_id_str)
+    if not user_data or not user_data.is_active:
+        return
 
+    user_id = int(user_id_str)
+    user_name = user_data.name or f'Usuario {user_id}'
+    try:
+        await check_time_milestone(user_id, user_name)
+    finally:
+        # Si la verificación no pudo cerrar la sesión (error o timeout), reintentar más tarde
+        user_data = time_tracker.get_user_data(user_id_str)
+        if user_data and user_data.is_active and ("milestone", user_id_str) not in timer_scheduler:
+            timer_scheduler.schedule(
+                ("milestone", user_id_str),
+                time.time() + MILESTONE_RETRY_SECONDS,
+                lambda: run_session_milestone(user_id_str)
+            )
 
+async def run_startup_catch_up():
+    """Procesar en un solo lote los milestones de sesión que vencieron con el bot apagado.
 
-async def periodic_milestone_check():
-    """Verificar milestones periódicamente para usuarios activos"""
-    milestone_check_count = 0
+    Los temporizadores se derivan del tracker (last_start), así que no hace falta
+    guardarlos: al arrancar se buscan las sesiones activas ya vencidas y se procesan
+    de la más antigua a la más reciente antes de arrancar timer_scheduler.
+    """
+    global startup_catch_up_report
+    try:
+        await bot.wait_until_ready()
+        # Con los miembros ya cargados, recalcular los límites que dependen del rol
+        on_tracked_user_changed(None)
+        now = time.time()
+        overdue = [(user_data.last_start, user_id_str) for user_id_str, user_data in time_tracker.iter_active()
+                   if user_data.last_start is not None
+                   and user_data.last_start + SESSION_MILESTONE_SECONDS <= now]
+        overdue.sort()
+        # Se procesan aquí; si alguno queda activo, run_session_milestone lo reprograma
+        for _, user_id_str in overdue:
+            timer_scheduler.cancel(("milestone", user_id_str))
+        startup_catch_up_report = await milestone_pool.run_cycle(
+            "Recuperación al iniciar",
+            [user_id_str for _, user_id_str in overdue],
+            run_session_milestone
+        )
+        print(f"✅ {startup_catch_up_report}")
+    except Exception as e:
+        print(f"❌ Error en la recuperación de milestones al iniciar: {e}")
+    finally:
+        startup_catch_up_done.set()
+
+async def run_timers_after_catch_up(job):
+    """Arrancar timer_scheduler cuando termina la recuperación al iniciar"""
+    if not startup_catch_up_done.is_set():
+        await run_startup_catch_up()
+    await timer_scheduler.run(dispatch=dispatch_timer, heartbeat=job.beat)
+
+async def periodic_milestone_check(job):
+    """Verificar milestones perdidos periódicamente.
+
+    Las sesiones de 1 hora no se revisan aquí: las dispara timer_scheduler en su
+    fecha exacta.
+    """
     error_count = 0
     max_errors = 5
 
+    # No competir con la recuperación al iniciar por los mismos usuarios
+    await startup_catch_up_done.wait()
+
     while True:
         try:
-            await asyncio.sleep(5)  # Verificar cada 5 segundos
-            milestone_check_count += 1
-
-            # Verificar milestones perdidos cada 12 ciclos (cada minuto)
-            if milestone_check_count % 12 == 1:
-                try:
-                    await asyncio.wait_for(check_missing_milestones(), timeout=30.0)
-                except asyncio.TimeoutError:
-                    print("⚠️ Timeout en verificación de milestones perdidos")
-                except Exception as e:
-                    print(f"⚠️ Error en verificación de milestones perdidos: {e}")
-
-            # Verificar usuarios activos para sesiones de 1 hora con procesamiento paralelo
-            try:
-                tracked_users = await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.get_all_tracked_users),
-                    timeout=15.0
-                )
-
-                # Filtrar solo usuarios activos
-                active_users = [
-                    (user_id_str, data) for user_id_str, data in tracked_users.items()
-                    if data.get('is_active', False) and not data.get('is_paused', False)
-                ]
-
-                max_active_users = 80  # Aumentado significativamente
-                active_users = active_users[:max_active_users]
-
-                # Procesar usuarios activos en paralelo (chunks de 5)
-                chunk_size = 5
-                for i in range(0, len(active_users), chunk_size):
-                    chunk = active_users[i:i + chunk_size]
-                    
-                    # Crear tasks para procesamiento paralelo
-                    tasks = []
-                    for user_id_str, data in chunk:
-                        try:
-                            user_id = int(user_id_str)
-                            user_name = data.get('name', f'Usuario {user_id}')
-                            
-                            # Crear task con timeout individual
-                            task = asyncio.wait_for(
-                                check_time_milestone(user_id, user_name),
-                                timeout=15.0
-                            )
-                            tasks.append(task)
-                        except Exception as e:
-                            print(f"⚠️ Error creando task para usuario {user_id_str}: {e}")
-
-                    if tasks:
-                        # Ejecutar chunk en paralelo
-                        try:
-                            await asyncio.gather(*tasks, return_exceptions=True)
-                        except Exception as e:
-                            print(f"⚠️ Error en procesamiento paralelo de chunk: {e}")
-                        
-                        # Pausa pequeña entre chunks
-                        await asyncio.sleep(0.3)
-
-                print(f"✅ Verificados {len(active_users)} usuarios activos en chunks paralelos")
-
-            except asyncio.TimeoutError:
-                print("⚠️ Timeout obteniendo usuarios activos")
-            except Exception as e:
-                print(f"⚠️ Error obteniendo usuarios activos: {e}")
+            cycle_start = time.monotonic()
+            await check_missing_milestones()
+            job.beat(time.monotonic() - cycle_start)
 
             # Reset contador de errores si el ciclo fue exitoso
             error_count = 0
+            await asyncio.sleep(MISSING_MILESTONES_CHECK_SECONDS)
 
         except Exception as e:
             error_count += 1
@@ -1783,17 +1933,51 @@ async def periodic_milestone_check():
                 sleep_time = min(10 * (2 ** error_count), 60)
                 await asyncio.sleep(sleep_time)
 
+async def periodic_data_flush(job):
+    """Escribir los cambios pendientes del tracker cuando corresponda (write-behind)"""
+    while True:
+        try:
+            await asyncio.sleep(DATA_FLUSH_CHECK_SECONDS)
+            flush_start = time.monotonic()
+            if time_tracker.flush_due():
+                written = time_tracker.flush()
+                print(f"💾 Guardados {written} cambio(s) pendientes")
+            job.beat(time.monotonic() - flush_start)
+        except Exception as e:
+            print(f"❌ Error guardando cambios pendientes: {e}")
+
 # Iniciar la verificación periódica después de definir la función
 async def start_periodic_checks():
-    """Iniciar la verificación periódica de milestones y pre-registro"""
-    global milestone_check_task, daily_preregistration_task
-    if milestone_check_task is None:
-        milestone_check_task = bot.loop.create_task(periodic_milestone_check())
-        print('✅ Task de verificación de milestones iniciado')
-    
-    if daily_preregistration_task is None:
-        daily_preregistration_task = bot.loop.create_task(daily_preregistration_monitor())
-        print('✅ Task de pre-registro diario iniciado')
+    """Iniciar la verificación periódica de milestones, pre-registro y guardado de datos.
+
+    Se llama en cada conexión; lo que ya está corriendo no se vuelve a lanzar.
+    """
+    if "temporizadores" not in task_supervisor.jobs:
+        time_tracker.add_user_listener(on_tracked_user_changed)
+        on_tracked_user_changed(None)
+        print(f'✅ Temporizadores de milestones programados: {len(timer_scheduler)}')
+        # Los temporizadores vencidos se procesan en el pool, así una ola de vencimientos
+        # simultáneos no lanza cientos de llamadas a Discord a la vez
+        task_supervisor.register("temporizadores", run_timers_after_catch_up, stall_after=300)
+        # Un ciclo de milestones perdidos puede tardar (timeout de 15s por usuario en el pool)
+        task_supervisor.register("milestones perdidos", periodic_milestone_check, stall_after=1800)
+        if time_tracker.save_interval > 0:
+            task_supervisor.register("guardado diferido", periodic_data_flush, stall_after=300)
+        task_supervisor.register("notificaciones", lambda job: notification_outbox.run(heartbeat=job.beat), stall_after=300)
+        task_supervisor.register("tablero en vivo", lambda job: live_board.run(heartbeat=job.beat), stall_after=300)
+
+    if ("preregistration",) not in timer_scheduler:
+        # Primero se activa lo que venció con el bot apagado, después se espera el próximo inicio
+        await process_due_preregistrations()
+        schedule_preregistration_activation()
+        print(f'✅ Activación de pre-registros programada ({preregistration_schedule.describe()} Colombia)')
+
+    if ("weekly_rollover",) not in timer_scheduler:
+        # Si el bot estuvo apagado al cambiar la semana, archivarla ahora
+        await run_weekly_rollover()
+
+    for name in task_supervisor.start():
+        print(f'✅ Trabajo en segundo plano iniciado: {name}')
 
 
 
@@ -1827,11 +2011,11 @@ async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.
     # Verificar si el usuario tiene rol especial
     has_special_role = has_unlimited_time_role(usuario)
 
-    status = "🟢 Activo" if user_data.get('is_active', False) else "🔴 Inactivo"
-    if user_data.get('is_paused', False):
+    status = "🟢 Activo" if user_data.is_active else "🔴 Inactivo"
+    if user_data.is_paused:
         total_hours = total_time / 3600
         # Verificar si completó milestone y debe mostrar como "Terminado"
-        if user_data.get("milestone_completed", False) or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
+        if user_data.milestone_completed or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
             status = "✅ Terminado"
         else:
             status = "⏸️ Pausado"
@@ -1839,7 +2023,7 @@ async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.
     embed.add_field(name="📍 Estado", value=status, inline=True)
 
     # Mostrar tiempo pausado si está pausado
-    if user_data.get('is_paused', False):
+    if user_data.is_paused:
         paused_duration = time_tracker.get_paused_duration(usuario.id)
         formatted_paused_time = time_tracker.format_time_human(paused_duration) if paused_duration > 0 else "0 Segundos"
         embed.add_field(
@@ -2200,6 +2384,14 @@ async def ver_roles_usuario(interaction: discord.Interaction, usuario: discord.M
         )
         print(f"Error obteniendo roles de usuario: {e}")
 
+def format_weekly_history(admin_id: int, weeks: int = 4) -> str:
+    """Asistencias de las últimas semanas cerradas, de la más reciente a la más antigua"""
+    history = time_tracker.get_weekly_history(admin_id)
+    if not history:
+        return ""
+    recent = sorted(history.items(), reverse=True)[:weeks]
+    return "\n".join(f"**{week}:** {count}/15" for week, count in recent)
+
 @bot.tree.command(name="mis_asistencias", description="Ver tus propias asistencias")
 async def mis_asistencias(interaction: discord.Interaction):
     """Ver tus propias asistencias"""
@@ -2242,6 +2434,11 @@ async def mis_asistencias(interaction: discord.Interaction):
         # Información del rol
         embed.add_field(name="🎭 Rol", value=role_info.strip("()") if role_info else "Sin rol específico", inline=False)
 
+        # Semanas anteriores (archivadas en cada cierre de semana)
+        history_text = format_weekly_history(interaction.user.id)
+        if history_text:
+            embed.add_field(name="🗓️ Semanas Anteriores", value=history_text, inline=False)
+
         # Determinar créditos semanales según el rol
         role_type = get_user_role_type(member)
         weekly_credits = 0
@@ -2360,6 +2557,11 @@ async def ver_asistencias_admin(interaction: discord.Interaction, usuario: disco
         # Información del rol
         embed.add_field(name="🎭 Rol", value=role_info.strip("()") if role_info else "Sin rol específico", inline=False)
 
+        # Semanas anteriores (archivadas en cada cierre de semana)
+        history_text = format_weekly_history(usuario.id)
+        if history_text:
+            embed.add_field(name="🗓️ Semanas Anteriores", value=history_text, inline=False)
+
         # Determinar créditos semanales según el rol
         role_type = get_user_role_type(usuario)
         weekly_credits = 0
@@ -3032,13 +3234,13 @@ class PaymentView(discord.ui.View):
                 total_credits += credits
 
                 # Determinar estado
-                data = user_data.get('data', {})
+                data = user_data['data']
                 status = "🔴 Inactivo"
-                if data.get('is_active', False):
+                if data.is_active:
                     status = "🟢 Activo"
-                elif data.get('is_paused', False):
+                elif data.is_paused:
                     total_hours = total_time / 3600
-                    if (data.get("milestone_completed", False) or 
+                    if (data.milestone_completed or 
                         (user_data.get('has_special_role', False) and total_hours >= 4.0) or 
                         (not user_data.get('has_special_role', False) and total_hours >= 2.0)):
                         status = "✅ Terminado"
@@ -3142,10 +3344,10 @@ class SearchUserModal(discord.ui.Modal, title='Buscar Usuario'):
 def get_users_by_role_filter(role_filter_func, role_name: str, interaction: discord.Interaction):
     """Función auxiliar para obtener usuarios filtrados por rol"""
     try:
-        tracked_users = time_tracker.get_all_tracked_users()
         filtered_users = []
+        now = time.time()
 
-        for user_id_str, data in tracked_users.items():
+        for user_id_str, data in time_tracker.iter_users():
             try:
                 user_id = int(user_id_str)
                 member = interaction.guild.get_member(user_id) if interaction.guild else None
@@ -3154,7 +3356,7 @@ def get_users_by_role_filter(role_filter_func, role_name: str, interaction: disc
                 if not role_filter_func(member, data):
                     continue
 
-                total_time = time_tracker.get_total_time(user_id)
+                total_time = time_tracker.get_total_time(user_id, now)
                 
                 # Solo incluir usuarios con tiempo > 0
                 if total_time <= 0:
@@ -3173,7 +3375,7 @@ def get_users_by_role_filter(role_filter_func, role_name: str, interaction: disc
 
                 user_info = {
                     'user_id': user_id,
-                    'name': data.get('name', f'Usuario {user_id}'),
+                    'name': data.name or f'Usuario {user_id}',
                     'total_time': total_time,
                     'credits': credits,
                     'role_type': role_type,
@@ -3305,10 +3507,10 @@ async def paga_cargos(interaction: discord.Interaction):
 
     # Obtener usuarios con cargos altos
     try:
-        tracked_users = time_tracker.get_all_tracked_users()
         filtered_users = []
+        now = time.time()
 
-        for user_id_str, data in tracked_users.items():
+        for user_id_str, data in time_tracker.iter_users():
             try:
                 user_id = int(user_id_str)
                 member = interaction.guild.get_member(user_id) if interaction.guild else None
@@ -3317,7 +3519,7 @@ async def paga_cargos(interaction: discord.Interaction):
                 if not filter_high_rank_users(member, data):
                     continue
 
-                total_time = time_tracker.get_total_time(user_id)
+                total_time = time_tracker.get_total_time(user_id, now)
                 
                 # Incluir usuarios con cargos altos aunque no tengan tiempo
                 # porque reciben créditos por asistencias
@@ -3349,7 +3551,7 @@ async def paga_cargos(interaction: discord.Interaction):
 
                 user_info = {
                     'user_id': user_id,
-                    'name': data.get('name', f'Usuario {user_id}'),
+                    'name': data.name or f'Usuario {user_id}',
                     'total_time': total_time,
                     'credits': total_credits_earned,
                     'role_type': role_type,
@@ -3519,7 +3721,7 @@ async def ligar_tiempo(interaction: discord.Interaction, usuario: discord.Member
         
         # Verificar si está terminado
         is_finished = False
-        if user_data.get("milestone_completed", False):
+        if user_data.milestone_completed:
             is_finished = True
         elif has_special_role and total_hours >= 4.0:
             is_finished = True
@@ -3537,7 +3739,7 @@ async def ligar_tiempo(interaction: discord.Interaction, usuario: discord.Member
             return
 
         # Verificar que el tiempo esté activo
-        if not user_data.get('is_active', False):
+        if not user_data.is_active:
             await interaction.response.send_message(
                 f"❌ {usuario.mention} no tiene tiempo activo para ligar\n"
                 f"💡 Solo se pueden ligar tiempos que estén corriendo actualmente",
@@ -3550,7 +3752,7 @@ async def ligar_tiempo(interaction: discord.Interaction, usuario: discord.Member
             linked_info = time_tracker.get_linked_user(usuario.id)
             if linked_info:
                 await interaction.response.send_message(
-                    f"❌ El tiempo de {usuario.mention} ya está ligado a **{linked_info['admin_name']}**\n"
+                    f"❌ El tiempo de {usuario.mention} ya está ligado a **{linked_info.admin_name}**\n"
                     f"💡 Usa `/desligar_tiempo` primero para cambiar el ligado",
                     ephemeral=True
                 )
@@ -3642,38 +3844,34 @@ async def desligar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
 async def send_link_notification(admin_member: discord.Member, user_member: discord.Member, action: str):
     """Enviar notificación de ligado/desligado al canal de asistencias"""
     try:
-        channel = bot.get_channel(ATTENDANCE_NOTIFICATION_CHANNEL_ID)
-        if channel:
-            admin_role = get_role_info(admin_member)
-            
-            if action == "ligado":
-                message = (f"🔗 **TIEMPO LIGADO**\n"
-                          f"{admin_member.mention}{admin_role} ha **ligado** el tiempo de {user_member.mention}\n"
-                          f"💡 Las asistencias de {user_member.mention} ahora irán para {admin_member.mention}")
-            else:  # desligado
-                message = (f"🔓 **TIEMPO DESLIGADO**\n"
-                          f"{admin_member.mention}{admin_role} ha **desligado** el tiempo de {user_member.mention}\n"
-                          f"💡 Las asistencias de {user_member.mention} vuelven a la normalidad")
-
-            await channel.send(message)
-            print(f"✅ Notificación de {action} enviada: {admin_member.display_name} -> {user_member.display_name}")
+        admin_role = get_role_info(admin_member)
+
+        if action == "ligado":
+            message = (f"🔗 **TIEMPO LIGADO**\n"
+                      f"{admin_member.mention}{admin_role} ha **ligado** el tiempo de {user_member.mention}\n"
+                      f"💡 Las asistencias de {user_member.mention} ahora irán para {admin_member.mention}")
+        else:  # desligado
+            message = (f"🔓 **TIEMPO DESLIGADO**\n"
+                      f"{admin_member.mention}{admin_role} ha **desligado** el tiempo de {user_member.mention}\n"
+                      f"💡 Las asistencias de {user_member.mention} vuelven a la normalidad")
+
+        notification_outbox.enqueue(ATTENDANCE_NOTIFICATION_CHANNEL_ID, "link", message)
+        print(f"✅ Notificación de {action} encolada: {admin_member.display_name} -> {user_member.display_name}")
     except Exception as e:
         print(f"Error enviando notificación de {action}: {e}")
 
 async def send_auto_link_notification(admin_member: discord.Member, user_member: discord.Member, current_time: str):
     """Enviar notificación de auto-ligado por cargo alto"""
     try:
-        channel = bot.get_channel(ATTENDANCE_NOTIFICATION_CHANNEL_ID)
-        if channel:
-            admin_role = get_role_info(admin_member)
-            
-            message = (f"🔗 **TIEMPO AUTO-LIGADO** (Cargo Alto)\n"
-                      f"{admin_member.mention}{admin_role} inició el tiempo de {user_member.mention} a las **{current_time}** (Colombia)\n"
-                      f"⚡ **Auto-ligado activado:** Las asistencias de {user_member.mention} irán para {admin_member.mention}\n"
-                      f"💡 Usa `/desligar_tiempo` si necesitas cambiar esto")
+        admin_role = get_role_info(admin_member)
 
-            await channel.send(message)
-            print(f"✅ Notificación de auto-ligado enviada: {admin_member.display_name} -> {user_member.display_name} ({current_time} Colombia)")
+        message = (f"🔗 **TIEMPO AUTO-LIGADO** (Cargo Alto)\n"
+                  f"{admin_member.mention}{admin_role} inició el tiempo de {user_member.mention} a las **{current_time}** (Colombia)\n"
+                  f"⚡ **Auto-ligado activado:** Las asistencias de {user_member.mention} irán para {admin_member.mention}\n"
+                  f"💡 Usa `/desligar_tiempo` si necesitas cambiar esto")
+
+        notification_outbox.enqueue(ATTENDANCE_NOTIFICATION_CHANNEL_ID, "link", message)
+        print(f"✅ Notificación de auto-ligado encolada: {admin_member.display_name} -> {user_member.display_name} ({current_time} Colombia)")
     except Exception as e:
         print(f"Error enviando notificación de auto-ligado: {e}")
 
@@ -3729,6 +3927,38 @@ async def diagnostico_bot(interaction: discord.Interaction):
                     inline=False
                 )
 
+        # Temporizadores y recuperación al iniciar
+        if startup_catch_up_report is not None:
+            catch_up_text = (f"{startup_catch_up_report.processed}/{startup_catch_up_report.eligible} "
+                             f"sesiones en {startup_catch_up_report.duration:.1f}s")
+        else:
+            catch_up_text = "en curso" if not startup_catch_up_done.is_set() else "sin datos"
+        embed.add_field(
+            name="⏱️ Temporizadores",
+            value=f"Programados: {len(timer_scheduler)}\n"
+                  f"Recuperación al iniciar: {catch_up_text}\n"
+                  f"Concurrencia de milestones: {milestone_pool.limit}",
+            inline=False
+        )
+
+        embed.add_field(
+            name="📨 Notificaciones",
+            value=f"{notification_outbox.status()}\nCanales: {channel_registry.status()}",
+            inline=False
+        )
+
+        embed.add_field(
+            name="📺 Tablero en vivo",
+            value=live_board.status(),
+            inline=False
+        )
+
+        embed.add_field(
+            name="🩺 Trabajos en segundo plano",
+            value="\n".join(task_supervisor.status()) or "Ninguno iniciado",
+            inline=False
+        )
+
         embed.add_field(
             name="💡 Solución a 'Integración desconocida'",
             value="1. Espera 1-5 minutos\n"
@@ -3787,11 +4017,11 @@ async def mi_tiempo(interaction: discord.Interaction):
     # Verificar si el usuario tiene rol especial (ya tenemos el member object)
     has_special_role = has_unlimited_time_role(member)
 
-    status = "🟢 Activo" if user_data.get('is_active', False) else "🔴 Inactivo"
-    if user_data.get('is_paused', False):
+    status = "🟢 Activo" if user_data.is_active else "🔴 Inactivo"
+    if user_data.is_paused:
         total_hours = total_time / 3600
         # Verificar si completó milestone y debe mostrar como "Terminado"
-        if user_data.get("milestone_completed", False) or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
+        if user_data.milestone_completed or (has_special_role and total_hours >= 4.0) or (not has_special_role and total_hours >= 2.0):
             status = "✅ Terminado"
         else:
             status = "⏸️ Pausado"
@@ -3819,8 +4049,8 @@ async def mi_tiempo(interaction: discord.Interaction):
 
 
 
-    if user_data.get('last_start'):
-        last_start = datetime.fromisoformat(user_data['last_start'])
+    if user_data.last_start is not None:
+        last_start = datetime.fromtimestamp(user_data.last_start)
         embed.add_field(
             name="🕐 Última Sesión Iniciada",
             value=last_start.strftime("%d/%m/%Y %H:%M:%S"),
@@ -4183,6 +4413,26 @@ async def mi_tiempo_error(interaction: discord.Interaction, error: discord.app_c
 
 
 
+persistence_closed = False
+
+def shutdown_persistence():
+    """Escribir los cambios pendientes y cerrar los archivos; solo actúa la primera vez.
+
+    Se llama desde bot.close() y al terminar el proceso (atexit), así también cubre a
+    main.py y start.py, que importan este módulo en lugar de ejecutarlo.
+    """
+    global persistence_closed
+    if persistence_closed:
+        return
+    persistence_closed = True
+    pending = time_tracker.pending_changes()
+    time_tracker.close()
+    notification_outbox.close()
+    if pending:
+        print(f"💾 Guardados {pending} cambio(s) pendientes antes de cerrar")
+
+atexit.register(shutdown_persistence)
+
 if __name__ == "__main__":
     print("🤖 Iniciando Discord Time Tracker Bot...")
     print("📋 Cargando configuración...")
@@ -4203,4 +4453,7 @@ if __name__ == "__main__":
         print("🛑 Bot detenido por el usuario")
     except Exception as e:
         print(f"❌ Error al iniciar el bot: {e}")
-        print("   Revisa la configuración y vuelve a intentar")
\ No newline at end of file
+        print("   Revisa la configuración y vuelve a intentar")
+    finally:
+        # Por si el bot no llegó a cerrarse (por ejemplo, si falló el login)
+        shutdown_persistence()
\ No newline at end of file
@@ -0,0 +1,85 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
+
+
+class ChannelRegistry:
+    """Canales de notificación ya resueltos, por ID.
+
+    Se llena una vez en on_ready con los canales configurados (refresh) y se mantiene
+    al día con los eventos de actualización y borrado de canales. Si un canal no está
+    en la caché del cliente se consulta una sola vez a la API (fetch); si tampoco
+    existe ahí se recuerda como faltante hasta el próximo refresh, para no repetir la
+    consulta en cada mensaje.
+    """
+
+    def __init__(self, get_channel: Callable[[int], Any], fetch_channel: Callable[[int], Awaitable[Any]],
+                 not_found_errors: Tuple[Type[Exception], ...] = ()):
+        self.get_channel = get_channel
+        self.fetch_channel = fetch_channel
+        self.not_found_errors = not_found_errors
+        self.names: Dict[int, str] = {}
+        self._channels: Dict[int, Any] = {}
+        self._missing: Set[int] = set()
+        self.fetches = 0
+
+    def configure(self, channel_ids: Dict[str, Optional[int]]) -> None:
+        """Definir los canales conocidos: nombre -> ID (los IDs vacíos se ignoran)"""
+        self.names = {int(channel_id): name for name, channel_id in channel_ids.items() if channel_id}
+
+    async def refresh(self) -> List[str]:
+        """Resolver todos los canales configurados; devuelve los nombres que no se encontraron"""
+        self._channels.clear()
+        self._missing.clear()
+        missing = []
+        for channel_id, name in self.names.items():
+            if await self.resolve(channel_id) is None:
+                missing.append(name)
+        return missing
+
+    def update(self, channel: Any) -> None:
+        """Reemplazar el canal guardado cuando Discord avisa que cambió"""
+        if channel.id in self._channels or channel.id in self.names:
+            self._channels[channel.id] = channel
+            self._missing.discard(channel.id)
+
+    def remove(self, channel_id: int) -> None:
+        """Olvidar un canal borrado; los envíos siguientes fallan sin consultar la API"""
+        if self._channels.pop(channel_id, None) is not None or channel_id in self.names:
+            self._missing.add(channel_id)
+
+    def get(self, channel_id: int) -> Optional[Any]:
+        """Versión sin await de resolve: solo usa lo guardado y la caché del cliente"""
+        channel = self._channels.get(channel_id)
+        if channel is None and channel_id not in self._missing:
+            channel = self.get_channel(channel_id)
+            if channel is not None:
+                self._channels[channel_id] = channel
+        return channel
+
+    async def resolve(self, channel_id: int) -> Optional[Any]:
+        channel = self._channels.get(channel_id)
+        if channel is not None:
+            return channel
+        if channel_id in self._missing:
+            return None
+
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            self.fetches += 1
+            try:
+                channel = await self.fetch_channel(channel_id)
+            except self.not_found_errors:
+                channel = None
+
+        if channel is None:
+            self._missing.add(channel_id)
+        else:
+            self._channels[channel_id] = channel
+        return channel
+
+    def status(self) -> str:
+        resolved = [name for channel_id, name in self.names.items() if channel_id in self._channels]
+        missing = [name for channel_id, name in self.names.items() if channel_id in self._missing]
+        text = f"Resueltos: {len(resolved)}/{len(self.names)} | Consultas a la API: {self.fetches}"
+        if missing:
+            text += f" | Faltan: {', '.join(missing)}"
+        return text
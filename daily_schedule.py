@@ -0,0 +1,107 @@
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _parse_clock(value: str) -> Tuple[int, int]:
+    """Convertir 'HH:MM' a (hora, minuto); '24:00' es el final del día"""
+    hour, minute = (int(part) for part in value.split(':'))
+    if not (0 <= hour <= 24 and 0 <= minute <= 59) or (hour == 24 and minute != 0):
+        raise ValueError(f"Hora inválida: {value}")
+    return hour, minute
+
+
+def next_week_start(tz, now: datetime) -> datetime:
+    """Próximo lunes a las 00:00 en la zona horaria `tz` (inicio de la siguiente semana ISO)"""
+    local = now.astimezone(tz)
+    monday = local.date() - timedelta(days=local.weekday()) + timedelta(days=7)
+    return tz.localize(datetime.combine(monday, dtime()))
+
+
+class DailyWindow:
+    """Ventana diaria de inicio de tiempos: empieza a `start` y dura `duration`.
+
+    Si el final es igual o anterior al inicio, la ventana termina al día siguiente.
+    """
+    __slots__ = ('start', 'duration')
+
+    def __init__(self, start: dtime, duration: timedelta):
+        self.start = start
+        self.duration = duration
+
+    @classmethod
+    def from_config(cls, data: Dict[str, Any]) -> "DailyWindow":
+        """Crear desde config.json: {"start": "20:16", "end": "24:00"} (end es opcional)"""
+        start_hour, start_minute = _parse_clock(data['start'])
+        end_hour, end_minute = _parse_clock(data.get('end', '24:00'))
+        minutes = (end_hour * 60 + end_minute) - (start_hour * 60 + start_minute)
+        if minutes <= 0:
+            minutes += 24 * 60
+        return cls(dtime(start_hour, start_minute), timedelta(minutes=minutes))
+
+    @property
+    def label(self) -> str:
+        return f"{self.start.hour:02d}:{self.start.minute:02d}"
+
+
+class DailySchedule:
+    """Horario diario de activación de pre-registros en una zona horaria.
+
+    Fuera de las ventanas los tiempos se pre-registran y se activan al inicio de la
+    siguiente; dentro de una ventana se inician de inmediato. Las fechas se calculan
+    con la zona horaria (pytz), no con el reloj del servidor.
+    """
+
+    def __init__(self, tz, windows: List[DailyWindow]):
+        if not windows:
+            raise ValueError("El horario necesita al menos una ventana")
+        self.tz = tz
+        self.windows = sorted(windows, key=lambda window: window.start)
+
+    @classmethod
+    def from_config(cls, tz, data: Dict[str, Any], default_start: str = "20:16") -> "DailySchedule":
+        """Crear desde la sección `preregistration` de config.json"""
+        windows = [DailyWindow.from_config(window) for window in data.get('windows', [])]
+        return cls(tz, windows or [DailyWindow.from_config({'start': default_start})])
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def _occurrences(self, around: datetime) -> List[Tuple[datetime, datetime, DailyWindow]]:
+        """Ventanas (inicio, fin) del día anterior, el actual y el siguiente, ordenadas"""
+        local = around.astimezone(self.tz)
+        occurrences = []
+        for day_offset in (-1, 0, 1):
+            day = local.date() + timedelta(days=day_offset)
+            for window in self.windows:
+                start = self.tz.localize(datetime.combine(day, window.start))
+                occurrences.append((start, start + window.duration, window))
+        occurrences.sort(key=lambda occurrence: occurrence[0])
+        return occurrences
+
+    def current_window(self, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+        """Ventana (inicio, fin) abierta en `now`, o None"""
+        now = now or self.now()
+        current = None
+        for start, end, _ in self._occurrences(now):
+            if start <= now < end:
+                current = (start, end)
+        return current
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        return self.current_window(now) is not None
+
+    def next_start(self, now: Optional[datetime] = None) -> datetime:
+        """Próximo inicio de ventana estrictamente posterior a `now`"""
+        now = now or self.now()
+        for start, _, _ in self._occurrences(now):
+            if start > now:
+                return start
+        # Con ventanas de un día siempre hay una en el día siguiente
+        raise RuntimeError("No se encontró el próximo inicio")
+
+    def start_label(self, start: datetime) -> str:
+        """Hora local 'HH:MM' de un inicio de ventana"""
+        return start.astimezone(self.tz).strftime('%H:%M')
+
+    def describe(self) -> str:
+        return ", ".join(window.label for window in self.windows)
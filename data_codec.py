@@ -0,0 +1,83 @@
+import gzip
+import json
+from typing import Any, Callable, Optional
+
+# Codecs opcionales: se usan solo si están instalados
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+CODECS = ('json', 'json-pretty', 'orjson', 'msgpack')
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def available_codecs() -> list:
+    """Codecs que se pueden usar con las librerías instaladas"""
+    available = ['json', 'json-pretty']
+    if orjson is not None:
+        available.append('orjson')
+    if msgpack is not None:
+        available.append('msgpack')
+    return available
+
+
+def resolve_codec(name: str) -> str:
+    """Validar el codec configurado; si su librería no está instalada se usa json compacto"""
+    if name not in CODECS:
+        print(f"⚠️ Codec desconocido '{name}', se usa json")
+        return 'json'
+    if name not in available_codecs():
+        print(f"⚠️ El codec '{name}' no está instalado (pip install {name}), se usa json")
+        return 'json'
+    return name
+
+
+def encode(data: Any, codec: str = 'json', compress: bool = False,
+           default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serializar datos con el codec indicado y opcionalmente comprimir con gzip.
+
+    `default` convierte los objetos que el codec no sabe serializar (igual que en json.dumps).
+    """
+    if codec == 'orjson':
+        raw = orjson.dumps(data, default=default)
+    elif codec == 'msgpack':
+        raw = msgpack.packb(data, default=default, use_bin_type=True)
+    elif codec == 'json-pretty':
+        raw = json.dumps(data, indent=2, ensure_ascii=False, default=default).encode('utf-8')
+    else:
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=default).encode('utf-8')
+
+    if compress:
+        raw = gzip.compress(raw, compresslevel=6)
+    return raw
+
+
+def decode(raw: bytes) -> Any:
+    """Deserializar detectando el formato (gzip, JSON o msgpack).
+
+    La detección permite cambiar de codec sin migrar archivos: el siguiente guardado
+    completo ya usa el codec nuevo.
+    """
+    if raw[:2] == _GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+
+    stripped = raw.lstrip()
+    if not stripped:
+        return {}
+
+    if stripped[:1] in (b'{', b'['):
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw.decode('utf-8'))
+
+    if msgpack is None:
+        raise ValueError("El archivo está en formato msgpack pero msgpack no está instalado")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
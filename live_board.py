@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from storage import write_file_atomic
+
+
+class LiveBoard:
+    """Un mensaje fijo por canal con el estado de los tiempos, editado en lugar de
+    enviar uno nuevo.
+
+    Los cambios del tracker solo marcan el tablero como pendiente (mark_dirty); run()
+    lo vuelve a dibujar como mucho cada `min_interval` segundos, así una ráfaga de
+    cambios termina en una sola edición. `render` arma el texto de un canal y
+    `publish` edita su mensaje (o lo crea si no existe) y devuelve su ID. Si el texto
+    tiene el mismo hash que el último publicado no se toca Discord; si `publish` falla
+    el tablero queda pendiente y se reintenta pasado `min_interval`. Los canales y sus
+    mensajes se guardan en `state_file` para seguir editando los mismos tras reiniciar.
+    """
+
+    def __init__(self, render: Callable[[int], str],
+                 publish: Callable[[int, Optional[int], str], Awaitable[int]],
+                 state_file: str = "live_board.json", min_interval: float = 30.0):
+        self.render = render
+        self.publish = publish
+        self.state_file = state_file
+        self.min_interval = min_interval
+        # Canal -> ID del mensaje del tablero (None hasta publicarlo)
+        self.channels: Dict[int, Optional[int]] = {}
+        self._hashes: Dict[int, str] = {}
+        self._dirty = asyncio.Event()
+        self._last_render = 0.0
+        self.renders = 0
+        self.edits = 0
+        self.skipped = 0
+        self.failures = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.channels = {int(channel_id): message_id for channel_id, message_id in data.get('channels', {}).items()}
+        except Exception as e:
+            print(f"Error cargando el tablero en vivo: {e}")
+
+    def _save(self) -> None:
+        content = json.dumps({'channels': {str(channel_id): message_id
+                                           for channel_id, message_id in self.channels.items()}})
+        try:
+            write_file_atomic(self.state_file, content.encode('utf-8'))
+        except Exception as e:
+            print(f"Error guardando el tablero en vivo: {e}")
+
+    def add_channel(self, channel_id: int) -> None:
+        """Publicar el tablero en `channel_id` (si ya estaba, se vuelve a dibujar)"""
+        self.channels.setdefault(channel_id, None)
+        self._hashes.pop(channel_id, None)
+        self._save()
+        self.mark_dirty()
+
+    def remove_channel(self, channel_id: int) -> bool:
+        """Dejar de actualizar el tablero de `channel_id`; el mensaje queda como está"""
+        if channel_id not in self.channels:
+            return False
+        del self.channels[channel_id]
+        self._hashes.pop(channel_id, None)
+        self._save()
+        return True
+
+    def mark_dirty(self, *_: Any) -> None:
+        """Marcar el tablero como pendiente; sirve como listener de usuarios del tracker"""
+        if self.channels:
+            self._dirty.set()
+
+    async def refresh(self) -> int:
+        """Dibujar todos los canales y publicar los que cambiaron; devuelve cuántos se editaron"""
+        edited = 0
+        failed = False
+        channels_changed = False
+        for channel_id, message_id in list(self.channels.items()):
+            body = self.render(channel_id)
+            self.renders += 1
+            digest = hashlib.sha1(body.encode('utf-8')).hexdigest()
+            if self._hashes.get(channel_id) == digest and message_id is not None:
+                self.skipped += 1
+                continue
+            try:
+                new_message_id = await self.publish(channel_id, message_id, body)
+            except Exception as e:
+                print(f"⚠️ Error actualizando el tablero en vivo del canal {channel_id}: {e}")
+                # Sin guardar el hash el canal se vuelve a publicar en el próximo intento
+                self.failures += 1
+                failed = True
+                continue
+            if channel_id not in self.channels:
+                # Se desactivó mientras se publicaba
+                continue
+            self._hashes[channel_id] = digest
+            self.edits += 1
+            edited += 1
+            if new_message_id != message_id:
+                self.channels[channel_id] = new_message_id
+                channels_changed = True
+
+        if channels_changed:
+            self._save()
+        if failed:
+            # run() espera min_interval desde este dibujo antes de reintentar
+            self._dirty.set()
+        return edited
+
+    async def run(self, heartbeat: Optional[Callable[[], None]] = None, heartbeat_interval: float = 60.0) -> None:
+        """Redibujar cuando hay cambios, como mucho una vez cada `min_interval` segundos"""
+        self.mark_dirty()
+        while True:
+            if heartbeat is not None:
+                heartbeat()
+            try:
+                await asyncio.wait_for(self._dirty.wait(), heartbeat_interval)
+            except asyncio.TimeoutError:
+                continue
+
+            # Juntar los cambios que lleguen hasta que se cumpla el intervalo mínimo
+            wait = self._last_render + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._dirty.clear()
+            self._last_render = time.monotonic()
+            await self.refresh()
+
+    def status(self) -> str:
+        return (f"Canales: {len(self.channels)} | Dibujos: {self.renders} | Ediciones: {self.edits} | "
+                f"Sin cambios: {self.skipped} | Fallos: {self.failures}")
@@ -0,0 +1,367 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from rate_limiter import (PRIORITY_ATTENDANCE, PRIORITY_DIAGNOSTICS, PRIORITY_MILESTONE, PRIORITY_PAUSE,
+                          RateLimiter)
+from storage import write_file_atomic
+
+# Límite de caracteres de un mensaje de Discord
+MAX_MESSAGE_CHARS = 2000
+SEPARATOR = "\n\n"
+
+# Clase de prioridad de cada tipo de notificación ante el limitador de envíos
+KIND_PRIORITY = {
+    'milestone': PRIORITY_MILESTONE,
+    'attendance': PRIORITY_ATTENDANCE,
+    'link': PRIORITY_ATTENDANCE,
+    'pause': PRIORITY_PAUSE,
+    'cancellation': PRIORITY_PAUSE,
+    'diagnostics': PRIORITY_DIAGNOSTICS,
+}
+
+
+class Notification:
+    """Mensaje pendiente de enviar a un canal.
+
+    Las notificaciones con `key` se guardan en el journal del outbox hasta que se
+    entregan, y la clave evita enviar dos veces lo mismo.
+    """
+    __slots__ = ('channel_id', 'kind', 'content', 'key', 'created_at')
+
+    def __init__(self, channel_id: int, kind: str, content: str, key: Optional[str] = None,
+                 created_at: Optional[float] = None):
+        self.channel_id = channel_id
+        self.kind = kind
+        self.content = content
+        self.key = key
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'key': self.key, 'channel_id': self.channel_id, 'kind': self.kind,
+                'content': self.content, 'created_at': self.created_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Notification":
+        return cls(data['channel_id'], data['kind'], data['content'], data['key'], data.get('created_at'))
+
+
+class OutboxJournal:
+    """Archivo append-only con las notificaciones durables del outbox.
+
+    Cada línea es {"op": "add", ...} al encolar o {"op": "done", "key": ...} al entregar
+    (o descartar). Al cargar, las "add" sin su "done" son las pendientes. Cuando el
+    archivo acumula `compact_every` líneas se reescribe con solo las pendientes y las
+    claves entregadas en las últimas `dedupe_ttl` segundos.
+    """
+
+    def __init__(self, path: str, compact_every: int = 1000, dedupe_ttl: float = 86400.0):
+        self.path = path
+        self.compact_every = compact_every
+        self.dedupe_ttl = dedupe_ttl
+        self.entries = 0
+        self._handle = None
+
+    def load(self) -> Tuple[List[Notification], Dict[str, float]]:
+        """Leer el journal: (pendientes en orden de llegada, clave entregada -> momento)"""
+        pending: Dict[str, Notification] = {}
+        delivered: Dict[str, float] = {}
+        if not os.path.exists(self.path):
+            return [], delivered
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Solo la última línea puede quedar incompleta si el proceso murió escribiendo
+                        print(f"⚠️ Entrada inválida en el outbox en línea {line_number}, se ignora")
+                        continue
+                    self.entries += 1
+                    if entry.get('op') == 'add':
+                        pending[entry['key']] = Notification.from_dict(entry)
+                    elif entry.get('op') == 'done':
+                        pending.pop(entry['key'], None)
+                        delivered[entry['key']] = entry.get('at', time.time())
+        except Exception as e:
+            print(f"Error cargando el outbox de notificaciones: {e}")
+
+        cutoff = time.time() - self.dedupe_ttl
+        delivered = {key: at for key, at in delivered.items() if at >= cutoff}
+        return list(pending.values()), delivered
+
+    def add(self, notification: Notification) -> None:
+        self._append({'op': 'add', **notification.to_dict()})
+
+    def done(self, key: str, at: float) -> None:
+        self._append({'op': 'done', 'key': key, 'at': at})
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_every
+
+    def compact(self, pending: List[Notification], delivered: Dict[str, float]) -> None:
+        """Reescribir el journal (de forma atómica) con lo que todavía hace falta"""
+        cutoff = time.time() - self.dedupe_ttl
+        lines = [json.dumps({'op': 'add', **notification.to_dict()}, ensure_ascii=False) for notification in pending]
+        lines += [json.dumps({'op': 'done', 'key': key, 'at': at}) for key, at in delivered.items() if at >= cutoff]
+        self.close()
+        write_file_atomic(self.path, "".join(line + "\n" for line in lines).encode('utf-8'))
+        self.entries = len(lines)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self._handle is None:
+            self._handle = open(self.path, 'ab')
+        self._handle.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b"\n")
+        self._handle.flush()
+        self.entries += 1
+
+
+def pack_messages(contents: List[str], max_chars: int = MAX_MESSAGE_CHARS) -> List[List[int]]:
+    """Agrupar mensajes consecutivos en la menor cantidad de envíos de hasta `max_chars`.
+
+    Devuelve los índices de `contents` que van en cada envío, en orden.
+    """
+    groups: List[List[int]] = []
+    length = 0
+    for index, content in enumerate(contents):
+        size = min(len(content), max_chars)
+        if groups and length + len(SEPARATOR) + size <= max_chars:
+            groups[-1].append(index)
+            length += len(SEPARATOR) + size
+        else:
+            groups.append([index])
+            length = size
+    return groups
+
+
+def join_contents(contents: List[str], max_chars: int = MAX_MESSAGE_CHARS) -> str:
+    """Unir mensajes para un envío; un mensaje que solo ya no entra se recorta"""
+    return SEPARATOR.join(content if len(content) <= max_chars else content[:max_chars - 1] + "…"
+                          for content in contents)
+
+
+class NotificationOutbox:
+    """Cola central de notificaciones con un enviador por canal.
+
+    Los productores llaman a enqueue() y siguen sin esperar a Discord. Cada canal tiene
+    su propia cola: el enviador espera `linger` segundos para reunir lo que llega junto
+    (por ejemplo, una cohorte que cumple la hora a la vez) y lo manda en la menor
+    cantidad de mensajes de 2000 caracteres, en el orden en que llegó. Los errores
+    temporales se reintentan con espera exponencial; los permanentes (canal inexistente,
+    sin permisos) descartan el envío.
+
+    Con `journal` (ver OutboxJournal), las notificaciones encoladas con clave se
+    escriben en disco antes de volver de enqueue(), sobreviven a un reinicio y se
+    entregan al menos una vez: si se agotan los reintentos vuelven al frente de la cola
+    y se intentan de nuevo pasados `retry_delay` segundos. Encolar una clave pendiente,
+    o entregada hace menos de `dedupe_ttl` segundos, no hace nada: la clave tiene que
+    identificar el envío (por ejemplo, incluir la sesión) para no bloquear uno legítimo.
+
+    Con `rate_limiter`, cada envío espera su turno según la prioridad de su tipo (ver
+    KIND_PRIORITY). `rate_limit_of` reconoce un 429 y devuelve (retry-after, global):
+    ese canal, o todos, se pausan el tiempo indicado en lugar de usar la espera
+    exponencial.
+    """
+
+    def __init__(self, send: Callable[[int, str], Awaitable[None]],
+                 is_permanent_error: Callable[[Exception], bool] = lambda error: False,
+                 linger: float = 1.0, max_attempts: int = 5, max_chars: int = MAX_MESSAGE_CHARS,
+                 journal: Optional[OutboxJournal] = None, retry_delay: float = 60.0,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 rate_limit_of: Callable[[Exception], Optional[Tuple[float, bool]]] = lambda error: None,
+                 dedupe_ttl: Optional[float] = None):
+        self.send = send
+        self.is_permanent_error = is_permanent_error
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.max_chars = max_chars
+        self.journal = journal
+        self.retry_delay = retry_delay
+        self.rate_limiter = rate_limiter
+        self.rate_limit_of = rate_limit_of
+        if dedupe_ttl is None:
+            dedupe_ttl = journal.dedupe_ttl if journal is not None else 86400.0
+        self.dedupe_ttl = dedupe_ttl
+        self._queues: Dict[int, Deque[Notification]] = {}
+        self._senders: Dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        # Claves pendientes y entregadas (clave -> momento), para no enviar duplicados
+        self._pending_keys: Dict[str, Notification] = {}
+        self._delivered_keys: Dict[str, float] = {}
+        self.enqueued = 0
+        self.delivered = 0
+        self.messages_sent = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+        if journal is not None:
+            recovered, self._delivered_keys = journal.load()
+            for notification in recovered:
+                self._pending_keys[notification.key] = notification
+                self._queues.setdefault(notification.channel_id, deque()).append(notification)
+            if recovered:
+                print(f"📨 {len(recovered)} notificación(es) pendientes recuperadas del outbox")
+
+    def enqueue(self, channel_id: int, kind: str, content: str, key: Optional[str] = None) -> Optional[Notification]:
+        """Encolar un mensaje para `channel_id`; se envía desde run().
+
+        Con `key`, la notificación queda en el journal antes de volver. Devuelve None si
+        la clave ya estaba pendiente o se entregó hace menos de `dedupe_ttl` segundos.
+        """
+        if key is not None:
+            delivered_at = self._delivered_keys.get(key)
+            if delivered_at is not None and time.time() - delivered_at >= self.dedupe_ttl:
+                del self._delivered_keys[key]
+                delivered_at = None
+            if key in self._pending_keys or delivered_at is not None:
+                self.duplicates += 1
+                return None
+
+        notification = Notification(channel_id, kind, content, key)
+        if key is not None:
+            if self.journal is not None:
+                self.journal.add(notification)
+            self._pending_keys[key] = notification
+        self._queues.setdefault(channel_id, deque()).append(notification)
+        self.enqueued += 1
+        self._wakeup.set()
+        return notification
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def status(self) -> str:
+        text = (f"En cola: {self.pending()} | Enviadas: {self.delivered} en {self.messages_sent} mensaje(s) | "
+                f"Descartadas: {self.dropped}")
+        if self.journal is not None:
+            text += f" | Durables pendientes: {len(self._pending_keys)}"
+        if self.rate_limiter is not None:
+            text += f"\n{self.rate_limiter.status()}"
+        return text
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+
+    def _settle(self, notifications: List[Notification]) -> None:
+        """Registrar como resueltas (entregadas o descartadas) las notificaciones con clave"""
+        now = time.time()
+        for notification in notifications:
+            if notification.key is None:
+                continue
+            self._pending_keys.pop(notification.key, None)
+            self._delivered_keys[notification.key] = now
+            if self.journal is not None:
+                self.journal.done(notification.key, now)
+
+        if self.journal is not None and self.journal.needs_compaction():
+            cutoff = now - self.dedupe_ttl
+            self._delivered_keys = {key: at for key, at in self._delivered_keys.items() if at >= cutoff}
+            try:
+                self.journal.compact(list(self._pending_keys.values()), self._delivered_keys)
+            except Exception as e:
+                print(f"Error compactando el outbox de notificaciones: {e}")
+
+    async def run(self, heartbeat: Optional[Callable[[], None]] = None, heartbeat_interval: float = 60.0) -> None:
+        """Lanzar un enviador por cada canal con mensajes pendientes"""
+        try:
+            while True:
+                self._wakeup.clear()
+                for channel_id, queue in self._queues.items():
+                    sender = self._senders.get(channel_id)
+                    if queue and (sender is None or sender.done()):
+                        self._senders[channel_id] = asyncio.get_running_loop().create_task(self._drain(channel_id))
+                if heartbeat is not None:
+                    heartbeat()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sender in self._senders.values():
+                sender.cancel()
+
+    async def _drain(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        while queue:
+            # Reunir lo que llegue durante la ventana antes de armar los mensajes
+            await asyncio.sleep(self.linger)
+            batch = list(queue)
+            queue.clear()
+            contents = [notification.content for notification in batch]
+            groups = pack_messages(contents, self.max_chars)
+            position = 0
+            try:
+                for position, group in enumerate(groups):
+                    if await self._deliver(channel_id, [batch[index] for index in group]) is None:
+                        # Discord no respondió: las durables de este grupo y todo lo que faltaba
+                        # enviar vuelven al frente de la cola, en orden, para el próximo intento
+                        retry = [batch[index] for index in group if batch[index].key is not None]
+                        retry += [batch[index] for later in groups[position + 1:] for index in later]
+                        queue.extendleft(reversed(retry))
+                        position = len(groups)
+                        await asyncio.sleep(self.retry_delay)
+                        break
+            except asyncio.CancelledError:
+                # Reinicio o cierre: lo que no se confirmó (incluido el grupo en curso)
+                # vuelve al frente de la cola para que el próximo enviador lo retome
+                unsent = [batch[index] for later in groups[position:] for index in later]
+                queue.extendleft(reversed(unsent))
+                raise
+
+    async def _deliver(self, channel_id: int, notifications: List[Notification]) -> Optional[bool]:
+        """Enviar un grupo; True si se entregó, False si se descartó por un error
+        permanente y None si se agotaron los reintentos"""
+        content = join_contents([notification.content for notification in notifications], self.max_chars)
+        priority = min(KIND_PRIORITY.get(notification.kind, PRIORITY_DIAGNOSTICS) for notification in notifications)
+        for attempt in range(self.max_attempts):
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(channel_id, priority)
+                await self.send(channel_id, content)
+                self.delivered += len(notifications)
+                self.messages_sent += 1
+                self._settle(notifications)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.is_permanent_error(e):
+                    print(f"❌ No se pueden enviar notificaciones al canal {channel_id}: {e}")
+                    self.dropped += len(notifications)
+                    self._settle(notifications)
+                    return False
+                print(f"⚠️ Error enviando {len(notifications)} notificación(es) al canal {channel_id} "
+                      f"(intento {attempt + 1}/{self.max_attempts}): {e}")
+                if attempt == self.max_attempts - 1:
+                    break
+                rate_limit = self.rate_limit_of(e)
+                if rate_limit is None:
+                    await asyncio.sleep(2 ** attempt)
+                elif self.rate_limiter is not None:
+                    # El próximo acquire() espera lo que pidió Discord
+                    self.rate_limiter.penalize(channel_id, *rate_limit)
+                else:
+                    await asyncio.sleep(rate_limit[0])
+
+        transient = [notification for notification in notifications if notification.key is None]
+        if transient:
+            self.dropped += len(transient)
+            kinds = ", ".join(sorted({notification.kind for notification in transient}))
+            print(f"❌ CRÍTICO: se descartaron {len(transient)} notificación(es) ({kinds}) del canal {channel_id}")
+        if len(transient) < len(notifications):
+            print(f"🔄 {len(notifications) - len(transient)} notificación(es) durables del canal {channel_id} "
+                  f"se reintentan en {self.retry_delay:.0f}s")
+        return None
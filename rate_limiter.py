@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+# Clases de prioridad: un número menor pasa primero cuando no alcanzan los tokens
+PRIORITY_MILESTONE = 0
+PRIORITY_ATTENDANCE = 1
+PRIORITY_PAUSE = 2
+PRIORITY_DIAGNOSTICS = 3
+PRIORITY_NAMES = ("milestones", "asistencias", "pausas", "diagnóstico")
+
+
+class TokenBucket:
+    """Cubeta de tokens: `rate` tokens por segundo, hasta `capacity` acumulados.
+
+    Un 429 de Discord la bloquea (block) hasta que pase su retry-after.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya lo hay)"""
+        self._refill(now)
+        missing = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(missing, self.blocked_until - now, 0.0)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float) -> None:
+        # Al terminar el bloqueo queda un solo token: no se acumula nada mientras dura
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 1.0
+        self.updated = max(self.updated, self.blocked_until)
+
+
+class RateLimiter:
+    """Limita los envíos a Discord con una cubeta global y una por canal.
+
+    Cada envío espera en acquire() a tener token en ambas cubetas. Entre los que
+    esperan, se atiende primero la prioridad más alta (número menor) y dentro de ella
+    el que llegó antes; si la cubeta global está vacía nadie se adelanta. Los límites
+    por defecto quedan por debajo de los de Discord (50 solicitudes por segundo en
+    total, unos 5 mensajes cada 5 segundos por canal), así que las ráfagas se reparten
+    en el tiempo en lugar de terminar en 429.
+    """
+
+    def __init__(self, global_rate: float = 40.0, global_burst: float = 40.0,
+                 channel_rate: float = 1.0, channel_burst: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock())
+        self._channels: Dict[Hashable, TokenBucket] = {}
+        # Esperas pendientes: [prioridad, orden de llegada, canal, future]
+        self._waiters: List[list] = []
+        self._sequence = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _channel(self, channel_id: Hashable) -> TokenBucket:
+        bucket = self._channels.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(self.channel_rate, self.channel_burst, self.clock())
+            self._channels[channel_id] = bucket
+        return bucket
+
+    async def acquire(self, channel_id: Hashable, priority: int = PRIORITY_DIAGNOSTICS) -> float:
+        """Esperar turno para enviar a `channel_id`; devuelve los segundos esperados"""
+        start = self.clock()
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        self._waiters.append([priority, self._sequence, channel_id, future])
+        self._grant()
+        try:
+            await future
+        finally:
+            if not future.done():
+                future.cancel()
+
+        waited = self.clock() - start
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def penalize(self, channel_id: Hashable, retry_after: float, is_global: bool = False) -> None:
+        """Respetar un 429: bloquear el canal (o todo) durante `retry_after` segundos"""
+        self.rate_limited += 1
+        until = self.clock() + retry_after
+        (self.global_bucket if is_global else self._channel(channel_id)).block(until)
+
+    def _grant(self) -> None:
+        """Dar turno a todas las esperas que ya tienen token y programar la próxima revisión"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = self.clock()
+        waiting = []
+        next_check = None
+        self._waiters.sort(key=lambda waiter: (waiter[0], waiter[1]))
+        for index, waiter in enumerate(self._waiters):
+            future = waiter[3]
+            if future.done():
+                continue
+            global_delay = self.global_bucket.delay(now)
+            if global_delay > 0:
+                # Sin token global: los de menor prioridad no se adelantan
+                waiting.extend(pending for pending in self._waiters[index:] if not pending[3].done())
+                next_check = global_delay if next_check is None else min(next_check, global_delay)
+                break
+            bucket = self._channel(waiter[2])
+            channel_delay = bucket.delay(now)
+            if channel_delay > 0:
+                waiting.append(waiter)
+                next_check = channel_delay if next_check is None else min(next_check, channel_delay)
+                continue
+            self.global_bucket.take(now)
+            bucket.take(now)
+            future.set_result(None)
+
+        self._waiters = waiting
+        if waiting and next_check is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_check, self._grant)
+
+    def queue_depth(self) -> List[int]:
+        """Esperas pendientes por clase de prioridad"""
+        depth = [0] * len(PRIORITY_NAMES)
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                depth[min(priority, len(depth) - 1)] += 1
+        return depth
+
+    def status(self) -> str:
+        depth = ", ".join(f"{name} {count}" for name, count in zip(PRIORITY_NAMES, self.queue_depth()))
+        average = self.total_wait / self.granted if self.granted else 0.0
+        return (f"Esperando: {depth} | Espera promedio {average:.2f}s, máxima {self.max_wait:.1f}s | "
+                f"429 recibidos: {self.rate_limited}")
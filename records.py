@@ -0,0 +1,193 @@
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+
+def iso_to_epoch(value: Optional[str]) -> Optional[float]:
+    """Convertir una fecha ISO (hora local, como la guarda el bot) a segundos epoch"""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def epoch_to_iso(value: Optional[float]) -> Optional[str]:
+    """Convertir segundos epoch a fecha ISO en hora local (formato del JSON)"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).isoformat()
+
+
+class Initiator:
+    """Admin que inició el tiempo de un usuario"""
+    __slots__ = ('admin_id', 'admin_name', 'timestamp')
+
+    def __init__(self, admin_id: int, admin_name: str, timestamp: Optional[float] = None):
+        self.admin_id = admin_id
+        self.admin_name = admin_name
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Initiator":
+        return cls(data.get('admin_id'), data.get('admin_name'), iso_to_epoch(data.get('timestamp')))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'admin_id': self.admin_id,
+            'admin_name': self.admin_name,
+            'timestamp': epoch_to_iso(self.timestamp)
+        }
+
+
+class Link:
+    """Admin al que está ligado el tiempo de un usuario"""
+    __slots__ = ('admin_id', 'admin_name', 'linked_at')
+
+    def __init__(self, admin_id: int, admin_name: str, linked_at: Optional[float] = None):
+        self.admin_id = admin_id
+        self.admin_name = admin_name
+        self.linked_at = linked_at
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Link":
+        return cls(data.get('admin_id'), data.get('admin_name'), iso_to_epoch(data.get('linked_at')))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'admin_id': self.admin_id,
+            'admin_name': self.admin_name,
+            'linked_at': epoch_to_iso(self.linked_at)
+        }
+
+
+class Session:
+    """Sesión terminada del historial de un usuario"""
+    __slots__ = ('start', 'end', 'duration')
+
+    def __init__(self, start: Optional[float], end: Optional[float], duration: float = 0):
+        self.start = start
+        self.end = end
+        self.duration = duration
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Session":
+        return cls(iso_to_epoch(data.get('start')), iso_to_epoch(data.get('end')), data.get('duration', 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start': epoch_to_iso(self.start),
+            'end': epoch_to_iso(self.end),
+            'duration': self.duration
+        }
+
+
+# Claves del JSON de usuario que tienen atributo propio; el resto se conserva en `extra`
+_USER_FIELDS = (
+    'name', 'total_time', 'sessions', 'is_active', 'is_paused', 'pause_count',
+    'highest_notified_hour', 'milestone_completed', 'last_start', 'pause_start',
+    'time_initiator', 'linked_to'
+)
+# `notified_milestones` se deriva de highest_notified_hour; se lee y escribe por compatibilidad
+_USER_KEYS = frozenset(_USER_FIELDS + ('notified_milestones',))
+
+
+class UserRecord:
+    """Datos de seguimiento de un usuario.
+
+    Reemplaza al diccionario del JSON en memoria: los atributos son fijos (__slots__) y
+    las fechas se guardan como segundos epoch. from_dict / to_dict convierten desde y
+    hacia el formato de user_times.json; las claves desconocidas se conservan en `extra`.
+
+    Los milestones se notifican siempre hasta la hora más alta alcanzada, así que basta
+    con guardar esa hora (`highest_notified_hour`); la lista `notified_milestones` del
+    formato anterior se calcula a partir de ella.
+    """
+    __slots__ = _USER_FIELDS + ('extra',)
+
+    def __init__(self, name: str, total_time: float = 0, sessions: Optional[List[Session]] = None,
+                 is_active: bool = False, is_paused: bool = False, pause_count: int = 0,
+                 highest_notified_hour: int = 0, milestone_completed: bool = False,
+                 last_start: Optional[float] = None, pause_start: Optional[float] = None,
+                 time_initiator: Optional[Initiator] = None, linked_to: Optional[Link] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.total_time = total_time
+        self.sessions = sessions if sessions is not None else []
+        self.is_active = is_active
+        self.is_paused = is_paused
+        self.pause_count = pause_count
+        self.highest_notified_hour = highest_notified_hour
+        self.milestone_completed = milestone_completed
+        self.last_start = last_start
+        self.pause_start = pause_start
+        self.time_initiator = time_initiator
+        self.linked_to = linked_to
+        self.extra = extra if extra is not None else {}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserRecord":
+        initiator = data.get('time_initiator')
+        linked = data.get('linked_to')
+        return cls(
+            name=data.get('name'),
+            total_time=data.get('total_time', 0),
+            sessions=[Session.from_dict(session) for session in data.get('sessions', [])],
+            is_active=data.get('is_active', False),
+            is_paused=data.get('is_paused', False),
+            pause_count=data.get('pause_count', 0),
+            highest_notified_hour=_highest_notified_hour(data),
+            milestone_completed=data.get('milestone_completed', False),
+            last_start=iso_to_epoch(data.get('last_start')),
+            pause_start=iso_to_epoch(data.get('pause_start')),
+            time_initiator=Initiator.from_dict(initiator) if initiator else None,
+            linked_to=Link.from_dict(linked) if linked else None,
+            extra={key: value for key, value in data.items() if key not in _USER_KEYS}
+        )
+
+    @property
+    def notified_milestones(self) -> List[int]:
+        """Milestones notificados en segundos (1h, 2h, ...), formato anterior"""
+        return [hour * 3600 for hour in range(1, self.highest_notified_hour + 1)]
+
+    @notified_milestones.setter
+    def notified_milestones(self, milestones: List[int]) -> None:
+        self.highest_notified_hour = max((int(milestone) // 3600 for milestone in milestones), default=0)
+
+    def pending_milestone_hour(self, total_time: float) -> Optional[int]:
+        """Hora más alta alcanzada con `total_time` que aún no se notificó, o None"""
+        total_hours = int(total_time // 3600)
+        return total_hours if total_hours > self.highest_notified_hour else None
+
+    def mark_milestone_notified(self, hour: int) -> None:
+        """Marcar como notificados todos los milestones hasta `hour` inclusive"""
+        if hour > self.highest_notified_hour:
+            self.highest_notified_hour = hour
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'name': self.name,
+            'total_time': self.total_time,
+            'sessions': [session.to_dict() for session in self.sessions],
+            'is_active': self.is_active,
+            'is_paused': self.is_paused,
+            'pause_count': self.pause_count,
+            'highest_notified_hour': self.highest_notified_hour,
+            'notified_milestones': self.notified_milestones,
+            'milestone_completed': self.milestone_completed
+        }
+        # Los campos opcionales solo aparecen en el JSON cuando tienen valor
+        if self.last_start is not None:
+            data['last_start'] = epoch_to_iso(self.last_start)
+        if self.pause_start is not None:
+            data['pause_start'] = epoch_to_iso(self.pause_start)
+        if self.time_initiator is not None:
+            data['time_initiator'] = self.time_initiator.to_dict()
+        if self.linked_to is not None:
+            data['linked_to'] = self.linked_to.to_dict()
+        data.update(self.extra)
+        return data
+
+
+def _highest_notified_hour(data: Dict[str, Any]) -> int:
+    """Hora más alta notificada de un usuario del JSON, también desde el formato anterior"""
+    if 'highest_notified_hour' in data:
+        return int(data['highest_notified_hour'])
+    return max((int(milestone) // 3600 for milestone in data.get('notified_milestones', ())), default=0)
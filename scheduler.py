@@ -0,0 +1,316 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+TimerCallback = Callable[[], Awaitable[Any]]
+
+
+class TimerScheduler:
+    """Base de los temporizadores con clave y fecha límite (segundos epoch).
+
+    Volver a programar una clave reemplaza su fecha anterior. Las subclases guardan los
+    temporizadores; esta clase tiene el bucle asíncrono que espera hasta el siguiente
+    vencimiento y dispara los callbacks.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, key: Hashable) -> bool:
+        raise NotImplementedError
+
+    def schedule(self, key: Hashable, deadline: float, callback: TimerCallback) -> None:
+        """Programar (o reprogramar) el temporizador `key` para `deadline`"""
+        raise NotImplementedError
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancelar un temporizador; devuelve False si no existía"""
+        raise NotImplementedError
+
+    def keys(self) -> List[Hashable]:
+        raise NotImplementedError
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        raise NotImplementedError
+
+    def next_deadline(self) -> Optional[float]:
+        """Momento en que run() debe volver a revisar, o None si no hay temporizadores"""
+        raise NotImplementedError
+
+    def pop_due(self, now: float) -> List[Tuple[Hashable, TimerCallback]]:
+        """Sacar todos los temporizadores vencidos en `now`"""
+        raise NotImplementedError
+
+    def cancel_kind(self, kind: str) -> int:
+        """Cancelar todos los temporizadores cuya clave es una tupla que empieza por `kind`"""
+        keys = [key for key in self.keys() if isinstance(key, tuple) and key and key[0] == kind]
+        for key in keys:
+            self.cancel(key)
+        return len(keys)
+
+    async def run(self, dispatch: Optional[Callable[[Hashable, TimerCallback], None]] = None,
+                  heartbeat: Optional[Callable[[], None]] = None, heartbeat_interval: float = 60.0) -> None:
+        """Esperar hasta cada vencimiento y disparar los temporizadores vencidos.
+
+        Sin `dispatch`, cada callback se ejecuta en su propia task (ver spawn). Con
+        `heartbeat`, se llama en cada vuelta y nunca se espera más de `heartbeat_interval`.
+        """
+        dispatch = dispatch or self.spawn
+        while True:
+            for key, callback in self.pop_due(self.clock()):
+                dispatch(key, callback)
+            if heartbeat is not None:
+                heartbeat()
+
+            self._wakeup.clear()
+            next_deadline = self.next_deadline()
+            timeout = None if next_deadline is None else max(0.0, next_deadline - self.clock())
+            if heartbeat is not None:
+                timeout = heartbeat_interval if timeout is None else min(timeout, heartbeat_interval)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def spawn(self, key: Hashable, callback: TimerCallback) -> None:
+        """Ejecutar un callback vencido en su propia task, registrando sus errores"""
+        asyncio.get_running_loop().create_task(self._fire(key, callback))
+
+    @staticmethod
+    async def _fire(key: Hashable, callback: TimerCallback) -> None:
+        try:
+            await callback()
+        except Exception as e:
+            print(f"⚠️ Error en temporizador {key}: {e}")
+
+
+class DeadlineScheduler(TimerScheduler):
+    """Temporizadores sobre un min-heap ordenado por fecha exacta.
+
+    Las entradas canceladas se quedan en el heap marcadas como inactivas y se descartan
+    al llegar arriba. Adecuado para pocos miles de temporizadores; para más, ver
+    TimingWheelScheduler.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        super().__init__(clock)
+        self._heap: List[list] = []
+        self._entries: Dict[Hashable, list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def schedule(self, key: Hashable, deadline: float, callback: TimerCallback) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == deadline:
+                entry[3] = callback
+                return
+            entry[4] = False
+
+        entry = [deadline, next(self._counter), key, callback, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+        if self._heap[0] is entry:
+            # Hay una fecha más cercana que la que estaba esperando run()
+            self._wakeup.set()
+        self._compact_if_needed()
+
+    def cancel(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[4] = False
+        self._compact_if_needed()
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def next_deadline(self) -> Optional[float]:
+        while self._heap and not self._heap[0][4]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[Hashable, TimerCallback]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key, callback, active = heapq.heappop(self._heap)
+            if active:
+                del self._entries[key]
+                due.append((key, callback))
+        return due
+
+    def _compact_if_needed(self) -> None:
+        # Con muchas reprogramaciones el heap acumula entradas muertas: reconstruirlo
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [entry for entry in self._heap if entry[4]]
+            heapq.heapify(self._heap)
+
+
+class TimingWheelScheduler(TimerScheduler):
+    """Temporizadores sobre una rueda de tiempo jerárquica con hash.
+
+    El tiempo avanza en ticks de `tick_seconds`. El primer nivel tiene un slot por tick
+    (256 ticks); cada nivel siguiente tiene 64 slots que cubren 64 veces más tiempo. Un
+    temporizador lejano se guarda en un nivel alto y baja de nivel (cascada) a medida que
+    se acerca su vencimiento. Programar y cancelar son O(1) y cada tick vence de una vez
+    todo lo que hay en su slot. Los temporizadores se disparan como mucho un tick tarde.
+    """
+
+    LEVEL0_BITS = 8
+    LEVEL_BITS = 6
+    LEVELS = 4
+
+    def __init__(self, tick_seconds: float = 0.25, clock: Callable[[], float] = time.time):
+        super().__init__(clock)
+        self.tick_seconds = tick_seconds
+        self._origin = clock()
+        self._current_tick = 0
+
+        self._wheels: List[List[Dict[Hashable, list]]] = [[{} for _ in range(1 << self.LEVEL0_BITS)]]
+        for _ in range(self.LEVELS - 1):
+            self._wheels.append([{} for _ in range(1 << self.LEVEL_BITS)])
+        # Clave -> slot donde está el temporizador, para cancelar en O(1)
+        self._slots: Dict[Hashable, Dict[Hashable, list]] = {}
+
+        # Límite de ticks (desde el tick actual) que cubre cada nivel
+        self._level_spans = [1 << (self.LEVEL0_BITS + level * self.LEVEL_BITS) for level in range(self.LEVELS)]
+        self._level_shifts = [0] + [self.LEVEL0_BITS + level * self.LEVEL_BITS for level in range(self.LEVELS - 1)]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def keys(self) -> List[Hashable]:
+        return list(self._slots)
+
+    def _tick_for(self, deadline: float) -> int:
+        return math.ceil((deadline - self._origin) / self.tick_seconds)
+
+    def _time_for(self, tick: int) -> float:
+        return self._origin + tick * self.tick_seconds
+
+    def schedule(self, key: Hashable, deadline: float, callback: TimerCallback) -> None:
+        slot = self._slots.get(key)
+        if slot is not None:
+            entry = slot[key]
+            if entry[3] == deadline:
+                entry[2] = callback
+                return
+            del slot[key]
+
+        # Lo ya vencido se dispara en el próximo tick
+        expire_tick = max(self._tick_for(deadline), self._current_tick + 1)
+        entry = [expire_tick, key, callback, deadline]
+        self._place(entry)
+        if expire_tick - self._current_tick < self._level_spans[0] and not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        del slot[key]
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        slot = self._slots.get(key)
+        return slot[key][3] if slot is not None else None
+
+    def _place(self, entry: list) -> None:
+        expire_tick = entry[0]
+        current_tick = self._current_tick
+        delta = expire_tick - current_tick
+        if delta < self._level_spans[0]:
+            wheel = self._wheels[0]
+            index = max(expire_tick, current_tick) & (len(wheel) - 1)
+        else:
+            # Nivel según la cantidad de bits de la distancia: 9-14 -> 1, 15-20 -> 2, ...
+            level = (delta.bit_length() - self.LEVEL0_BITS + self.LEVEL_BITS - 1) // self.LEVEL_BITS
+            if level >= self.LEVELS:
+                # Más lejos de lo que cubre la rueda: se guarda en el último slot alcanzable
+                # y se vuelve a ubicar cuando llegue la cascada
+                level = self.LEVELS - 1
+                expire_tick = current_tick + self._level_spans[-1] - 1
+            wheel = self._wheels[level]
+            index = (expire_tick >> self._level_shifts[level]) & (len(wheel) - 1)
+
+        slot = wheel[index]
+        slot[entry[1]] = entry
+        self._slots[entry[1]] = slot
+
+    def _cascade(self, level: int) -> int:
+        """Bajar de nivel los temporizadores del slot actual de `level`; devuelve su índice"""
+        wheel = self._wheels[level]
+        index = (self._current_tick >> self._level_shifts[level]) & (len(wheel) - 1)
+        slot = wheel[index]
+        if slot:
+            wheel[index] = {}
+            for entry in slot.values():
+                self._place(entry)
+        return index
+
+    def _advance(self) -> List[Tuple[Hashable, TimerCallback]]:
+        """Avanzar un tick y devolver lo que vence en él"""
+        self._current_tick += 1
+        index = self._current_tick & ((1 << self.LEVEL0_BITS) - 1)
+        if index == 0:
+            for level in range(1, self.LEVELS):
+                if self._cascade(level) != 0:
+                    break
+
+        level0 = self._wheels[0]
+        slot = level0[index]
+        if not slot:
+            return []
+        level0[index] = {}
+        due = []
+        for key, entry in slot.items():
+            del self._slots[key]
+            due.append((key, entry[2]))
+        return due
+
+    def pop_due(self, now: float) -> List[Tuple[Hashable, TimerCallback]]:
+        target_tick = math.floor((now - self._origin) / self.tick_seconds)
+        if not self._slots:
+            # Sin temporizadores no hay nada que cascadear: saltar directo
+            self._current_tick = max(self._current_tick, target_tick)
+            return []
+
+        due = []
+        while self._current_tick < target_tick:
+            due.extend(self._advance())
+        return due
+
+    def next_deadline(self) -> Optional[float]:
+        if not self._slots:
+            return None
+        # Próximo slot ocupado del primer nivel, o la próxima cascada si no hay ninguno
+        level0 = self._wheels[0]
+        mask = len(level0) - 1
+        for offset in range(1, len(level0)):
+            tick = self._current_tick + offset
+            if level0[tick & mask]:
+                return self._time_for(tick)
+            if tick & mask == 0:
+                return self._time_for(tick)
+        return self._time_for(self._current_tick + len(level0))
@@ -0,0 +1,719 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Hashable, Tuple
+
+import data_codec
+
+
+def to_json_value(value: Any) -> Any:
+    """Convertir registros en memoria (con to_dict) al formato del JSON"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class StorageBackend:
+    """Interfaz base de almacenamiento para TimeTracker.
+
+    Los métodos save_user / save_admin_attendance / save_preregistration reciben el
+    diccionario completo y la clave modificada: los backends que reescriben archivos
+    completos usan el diccionario, los backends por fila usan solo la clave.
+    """
+
+    def load_users(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save_users(self, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def save_user(self, data: Dict[str, Any], user_id_str: str) -> None:
+        self.save_users(data)
+
+    def load_attendance(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save_attendance(self, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def save_admin_attendance(self, data: Dict[str, Any], admin_id_str: str) -> None:
+        self.save_attendance(data)
+
+    def load_preregistrations(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save_preregistrations(self, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def save_preregistration(self, data: Dict[str, Any], user_id_str: str) -> None:
+        self.save_preregistrations(data)
+
+    def writes_single_keys(self, collection: str) -> bool:
+        """Indica si guardar una clave de `collection` escribe solo esa clave.
+
+        Si no (por ejemplo, un archivo JSON que se reescribe completo), guardar varias
+        claves juntas conviene hacerlo como una sola escritura completa.
+        """
+        return False
+
+    def _writers(self, collection: str) -> Tuple[Callable[[Dict[str, Any]], None],
+                                                  Callable[[Dict[str, Any], str], None]]:
+        """Funciones (colección completa, una clave) que usa prepare_write.
+
+        Tienen que dejar pasar los errores: el PersistenceWorker los registra para que
+        TimeTracker vuelva a marcar el cambio como pendiente. Los backends cuyos save_*
+        atrapan los errores deben devolver aquí versiones que no lo hagan.
+        """
+        return {
+            'users': (self.save_users, self.save_user),
+            'attendance': (self.save_attendance, self.save_admin_attendance),
+            'preregistrations': (self.save_preregistrations, self.save_preregistration),
+        }[collection]
+
+    def prepare_write(self, collection: str, data: Dict[str, Any], key: Optional[str] = None) -> Callable[[], None]:
+        """Preparar una escritura en el hilo que llama y devolver el trabajo de E/S.
+
+        El trabajo devuelto no vuelve a leer `data`, así que puede ejecutarse en otro
+        hilo mientras los datos en memoria siguen cambiando. Esta versión base copia la
+        parte necesaria; los backends pueden serializar directamente.
+        """
+        save_all, save_one = self._writers(collection)
+
+        if key is None:
+            snapshot = copy.deepcopy(data)
+            return lambda: save_all(snapshot)
+
+        snapshot = {key: copy.deepcopy(data[key])} if key in data else {}
+        return lambda: save_one(snapshot, key)
+
+    def close(self) -> None:
+        pass
+
+
+class PersistenceWorker:
+    """Hilo único de escritura para el almacenamiento.
+
+    Recibe trabajos ya preparados (ver StorageBackend.prepare_write) y los ejecuta en
+    orden. Si llega un trabajo con una clave que todavía está en cola, el anterior se
+    descarta porque quedó obsoleto; un trabajo de colección completa descarta además
+    los trabajos por clave de esa colección.
+    """
+
+    def __init__(self, name: str = "persistence-writer"):
+        self._jobs: "OrderedDict[Hashable, Callable[[], None]]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._stopping = False
+        self._failed: List[tuple] = []
+        self.jobs_written = 0
+        self.jobs_dropped = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, collection: str, key: Optional[str], job: Callable[[], None]) -> None:
+        """Encolar un trabajo de escritura, reemplazando los que deja obsoletos"""
+        job_key = (collection, key)
+        with self._condition:
+            if key is None:
+                superseded = [queued for queued in self._jobs if queued[0] == collection]
+            else:
+                superseded = [job_key] if job_key in self._jobs else []
+            for queued in superseded:
+                del self._jobs[queued]
+            self.jobs_dropped += len(superseded)
+
+            self._jobs[job_key] = job
+            self._condition.notify_all()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._jobs) + (1 if self._busy else 0)
+
+    def take_failed(self) -> List[tuple]:
+        """Devolver y olvidar las claves (colección, clave) cuya escritura falló"""
+        with self._condition:
+            failed, self._failed = self._failed, []
+        return failed
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Esperar hasta que no queden trabajos en cola ni en ejecución"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._jobs and not self._busy, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Terminar de escribir lo pendiente y detener el hilo"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._jobs and not self._stopping:
+                    self._condition.wait()
+                if not self._jobs:
+                    return
+                job_key, job = self._jobs.popitem(last=False)
+                self._busy = True
+
+            try:
+                job()
+                self.jobs_written += 1
+            except Exception as e:
+                print(f"Error escribiendo {job_key[0]}{f' ({job_key[1]})' if job_key[1] else ''}: {e}")
+                with self._condition:
+                    self._failed.append(job_key)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+def write_file_atomic(path: str, content: bytes) -> None:
+    """Escribir un archivo completo de forma atómica (archivo temporal + os.replace)"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JsonStorage(StorageBackend):
+    """Almacenamiento en archivos JSON, con journal opcional para los datos de usuarios.
+
+    `codec` define el formato de los archivos completos (ver data_codec) y `compress`
+    los guarda con gzip; al cargar el formato se detecta solo, así que cambiar estas
+    opciones no requiere migrar nada. El journal siempre es JSON de una línea por cambio.
+    """
+
+    def __init__(self, data_file: str = "user_times.json", attendance_file: str = "attendance_data.json",
+                 preregistration_file: str = "preregistrations.json", journal_file: Optional[str] = None,
+                 checkpoint_every: int = 500, codec: str = 'json', compress: bool = False):
+        self.files = {
+            'users': data_file,
+            'attendance': attendance_file,
+            'preregistrations': preregistration_file,
+        }
+        self.data_file = data_file
+        self.attendance_file = attendance_file
+        self.preregistration_file = preregistration_file
+        # Modo journal: cada cambio se agrega como una línea al journal en lugar de
+        # reescribir todo user_times.json; el checkpoint consolida el journal en el snapshot
+        self.journal_file = journal_file
+        self.checkpoint_every = checkpoint_every
+        self.journal_entries = 0
+        self._journal_handle = None
+        self.codec = data_codec.resolve_codec(codec)
+        self.compress = compress
+        # Las líneas del journal son JSON; con orjson instalado se serializan con orjson
+        self._journal_codec = 'orjson' if self.codec == 'orjson' else 'json'
+
+    def _load_json(self, path: str, label: str) -> Dict[str, Any]:
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return data_codec.decode(f.read())
+            return {}
+        except Exception as e:
+            print(f"Error cargando datos de {label}: {e}")
+            return {}
+
+    def _serialize(self, data: Dict[str, Any]) -> bytes:
+        return data_codec.encode(data, self.codec, self.compress, default=to_json_value)
+
+    def load_users(self) -> Dict[str, Any]:
+        """Cargar snapshot de usuarios y aplicar el journal si está activo"""
+        data = self._load_json(self.data_file, "usuarios")
+        if self.journal_file:
+            self.journal_entries = self._replay_journal(data)
+        return data
+
+    def _save_now(self, collection: str, data: Dict[str, Any], key: Optional[str], label: str) -> None:
+        try:
+            self.prepare_write(collection, data, key)()
+        except Exception as e:
+            print(f"Error guardando datos de {label}: {e}")
+
+    def save_users(self, data: Dict[str, Any]) -> None:
+        """Guardar snapshot completo (en modo journal funciona como checkpoint)"""
+        self._save_now('users', data, None, "usuarios")
+
+    def save_user(self, data: Dict[str, Any], user_id_str: str) -> None:
+        """Persistir el cambio de un solo usuario"""
+        self._save_now('users', data, user_id_str, "usuarios")
+
+    def load_attendance(self) -> Dict[str, Any]:
+        return self._load_json(self.attendance_file, "asistencias")
+
+    def save_attendance(self, data: Dict[str, Any]) -> None:
+        self._save_now('attendance', data, None, "asistencias")
+
+    def load_preregistrations(self) -> Dict[str, Any]:
+        return self._load_json(self.preregistration_file, "pre-registros")
+
+    def save_preregistrations(self, data: Dict[str, Any]) -> None:
+        self._save_now('preregistrations', data, None, "pre-registros")
+
+    def writes_single_keys(self, collection: str) -> bool:
+        # Solo los usuarios en modo journal se guardan por entrada
+        return collection == 'users' and bool(self.journal_file)
+
+    def prepare_write(self, collection: str, data: Dict[str, Any], key: Optional[str] = None) -> Callable[[], None]:
+        """Serializar ahora (una entrada de journal o el archivo completo) y devolver la escritura"""
+        if collection == 'users' and self.journal_file and key is not None:
+            if self.journal_entries + 1 < self.checkpoint_every:
+                if key in data:
+                    entry = {'op': 'set', 'id': key, 'data': data[key]}
+                else:
+                    entry = {'op': 'del', 'id': key}
+                line = data_codec.encode(entry, self._journal_codec, default=to_json_value) + b"\n"
+                self.journal_entries += 1
+                return lambda: self._append_journal(line)
+            # El journal llegó al límite: este cambio se escribe como checkpoint completo
+            key = None
+
+        path = self.files[collection]
+        content = self._serialize(data)
+        if collection == 'users' and self.journal_file:
+            self.journal_entries = 0
+            return lambda: self._write_checkpoint(path, content)
+        return lambda: write_file_atomic(path, content)
+
+    def close(self) -> None:
+        if self._journal_handle is not None:
+            self._journal_handle.close()
+            self._journal_handle = None
+
+    def _replay_journal(self, data: Dict[str, Any]) -> int:
+        """Aplicar sobre el snapshot los cambios registrados en el journal"""
+        applied = 0
+        if not os.path.exists(self.journal_file):
+            return applied
+
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Una línea incompleta solo puede quedar al final si el proceso murió escribiendo
+                        print(f"⚠️ Entrada de journal inválida en línea {line_number}, se ignora")
+                        continue
+
+                    op = entry.get('op')
+                    if op == 'set':
+                        data[entry['id']] = entry['data']
+                    elif op == 'del':
+                        data.pop(entry['id'], None)
+                    applied += 1
+        except Exception as e:
+            print(f"Error reproduciendo journal: {e}")
+
+        if applied:
+            print(f"📒 Journal reproducido: {applied} cambio(s) aplicados sobre el snapshot")
+        return applied
+
+    def _append_journal(self, line: bytes) -> None:
+        """Agregar una línea ya serializada al journal"""
+        if self._journal_handle is None:
+            self._journal_handle = open(self.journal_file, 'ab')
+        self._journal_handle.write(line)
+        self._journal_handle.flush()
+
+    def _write_checkpoint(self, path: str, content: bytes) -> None:
+        """Escribir el snapshot completo y vaciar el journal que ya quedó incluido"""
+        write_file_atomic(path, content)
+        self.close()
+        with open(self.journal_file, 'w', encoding='utf-8'):
+            pass
+
+
+# Campos de usuario que se guardan en columnas propias; el resto va a 'extra'
+_USER_KEYS = {'name', 'total_time', 'sessions', 'is_active', 'is_paused', 'pause_count',
+              'notified_milestones', 'highest_notified_hour', 'milestone_completed', 'last_start',
+              'pause_start', 'time_initiator', 'linked_to'}
+_ATTENDANCE_KEYS = {'name', 'daily_attendance', 'total_attendance', 'manual_weekly_attendance', 'week',
+                    'weekly_attendance', 'weekly_history'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    total_time REAL NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 0,
+    is_paused INTEGER NOT NULL DEFAULT 0,
+    pause_count INTEGER NOT NULL DEFAULT 0,
+    milestone_completed INTEGER NOT NULL DEFAULT 0,
+    notified_milestones TEXT NOT NULL DEFAULT '[]',
+    highest_notified_hour INTEGER,
+    last_start TEXT,
+    pause_start TEXT,
+    initiator_admin_id INTEGER,
+    initiator_admin_name TEXT,
+    initiator_timestamp TEXT,
+    linked_admin_id INTEGER,
+    linked_admin_name TEXT,
+    linked_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active);
+CREATE INDEX IF NOT EXISTS idx_users_initiator ON users(initiator_admin_id);
+CREATE INDEX IF NOT EXISTS idx_users_linked ON users(linked_admin_id);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    start TEXT,
+    end TEXT,
+    duration REAL,
+    PRIMARY KEY (user_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    admin_id TEXT PRIMARY KEY,
+    name TEXT,
+    total_attendance INTEGER NOT NULL DEFAULT 0,
+    manual_weekly_attendance INTEGER,
+    week TEXT,
+    weekly_attendance INTEGER,
+    weekly_history TEXT,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attendance_daily (
+    admin_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (admin_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance_daily(date);
+
+CREATE TABLE IF NOT EXISTS preregistrations (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    registered_by_id INTEGER,
+    registered_by_name TEXT,
+    registered_at TEXT,
+    activate_at TEXT
+);
+"""
+
+
+class SQLiteStorage(StorageBackend):
+    """Almacenamiento en SQLite (modo WAL) con tablas normalizadas y actualizaciones por fila"""
+
+    def __init__(self, db_file: str = "time_tracker.db", migrate_from: Optional[StorageBackend] = None):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self.conn.commit()
+
+        if migrate_from is not None and self._is_empty():
+            self._migrate(migrate_from)
+
+    def _add_missing_columns(self) -> None:
+        """Agregar a bases de datos existentes las columnas que se sumaron al esquema"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(preregistrations)")}
+        if 'activate_at' not in columns:
+            self.conn.execute("ALTER TABLE preregistrations ADD COLUMN activate_at TEXT")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(users)")}
+        if 'highest_notified_hour' not in columns:
+            self.conn.execute("ALTER TABLE users ADD COLUMN highest_notified_hour INTEGER")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(attendance)")}
+        for column, column_type in (('week', 'TEXT'), ('weekly_attendance', 'INTEGER'), ('weekly_history', 'TEXT')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE attendance ADD COLUMN {column} {column_type}")
+
+    def _is_empty(self) -> bool:
+        for table in ("users", "attendance", "preregistrations"):
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def _migrate(self, source: StorageBackend) -> None:
+        """Importar datos existentes (por ejemplo los archivos JSON) a la base de datos"""
+        users = source.load_users()
+        attendance = source.load_attendance()
+        preregistrations = source.load_preregistrations()
+        if not (users or attendance or preregistrations):
+            return
+        self.save_users(users)
+        self.save_attendance(attendance)
+        self.save_preregistrations(preregistrations)
+        print(f"✅ Migrados a SQLite: {len(users)} usuarios, {len(attendance)} registros de asistencia, "
+              f"{len(preregistrations)} pre-registros")
+
+    # ---------- Usuarios ----------
+
+    def load_users(self) -> Dict[str, Any]:
+        data = {}
+        sessions: Dict[str, List[Dict[str, Any]]] = {}
+        for user_id, start, end, duration in self.conn.execute(
+                "SELECT user_id, start, end, duration FROM sessions ORDER BY user_id, seq"):
+            sessions.setdefault(user_id, []).append({'start': start, 'end': end, 'duration': duration})
+
+        cursor = self.conn.execute("SELECT * FROM users")
+        columns = [description[0] for description in cursor.description]
+        for values in cursor:
+            row = dict(zip(columns, values))
+            data[row['user_id']] = self._row_to_user(row, sessions.get(row['user_id'], []))
+        return data
+
+    def _row_to_user(self, row: Dict[str, Any], sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        user_data = {
+            'name': row['name'],
+            'total_time': row['total_time'],
+            'sessions': sessions,
+            'is_active': bool(row['is_active']),
+            'is_paused': bool(row['is_paused']),
+            'pause_count': row['pause_count'],
+            'notified_milestones': json.loads(row['notified_milestones']),
+            'milestone_completed': bool(row['milestone_completed'])
+        }
+        # NULL en filas escritas antes de la columna: se deriva de notified_milestones
+        if row['highest_notified_hour'] is not None:
+            user_data['highest_notified_hour'] = row['highest_notified_hour']
+        if row['last_start'] is not None:
+            user_data['last_start'] = row['last_start']
+        if row['pause_start'] is not None:
+            user_data['pause_start'] = row['pause_start']
+        if row['initiator_admin_id'] is not None:
+            user_data['time_initiator'] = {
+                'admin_id': row['initiator_admin_id'],
+                'admin_name': row['initiator_admin_name'],
+                'timestamp': row['initiator_timestamp']
+            }
+        if row['linked_admin_id'] is not None:
+            user_data['linked_to'] = {
+                'admin_id': row['linked_admin_id'],
+                'admin_name': row['linked_admin_name'],
+                'linked_at': row['linked_at']
+            }
+        if row['extra']:
+            user_data.update(json.loads(row['extra']))
+        return user_data
+
+    def _user_to_row(self, user_id_str: str, user_data: Dict[str, Any]) -> tuple:
+        initiator = user_data.get('time_initiator') or {}
+        linked = user_data.get('linked_to') or {}
+        extra = {key: value for key, value in user_data.items() if key not in _USER_KEYS}
+        return (
+            user_id_str,
+            user_data.get('name'),
+            user_data.get('total_time', 0),
+            int(bool(user_data.get('is_active', False))),
+            int(bool(user_data.get('is_paused', False))),
+            user_data.get('pause_count', 0),
+            int(bool(user_data.get('milestone_completed', False))),
+            json.dumps(user_data.get('notified_milestones', [])),
+            user_data.get('highest_notified_hour'),
+            user_data.get('last_start'),
+            user_data.get('pause_start'),
+            initiator.get('admin_id'),
+            initiator.get('admin_name'),
+            initiator.get('timestamp'),
+            linked.get('admin_id'),
+            linked.get('admin_name'),
+            linked.get('linked_at'),
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    def _write_user(self, user_id_str: str, user_data: Dict[str, Any]) -> None:
+        if not isinstance(user_data, dict):
+            user_data = to_json_value(user_data)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, name, total_time, is_active, is_paused, pause_count, "
+            "milestone_completed, notified_milestones, highest_notified_hour, last_start, pause_start, "
+            "initiator_admin_id, initiator_admin_name, initiator_timestamp, linked_admin_id, linked_admin_name, "
+            "linked_at, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._user_to_row(user_id_str, user_data)
+        )
+
+        # Las sesiones solo se agregan al final; reescribir únicamente si la lista se acortó
+        sessions = user_data.get('sessions', [])
+        stored = self.conn.execute("SELECT COUNT(*) FROM sessions WHERE user_id = ?", (user_id_str,)).fetchone()[0]
+        if stored > len(sessions):
+            self.conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id_str,))
+            stored = 0
+        self.conn.executemany(
+            "INSERT INTO sessions (user_id, seq, start, end, duration) VALUES (?, ?, ?, ?, ?)",
+            [(user_id_str, seq, s.get('start'), s.get('end'), s.get('duration'))
+             for seq, s in enumerate(sessions[stored:], stored)]
+        )
+
+    def _store_users(self, data: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM users")
+            self.conn.execute("DELETE FROM sessions")
+            for user_id_str, user_data in data.items():
+                self._write_user(user_id_str, user_data)
+
+    def save_users(self, data: Dict[str, Any]) -> None:
+        try:
+            self._store_users(data)
+        except Exception as e:
+            print(f"Error guardando usuarios en SQLite: {e}")
+
+    def _store_user(self, data: Dict[str, Any], user_id_str: str) -> None:
+        with self.conn:
+            if user_id_str in data:
+                self._write_user(user_id_str, data[user_id_str])
+            else:
+                self.conn.execute("DELETE FROM users WHERE user_id = ?", (user_id_str,))
+                self.conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id_str,))
+
+    def save_user(self, data: Dict[str, Any], user_id_str: str) -> None:
+        try:
+            self._store_user(data, user_id_str)
+        except Exception as e:
+            print(f"Error guardando usuario {user_id_str} en SQLite: {e}")
+
+    # ---------- Asistencias ----------
+
+    def load_attendance(self) -> Dict[str, Any]:
+        data = {}
+        for admin_id, name, total, manual_weekly, week, weekly, history, extra in self.conn.execute(
+                "SELECT admin_id, name, total_attendance, manual_weekly_attendance, week, weekly_attendance, "
+                "weekly_history, extra FROM attendance"):
+            admin_data = {'name': name, 'daily_attendance': {}, 'total_attendance': total}
+            if manual_weekly is not None:
+                admin_data['manual_weekly_attendance'] = manual_weekly
+            # Filas sin semana (formato anterior): TimeTracker las migra al cargarlas
+            if week is not None:
+                admin_data['week'] = week
+                admin_data['weekly_attendance'] = weekly or 0
+                admin_data['weekly_history'] = json.loads(history) if history else {}
+            if extra:
+                admin_data.update(json.loads(extra))
+            data[admin_id] = admin_data
+
+        for admin_id, date, count in self.conn.execute(
+                "SELECT admin_id, date, count FROM attendance_daily ORDER BY admin_id, date"):
+            if admin_id in data:
+                data[admin_id]['daily_attendance'][date] = count
+        return data
+
+    def _write_admin_attendance(self, admin_id_str: str, admin_data: Dict[str, Any]) -> None:
+        extra = {key: value for key, value in admin_data.items() if key not in _ATTENDANCE_KEYS}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO attendance (admin_id, name, total_attendance, manual_weekly_attendance, week, "
+            "weekly_attendance, weekly_history, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (admin_id_str, admin_data.get('name'), admin_data.get('total_attendance', 0),
+             admin_data.get('manual_weekly_attendance'), admin_data.get('week'), admin_data.get('weekly_attendance'),
+             json.dumps(admin_data['weekly_history']) if 'weekly_history' in admin_data else None,
+             json.dumps(extra, ensure_ascii=False) if extra else None)
+        )
+        # Los días de semanas cerradas se descartan al archivar la semana
+        self.conn.execute("DELETE FROM attendance_daily WHERE admin_id = ?", (admin_id_str,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO attendance_daily (admin_id, date, count) VALUES (?, ?, ?)",
+            [(admin_id_str, date, count) for date, count in admin_data.get('daily_attendance', {}).items()]
+        )
+
+    def _store_attendance(self, data: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM attendance")
+            self.conn.execute("DELETE FROM attendance_daily")
+            for admin_id_str, admin_data in data.items():
+                self._write_admin_attendance(admin_id_str, admin_data)
+
+    def save_attendance(self, data: Dict[str, Any]) -> None:
+        try:
+            self._store_attendance(data)
+        except Exception as e:
+            print(f"Error guardando asistencias en SQLite: {e}")
+
+    def _store_admin_attendance(self, data: Dict[str, Any], admin_id_str: str) -> None:
+        with self.conn:
+            if admin_id_str in data:
+                self._write_admin_attendance(admin_id_str, data[admin_id_str])
+            else:
+                self.conn.execute("DELETE FROM attendance WHERE admin_id = ?", (admin_id_str,))
+                self.conn.execute("DELETE FROM attendance_daily WHERE admin_id = ?", (admin_id_str,))
+
+    def save_admin_attendance(self, data: Dict[str, Any], admin_id_str: str) -> None:
+        try:
+            self._store_admin_attendance(data, admin_id_str)
+        except Exception as e:
+            print(f"Error guardando asistencias de {admin_id_str} en SQLite: {e}")
+
+    # ---------- Pre-registros ----------
+
+    def load_preregistrations(self) -> Dict[str, Any]:
+        data = {}
+        for user_id, name, admin_id, admin_name, registered_at, activate_at in self.conn.execute(
+                "SELECT user_id, name, registered_by_id, registered_by_name, registered_at, activate_at "
+                "FROM preregistrations"):
+            data[user_id] = {
+                'name': name,
+                'registered_by_id': admin_id,
+                'registered_by_name': admin_name,
+                'registered_at': registered_at
+            }
+            if activate_at is not None:
+                data[user_id]['activate_at'] = activate_at
+        return data
+
+    def _write_preregistration(self, user_id_str: str, prereg_data: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO preregistrations "
+            "(user_id, name, registered_by_id, registered_by_name, registered_at, activate_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id_str, prereg_data.get('name'), prereg_data.get('registered_by_id'),
+             prereg_data.get('registered_by_name'), prereg_data.get('registered_at'),
+             prereg_data.get('activate_at'))
+        )
+
+    def _store_preregistrations(self, data: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM preregistrations")
+            for user_id_str, prereg_data in data.items():
+                self._write_preregistration(user_id_str, prereg_data)
+
+    def save_preregistrations(self, data: Dict[str, Any]) -> None:
+        try:
+            self._store_preregistrations(data)
+        except Exception as e:
+            print(f"Error guardando pre-registros en SQLite: {e}")
+
+    def _store_preregistration(self, data: Dict[str, Any], user_id_str: str) -> None:
+        with self.conn:
+            if user_id_str in data:
+                self._write_preregistration(user_id_str, data[user_id_str])
+            else:
+                self.conn.execute("DELETE FROM preregistrations WHERE user_id = ?", (user_id_str,))
+
+    def save_preregistration(self, data: Dict[str, Any], user_id_str: str) -> None:
+        try:
+            self._store_preregistration(data, user_id_str)
+        except Exception as e:
+            print(f"Error guardando pre-registro {user_id_str} en SQLite: {e}")
+
+    def _writers(self, collection: str):
+        # Las escrituras diferidas usan las versiones que dejan pasar los errores
+        return {
+            'users': (self._store_users, self._store_user),
+            'attendance': (self._store_attendance, self._store_admin_attendance),
+            'preregistrations': (self._store_preregistrations, self._store_preregistration),
+        }[collection]
+
+    def writes_single_keys(self, collection: str) -> bool:
+        return True
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        except Exception as e:
+            print(f"Error cerrando SQLite: {e}")
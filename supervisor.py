@@ -0,0 +1,131 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class SupervisedJob:
+    """Estado de un trabajo en segundo plano registrado en el supervisor"""
+    __slots__ = ('name', 'factory', 'stall_after', 'task', 'started_at', 'restarts',
+                 'last_heartbeat', 'last_duration', 'last_error')
+
+    def __init__(self, name: str, factory: Callable[["SupervisedJob"], Awaitable[None]],
+                 stall_after: Optional[float] = None):
+        self.name = name
+        self.factory = factory
+        self.stall_after = stall_after
+        self.task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.restarts = 0
+        self.last_heartbeat: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def beat(self, duration: Optional[float] = None) -> None:
+        """Marcar que el trabajo sigue vivo; `duration` es lo que tardó su última pasada"""
+        self.last_heartbeat = time.monotonic()
+        if duration is not None:
+            self.last_duration = duration
+
+    def is_stalled(self, now: float) -> bool:
+        if self.stall_after is None or self.last_heartbeat is None:
+            return False
+        return now - self.last_heartbeat > self.stall_after
+
+    def status(self) -> str:
+        """Resumen de una línea para diagnóstico"""
+        now = time.monotonic()
+        if self.task is None or self.task.done():
+            state = "detenido"
+        elif self.is_stalled(now):
+            state = "bloqueado"
+        else:
+            state = "activo"
+        text = f"{self.name}: {state}, reinicios {self.restarts}"
+        if self.last_heartbeat is not None:
+            text += f", último latido hace {now - self.last_heartbeat:.0f}s"
+        if self.last_duration is not None:
+            text += f", última pasada {self.last_duration:.1f}s"
+        if self.last_error:
+            text += f", último error: {self.last_error}"
+        return text
+
+
+class TaskSupervisor:
+    """Mantiene vivos los trabajos en segundo plano del bot.
+
+    Cada trabajo es una corrutina que recibe su SupervisedJob y llama a beat() en cada
+    pasada. Si termina con un error, o deja de latir durante `stall_after` segundos, se
+    cancela y se vuelve a lanzar con espera exponencial. Registrar un trabajo que ya
+    está corriendo no hace nada, así que start() se puede llamar en cada reconexión.
+    """
+
+    def __init__(self, base_backoff: float = 1.0, max_backoff: float = 300.0,
+                 check_interval: float = 30.0):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.jobs: Dict[str, SupervisedJob] = {}
+
+    def register(self, name: str, factory: Callable[[SupervisedJob], Awaitable[None]],
+                 stall_after: Optional[float] = None) -> SupervisedJob:
+        """Registrar un trabajo (si ya existe se conserva el registrado)"""
+        job = self.jobs.get(name)
+        if job is None:
+            job = SupervisedJob(name, factory, stall_after)
+            self.jobs[name] = job
+        return job
+
+    def start(self) -> List[str]:
+        """Lanzar los trabajos que no están corriendo; devuelve sus nombres"""
+        started = []
+        for job in self.jobs.values():
+            if job.task is None or job.task.done():
+                job.task = asyncio.get_running_loop().create_task(self._supervise(job))
+                started.append(job.name)
+        return started
+
+    async def stop(self) -> None:
+        """Cancelar todos los trabajos y esperar a que terminen"""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self) -> List[str]:
+        return [job.status() for job in self.jobs.values()]
+
+    async def _supervise(self, job: SupervisedJob) -> None:
+        failures = 0
+        while True:
+            job.started_at = time.monotonic()
+            job.beat()
+            runner = asyncio.get_running_loop().create_task(job.factory(job))
+            try:
+                error = await self._watch(job, runner)
+            except asyncio.CancelledError:
+                runner.cancel()
+                raise
+
+            job.last_error = error
+            job.restarts += 1
+            # Un trabajo que corrió bien un buen rato vuelve a empezar sin espera acumulada
+            if time.monotonic() - job.started_at > self.max_backoff:
+                failures = 0
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** failures))
+            failures += 1
+            print(f"⚠️ Trabajo '{job.name}' terminó ({error}); reiniciando en {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+
+    async def _watch(self, job: SupervisedJob, runner: asyncio.Task) -> str:
+        """Esperar a que el trabajo termine o se bloquee; devuelve el motivo"""
+        while True:
+            done, _ = await asyncio.wait({runner}, timeout=self.check_interval)
+            if done:
+                if runner.cancelled():
+                    return "cancelado"
+                exception = runner.exception()
+                return f"{type(exception).__name__}: {exception}" if exception else "terminó sin error"
+            if job.is_stalled(time.monotonic()):
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+                return f"sin latido por más de {job.stall_after:.0f}s"
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_registry import ChannelRegistry  # noqa: E402
+
+
+class FakeChannel:
+    def __init__(self, channel_id, name="canal"):
+        self.id = channel_id
+        self.name = name
+
+
+class NotFound(Exception):
+    pass
+
+
+class FakeClient:
+    def __init__(self, cached=(), remote=()):
+        self.cache = {channel.id: channel for channel in cached}
+        self.remote = {channel.id: channel for channel in remote}
+        self.fetched = []
+
+    def get_channel(self, channel_id):
+        return self.cache.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        self.fetched.append(channel_id)
+        if channel_id not in self.remote:
+            raise NotFound(channel_id)
+        return self.remote[channel_id]
+
+
+def make_registry(client):
+    registry = ChannelRegistry(client.get_channel, client.fetch_channel, not_found_errors=(NotFound,))
+    registry.configure({'milestones': 1, 'pausas': 2, 'faltante': 3, 'sin configurar': None})
+    return registry
+
+
+def test_refresh_resolves_once_and_remembers_missing():
+    client = FakeClient(cached=[FakeChannel(1)], remote=[FakeChannel(2)])
+    registry = make_registry(client)
+
+    async def scenario():
+        missing = await registry.refresh()
+        # Los canales ya resueltos, y los faltantes, no vuelven a consultar la API
+        for _ in range(3):
+            assert (await registry.resolve(1)).id == 1
+            assert (await registry.resolve(2)).id == 2
+            assert await registry.resolve(3) is None
+        return missing
+
+    assert asyncio.run(scenario()) == ['faltante']
+    assert client.fetched == [2, 3]
+    assert registry.fetches == 2
+    assert "Resueltos: 2/3" in registry.status()
+    assert "Faltan: faltante" in registry.status()
+
+
+def test_update_and_remove_follow_discord_events():
+    client = FakeClient(cached=[FakeChannel(1, "antes")])
+    registry = make_registry(client)
+
+    async def scenario():
+        await registry.resolve(1)
+        registry.update(FakeChannel(1, "después"))
+        assert (await registry.resolve(1)).name == "después"
+        # Un canal que no es del bot no se guarda
+        registry.update(FakeChannel(99))
+        assert 99 not in registry._channels
+
+        registry.remove(1)
+        assert await registry.resolve(1) is None
+        assert registry.get(1) is None
+
+    asyncio.run(scenario())
+    assert client.fetched == []
+
+
+def test_get_uses_client_cache_without_api():
+    client = FakeClient(cached=[FakeChannel(5)], remote=[FakeChannel(6)])
+    registry = make_registry(client)
+    assert registry.get(5).id == 5
+    assert registry.get(6) is None
+    assert client.fetched == []
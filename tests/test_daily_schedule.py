@@ -0,0 +1,77 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_schedule import DailySchedule, next_week_start  # noqa: E402
+
+try:
+    import pytz
+
+    def zone(name):
+        return pytz.timezone(name)
+except ImportError:
+    from zoneinfo import ZoneInfo
+
+    class _LocalizingZone(ZoneInfo):
+        # Misma interfaz que pytz para lo que usa daily_schedule
+        def localize(self, dt):
+            return dt.replace(tzinfo=self)
+
+    def zone(name):
+        return _LocalizingZone(name)
+
+
+BOGOTA = zone("America/Bogota")
+NEW_YORK = zone("America/New_York")
+
+
+def local(tz, *args):
+    return tz.localize(datetime(*args))
+
+
+def test_window_that_crosses_midnight():
+    schedule = DailySchedule.from_config(BOGOTA, {'windows': [{'start': "22:00", 'end': "02:00"}]})
+
+    # A la 01:00 sigue abierta la ventana que empezó ayer a las 22:00
+    start, end = schedule.current_window(local(BOGOTA, 2026, 10, 17, 1, 0))
+    assert start == local(BOGOTA, 2026, 10, 16, 22, 0)
+    assert end == local(BOGOTA, 2026, 10, 17, 2, 0)
+
+    now = local(BOGOTA, 2026, 10, 17, 3, 0)
+    assert not schedule.is_open(now)
+    assert schedule.next_start(now) == local(BOGOTA, 2026, 10, 17, 22, 0)
+
+
+def test_window_until_end_of_day():
+    schedule = DailySchedule.from_config(BOGOTA, {})
+    assert schedule.is_open(local(BOGOTA, 2026, 10, 17, 23, 59))
+    midnight = local(BOGOTA, 2026, 10, 18, 0, 0)
+    assert not schedule.is_open(midnight)
+    assert schedule.next_start(midnight) == local(BOGOTA, 2026, 10, 18, 20, 16)
+    assert schedule.start_label(schedule.next_start(midnight)) == "20:16"
+
+
+def test_next_start_across_dst_change():
+    schedule = DailySchedule.from_config(NEW_YORK, {'windows': [{'start': "20:16"}, {'start': "08:00", 'end': "09:00"}]})
+
+    # Sábado antes del cambio al horario de verano (domingo 2026-03-08 a las 02:00)
+    next_start = schedule.next_start(local(NEW_YORK, 2026, 3, 7, 21, 0))
+    assert next_start == local(NEW_YORK, 2026, 3, 8, 8, 0)
+    assert next_start.utcoffset() == timedelta(hours=-4)
+    assert schedule.start_label(next_start) == "08:00"
+
+    after_morning = local(NEW_YORK, 2026, 3, 8, 9, 30)
+    assert not schedule.is_open(after_morning)
+    assert schedule.start_label(schedule.next_start(after_morning)) == "20:16"
+
+
+def test_next_week_start_across_dst_change():
+    # El horario de verano termina el domingo 2026-11-01: el lunes ya es UTC-5
+    week_start = next_week_start(NEW_YORK, local(NEW_YORK, 2026, 10, 31, 12, 0))
+    assert week_start == local(NEW_YORK, 2026, 11, 2, 0, 0)
+    assert week_start.utcoffset() == timedelta(hours=-5)
+
+    # El domingo a las 23:59 todavía no empezó la semana siguiente
+    assert next_week_start(BOGOTA, local(BOGOTA, 2026, 10, 18, 23, 59)) == local(BOGOTA, 2026, 10, 19, 0, 0)
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JsonStorage  # noqa: E402
+from time_tracker import TimeTracker  # noqa: E402
+
+
+def make_storage(tmp_path, checkpoint_every=500):
+    return JsonStorage(str(tmp_path / "user_times.json"), str(tmp_path / "attendance_data.json"),
+                       str(tmp_path / "preregistrations.json"), journal_file=str(tmp_path / "user_times.journal"),
+                       checkpoint_every=checkpoint_every)
+
+
+def test_journal_replays_changes_over_snapshot(tmp_path):
+    storage = make_storage(tmp_path)
+    users = {"1": {'name': "Uno", 'total_time': 10.0}, "2": {'name': "Dos", 'total_time': 20.0}}
+    storage.save_users(users)
+
+    users["1"]['total_time'] = 99.0
+    storage.save_user(users, "1")
+    del users["2"]
+    storage.save_user(users, "2")
+    users["3"] = {'name': "Tres", 'total_time': 0.0}
+    storage.save_user(users, "3")
+    storage.close()
+
+    # El snapshot sigue siendo el del checkpoint; los cambios solo están en el journal
+    with open(tmp_path / "user_times.json", encoding='utf-8') as f:
+        assert sorted(json.load(f)) == ["1", "2"]
+    with open(tmp_path / "user_times.journal", encoding='utf-8') as f:
+        assert [json.loads(line)['op'] for line in f] == ['set', 'del', 'set']
+
+    reloaded = make_storage(tmp_path)
+    assert reloaded.load_users() == users
+    assert reloaded.journal_entries == 3
+    reloaded.close()
+
+
+def test_journal_ignores_truncated_last_line(tmp_path):
+    storage = make_storage(tmp_path)
+    users = {"1": {'name': "Uno", 'total_time': 10.0}}
+    storage.save_users(users)
+    users["1"]['total_time'] = 15.0
+    storage.save_user(users, "1")
+    storage.close()
+
+    # Un proceso que murió a mitad de una escritura deja la última línea incompleta
+    with open(tmp_path / "user_times.journal", 'a', encoding='utf-8') as f:
+        f.write('{"op": "set", "id": "1", "data": {"na')
+
+    reloaded = make_storage(tmp_path)
+    assert reloaded.load_users() == {"1": {'name': "Uno", 'total_time': 15.0}}
+    reloaded.close()
+
+
+def test_journal_checkpoints_after_limit(tmp_path):
+    storage = make_storage(tmp_path, checkpoint_every=3)
+    users = {"1": {'name': "Uno", 'total_time': 0.0}}
+    storage.save_users(users)
+
+    for total in range(1, 4):
+        users["1"]['total_time'] = float(total)
+        storage.save_user(users, "1")
+    storage.close()
+
+    # El tercer cambio llegó al límite y se escribió como snapshot completo
+    assert os.path.getsize(tmp_path / "user_times.journal") == 0
+    with open(tmp_path / "user_times.json", encoding='utf-8') as f:
+        assert json.load(f)["1"]['total_time'] == 3.0
+    assert make_storage(tmp_path).load_users() == users
+
+
+def test_tracker_state_survives_restart_with_journal(tmp_path):
+    tracker = TimeTracker(storage=make_storage(tmp_path))
+    tracker.start_tracking(1, "Uno")
+    tracker.add_minutes(1, "Uno", 30)
+    tracker.start_tracking(2, "Dos")
+    tracker.cancel_user_tracking(2)
+    tracker.close()
+
+    reloaded = TimeTracker(storage=make_storage(tmp_path))
+    assert sorted(reloaded.users) == ["1"]
+    assert reloaded.get_user_data(1).is_active
+    assert reloaded.get_user_data(1).total_time == 1800
+    reloaded.close()
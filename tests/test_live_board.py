@@ -0,0 +1,32 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live_board import LiveBoard  # noqa: E402
+
+
+def test_failed_publish_is_retried(tmp_path):
+    calls = []
+
+    async def publish(channel_id, message_id, body):
+        calls.append(channel_id)
+        if len(calls) == 1:
+            raise RuntimeError("Discord no respondió")
+        return 99
+
+    async def scenario():
+        board = LiveBoard(lambda channel_id: "tablero", publish,
+                          state_file=str(tmp_path / "live_board.json"), min_interval=0.05)
+        board.add_channel(1)
+        task = asyncio.create_task(board.run(heartbeat_interval=0.02))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return board
+
+    board = asyncio.run(scenario())
+    assert calls == [1, 1]
+    assert board.channels == {1: 99}
+    assert board.failures == 1
+    assert LiveBoard(lambda channel_id: "", publish, state_file=str(tmp_path / "live_board.json")).channels == {1: 99}
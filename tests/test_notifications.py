@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifications import MAX_MESSAGE_CHARS, NotificationOutbox, OutboxJournal, pack_messages  # noqa: E402
+
+
+async def run_until(outbox, condition, timeout=1.0):
+    """Correr el outbox hasta que `condition()` se cumpla y detenerlo"""
+    task = asyncio.create_task(outbox.run())
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not condition():
+            assert loop.time() < deadline, "el outbox no terminó a tiempo"
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_pack_messages_fills_each_send():
+    contents = ["a" * 900, "b" * 900, "c" * 900, "d" * 10]
+    assert pack_messages(contents) == [[0, 1], [2, 3]]
+    assert pack_messages(["x" * (MAX_MESSAGE_CHARS + 50), "y"]) == [[0], [1]]
+
+
+def test_outbox_coalesces_each_channel_in_order():
+    sent = []
+
+    async def send(channel_id, content):
+        sent.append((channel_id, content))
+
+    async def scenario():
+        outbox = NotificationOutbox(send, linger=0.05)
+        for hour in range(1, 4):
+            outbox.enqueue(1, 'milestone', f"Usuario {hour}")
+        outbox.enqueue(2, 'pause', "Pausa")
+        await run_until(outbox, lambda: outbox.delivered == 4)
+        return outbox
+
+    outbox = asyncio.run(scenario())
+    assert sorted(sent) == [(1, "Usuario 1\n\nUsuario 2\n\nUsuario 3"), (2, "Pausa")]
+    assert outbox.messages_sent == 2
+    assert outbox.pending() == 0
+
+
+def test_outbox_requeues_batch_when_sender_is_cancelled():
+    sent = []
+    started = None
+
+    async def blocked_send(channel_id, content):
+        started.set()
+        await asyncio.Event().wait()
+
+    async def send(channel_id, content):
+        sent.append(content)
+
+    async def scenario():
+        nonlocal started
+        started = asyncio.Event()
+        outbox = NotificationOutbox(blocked_send, linger=0)
+        outbox.enqueue(1, 'milestone', "Uno", key="k1")
+        outbox.enqueue(1, 'attendance', "Dos")
+        task = asyncio.create_task(outbox.run())
+        await asyncio.wait_for(started.wait(), 1.0)
+        # Reinicio del supervisor a mitad del envío
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert outbox.pending() == 2
+
+        outbox.send = send
+        await run_until(outbox, lambda: outbox.delivered == 2)
+
+    asyncio.run(scenario())
+    assert sent == ["Uno\n\nDos"]
+
+
+def test_durable_notifications_survive_restart(tmp_path):
+    path = str(tmp_path / "notification_outbox.jsonl")
+    sent = []
+
+    async def failing_send(channel_id, content):
+        raise RuntimeError("sin conexión")
+
+    async def send(channel_id, content):
+        sent.append(content)
+
+    first = NotificationOutbox(failing_send, journal=OutboxJournal(path))
+    first.enqueue(1, 'milestone', "Hito de 1 hora", key="milestone:1:100:1")
+    first.enqueue(1, 'pause', "Sin clave, no se guarda")
+    first.close()
+
+    # Al reiniciar solo vuelve la notificación con clave
+    second = NotificationOutbox(send, linger=0, journal=OutboxJournal(path))
+    assert second.pending() == 1
+    assert second.enqueue(1, 'milestone', "Hito de 1 hora", key="milestone:1:100:1") is None
+
+    async def scenario():
+        await run_until(second, lambda: second.delivered == 1)
+
+    asyncio.run(scenario())
+    second.close()
+    assert sent == ["Hito de 1 hora"]
+
+    # Entregada: un tercer arranque no la reenvía y sigue deduplicando su clave
+    third = NotificationOutbox(send, journal=OutboxJournal(path))
+    assert third.pending() == 0
+    assert third.enqueue(1, 'milestone', "Hito de 1 hora", key="milestone:1:100:1") is None
+    assert third.duplicates == 1
+    third.close()
+
+
+def test_dedupe_keys_expire_after_ttl(tmp_path):
+    async def send(channel_id, content):
+        pass
+
+    outbox = NotificationOutbox(send, dedupe_ttl=60.0)
+    outbox._delivered_keys["milestone:1:100:1"] = 0.0
+    outbox._delivered_keys["milestone:1:200:1"] = float("inf")
+    assert outbox.enqueue(1, 'milestone', "Hito", key="milestone:1:100:1") is not None
+    assert outbox.enqueue(1, 'milestone', "Hito", key="milestone:1:200:1") is None
+
+
+def test_journal_compaction_keeps_only_needed_lines(tmp_path):
+    path = str(tmp_path / "notification_outbox.jsonl")
+    sent = []
+
+    async def send(channel_id, content):
+        sent.append(content)
+
+    outbox = NotificationOutbox(send, linger=0, journal=OutboxJournal(path, compact_every=6))
+    for number in range(3):
+        outbox.enqueue(1, 'milestone', f"Hito {number}", key=f"k{number}")
+
+    async def scenario():
+        await run_until(outbox, lambda: outbox.delivered == 3)
+        outbox.enqueue(1, 'milestone', "Pendiente", key="k3")
+
+    asyncio.run(scenario())
+    outbox.close()
+
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    # 3 "done" de la compactación más la nueva "add"
+    assert len(lines) == 4
+    reloaded = NotificationOutbox(send, journal=OutboxJournal(path))
+    assert reloaded.pending() == 1
+    assert reloaded.enqueue(1, 'milestone', "Hito 0", key="k0") is None
+    reloaded.close()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import PRIORITY_DIAGNOSTICS, PRIORITY_MILESTONE, RateLimiter, TokenBucket  # noqa: E402
+
+
+def test_token_bucket_refills_and_blocks():
+    bucket = TokenBucket(rate=2.0, capacity=2.0, now=100.0)
+    bucket.take(100.0)
+    bucket.take(100.0)
+    assert bucket.delay(100.0) == 0.5
+    assert bucket.delay(100.5) == 0.0
+
+    # Un 429 deja un solo token para cuando termine el bloqueo
+    bucket.block(110.0)
+    assert bucket.delay(105.0) == 5.0
+    assert bucket.delay(110.0) == 0.0
+    bucket.take(110.0)
+    assert bucket.delay(110.0) == 0.5
+
+
+def test_penalize_blocks_only_that_channel():
+    limiter = RateLimiter(global_rate=1000.0, global_burst=1000.0, channel_rate=1000.0, channel_burst=10.0)
+
+    async def scenario():
+        limiter.penalize(1, 0.2)
+        start = time.monotonic()
+        await limiter.acquire(2)
+        other_channel = time.monotonic() - start
+        await limiter.acquire(1)
+        penalized_channel = time.monotonic() - start
+        return other_channel, penalized_channel
+
+    other_channel, penalized_channel = asyncio.run(scenario())
+    assert other_channel < 0.05
+    assert penalized_channel >= 0.19
+    assert limiter.rate_limited == 1
+
+
+def test_global_penalize_blocks_every_channel():
+    limiter = RateLimiter(global_rate=1000.0, global_burst=1000.0, channel_rate=1000.0, channel_burst=10.0)
+
+    async def scenario():
+        limiter.penalize(1, 0.2, is_global=True)
+        start = time.monotonic()
+        await limiter.acquire(2)
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) >= 0.19
+
+
+def test_higher_priority_goes_first_when_tokens_run_out():
+    limiter = RateLimiter(global_rate=20.0, global_burst=1.0, channel_rate=1000.0, channel_burst=10.0)
+    order = []
+
+    async def send(name, priority):
+        await limiter.acquire(name, priority)
+        order.append(name)
+
+    async def scenario():
+        await limiter.acquire("inicial")
+        # Sin token global: las tres esperan y sale primero el milestone aunque llegó último
+        await asyncio.gather(send("diagnóstico 1", PRIORITY_DIAGNOSTICS),
+                             send("diagnóstico 2", PRIORITY_DIAGNOSTICS),
+                             send("milestone", PRIORITY_MILESTONE))
+
+    asyncio.run(scenario())
+    assert order == ["milestone", "diagnóstico 1", "diagnóstico 2"]
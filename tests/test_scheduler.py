@@ -0,0 +1,106 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import DeadlineScheduler, TimingWheelScheduler  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+async def noop():
+    return None
+
+
+def drain(scheduler, clock, until, step):
+    """Avanzar el reloj de a `step` segundos y devolver (clave, momento en que venció)"""
+    fired = []
+    while clock.now < until:
+        clock.now = min(until, clock.now + step)
+        fired.extend((key, clock.now) for key, _ in scheduler.pop_due(clock.now))
+    return fired
+
+
+def test_timing_wheel_fires_every_level_in_order():
+    clock = FakeClock()
+    wheel = TimingWheelScheduler(tick_seconds=1.0, clock=clock)
+    rng = random.Random(7)
+    # Distancias que caen en el primer nivel, en los intermedios y más allá de la cascada
+    deadlines = {key: clock.now + rng.uniform(0, 200_000) for key in range(2000)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline, noop)
+    assert len(wheel) == 2000
+
+    fired = drain(wheel, clock, clock.now + 200_010, 997.0)
+    assert sorted(key for key, _ in fired) == sorted(deadlines)
+    assert len(wheel) == 0
+
+    for key, fired_at in fired:
+        # Nunca antes de su fecha y, como mucho, un tick después de la pasada que la cubre
+        assert fired_at >= deadlines[key]
+        assert fired_at - deadlines[key] < 997.0 + 1.0
+    # Los ticks salen en orden: dos temporizadores solo se invierten dentro del mismo tick
+    ordered = [deadlines[key] for key, _ in fired]
+    for earlier, later in zip(ordered, ordered[1:]):
+        assert later >= earlier - 1.0
+
+
+def test_timing_wheel_fires_within_one_tick():
+    clock = FakeClock()
+    wheel = TimingWheelScheduler(tick_seconds=0.25, clock=clock)
+    deadlines = {"cerca": clock.now + 3.1, "nivel1": clock.now + 300.0, "nivel2": clock.now + 5000.0}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline, noop)
+
+    fired = drain(wheel, clock, clock.now + 5001.0, 0.25)
+    assert [key for key, _ in fired] == ["cerca", "nivel1", "nivel2"]
+    for key, fired_at in fired:
+        assert deadlines[key] <= fired_at < deadlines[key] + 0.5
+
+
+def test_timing_wheel_reschedule_and_cancel():
+    clock = FakeClock()
+    wheel = TimingWheelScheduler(tick_seconds=1.0, clock=clock)
+    wheel.schedule("a", clock.now + 10, noop)
+    wheel.schedule("b", clock.now + 20, noop)
+    wheel.schedule("c", clock.now + 70_000, noop)
+
+    wheel.schedule("a", clock.now + 40_000, noop)
+    assert wheel.deadline("a") == clock.now + 40_000
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+    assert wheel.cancel_kind("nada") == 0
+
+    fired = drain(wheel, clock, clock.now + 80_000, 100.0)
+    assert [key for key, _ in fired] == ["a", "c"]
+
+
+def test_timing_wheel_matches_deadline_scheduler():
+    clock = FakeClock()
+    wheel = TimingWheelScheduler(tick_seconds=1.0, clock=clock)
+    heap = DeadlineScheduler(clock=clock)
+    rng = random.Random(11)
+    for key in range(500):
+        deadline = clock.now + rng.uniform(0, 20_000)
+        wheel.schedule(key, deadline, noop)
+        heap.schedule(key, deadline, noop)
+    for key in rng.sample(range(500), 100):
+        wheel.cancel(key)
+        heap.cancel(key)
+
+    wheel_fired, heap_fired = [], []
+    until = clock.now + 20_005
+    while clock.now < until:
+        clock.now += 50.0
+        wheel_fired.append(sorted(key for key, _ in wheel.pop_due(clock.now)))
+        heap_fired.append(sorted(key for key, _ in heap.pop_due(clock.now)))
+    # Con pasadas más largas que un tick, los dos vencen lo mismo en cada pasada salvo
+    # lo que cae en el último tick (la rueda lo entrega en la pasada siguiente)
+    assert sorted(k for keys in wheel_fired for k in keys) == sorted(k for keys in heap_fired for k in keys)
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage, _SCHEMA  # noqa: E402
+from time_tracker import TimeTracker  # noqa: E402
+
+
+def test_sqlite_preregistration_keeps_activate_at(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    preregistrations = {
+        "123": {
+            'name': "Usuario",
+            'registered_by_id': 42,
+            'registered_by_name': "Admin",
+            'registered_at': "2026-10-16T18:00:00-05:00",
+            'activate_at': "2026-10-16T20:16:00-05:00",
+        },
+        "456": {
+            'name': "Formato anterior",
+            'registered_by_id': 42,
+            'registered_by_name': "Admin",
+            'registered_at': "2026-10-16T18:05:00-05:00",
+        },
+    }
+
+    storage = SQLiteStorage(db_file)
+    storage.save_preregistrations(preregistrations)
+    storage.save_preregistration(preregistrations, "123")
+    storage.close()
+
+    reloaded = SQLiteStorage(db_file)
+    assert reloaded.load_preregistrations() == preregistrations
+    reloaded.close()
+
+
+def test_sqlite_adds_activate_at_to_existing_database(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE preregistrations (user_id TEXT PRIMARY KEY, name TEXT, registered_by_id INTEGER, "
+                 "registered_by_name TEXT, registered_at TEXT)")
+    conn.execute("INSERT INTO preregistrations VALUES ('123', 'Usuario', 42, 'Admin', '2026-10-16T18:00:00-05:00')")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(db_file)
+    data = storage.load_preregistrations()
+    assert data["123"]['registered_at'] == "2026-10-16T18:00:00-05:00"
+    assert 'activate_at' not in data["123"]
+
+    data["123"]['activate_at'] = "2026-10-16T20:16:00-05:00"
+    storage.save_preregistration(data, "123")
+    assert storage.load_preregistrations()["123"]['activate_at'] == "2026-10-16T20:16:00-05:00"
+    storage.close()
+
+
+def test_sqlite_failed_background_write_stays_pending(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "time_tracker.db"))
+    tracker = TimeTracker(storage=storage, background_writes=True)
+    tracker.start_tracking(1, "Usuario")
+    tracker.flush(wait=True)
+    assert tracker.pending_changes() == 0
+
+    storage.conn.execute("DROP TABLE users")
+    tracker.stop_tracking(1)
+    tracker.flush(wait=True)
+    assert tracker.pending_changes() == 1
+
+    # Al recuperar la tabla el siguiente flush escribe el cambio que había quedado pendiente
+    storage.conn.executescript(_SCHEMA)
+    tracker.flush(wait=True)
+    assert tracker.pending_changes() == 0
+    assert not SQLiteStorage(str(tmp_path / "time_tracker.db")).load_users()["1"]['is_active']
+    tracker.close()
+
+
+def test_sqlite_keeps_highest_notified_hour_in_its_column(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    storage = SQLiteStorage(db_file)
+    users = {"1": {'name': "Usuario", 'total_time': 7300.0, 'sessions': [], 'highest_notified_hour': 2,
+                   'notified_milestones': [3600, 7200]}}
+    storage.save_user(users, "1")
+    row = storage.conn.execute("SELECT highest_notified_hour, extra FROM users WHERE user_id = '1'").fetchone()
+    assert row == (2, None)
+    assert storage.load_users()["1"]['highest_notified_hour'] == 2
+    storage.close()
+
+
+def test_sqlite_adds_highest_notified_hour_to_existing_database(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, name TEXT, total_time REAL NOT NULL DEFAULT 0, "
+                 "is_active INTEGER NOT NULL DEFAULT 0, is_paused INTEGER NOT NULL DEFAULT 0, "
+                 "pause_count INTEGER NOT NULL DEFAULT 0, milestone_completed INTEGER NOT NULL DEFAULT 0, "
+                 "notified_milestones TEXT NOT NULL DEFAULT '[]', last_start TEXT, pause_start TEXT, "
+                 "initiator_admin_id INTEGER, initiator_admin_name TEXT, initiator_timestamp TEXT, "
+                 "linked_admin_id INTEGER, linked_admin_name TEXT, linked_at TEXT, extra TEXT)")
+    conn.execute("INSERT INTO users (user_id, name, notified_milestones, extra) "
+                 "VALUES ('1', 'Con extra', '[3600]', '{\"highest_notified_hour\": 3}')")
+    conn.execute("INSERT INTO users (user_id, name, notified_milestones) VALUES ('2', 'Formato anterior', '[3600]')")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(db_file)
+    users = storage.load_users()
+    assert users["1"]['highest_notified_hour'] == 3
+    assert 'highest_notified_hour' not in users["2"]
+    assert users["2"]['notified_milestones'] == [3600]
+    storage.close()
+
+
+def test_sqlite_attendance_week_fields_use_columns(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    attendance = {
+        "42": {
+            'name': "Admin",
+            'daily_attendance': {"2026-10-16": 2},
+            'total_attendance': 9,
+            'manual_weekly_attendance': 1,
+            'week': "2026-W42",
+            'weekly_attendance': 3,
+            'weekly_history': {"2026-W41": 6},
+        }
+    }
+
+    storage = SQLiteStorage(db_file)
+    storage.save_admin_attendance(attendance, "42")
+    row = storage.conn.execute("SELECT week, weekly_attendance, extra FROM attendance WHERE admin_id = '42'").fetchone()
+    assert row == ("2026-W42", 3, None)
+    storage.close()
+
+    reloaded = SQLiteStorage(db_file)
+    assert reloaded.load_attendance() == attendance
+    reloaded.close()
+
+
+def test_sqlite_adds_attendance_week_columns_to_existing_database(tmp_path):
+    db_file = str(tmp_path / "time_tracker.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE attendance (admin_id TEXT PRIMARY KEY, name TEXT, "
+                 "total_attendance INTEGER NOT NULL DEFAULT 0, manual_weekly_attendance INTEGER, extra TEXT)")
+    conn.execute("INSERT INTO attendance VALUES ('42', 'Admin', 4, 0, "
+                 "'{\"week\": \"2026-W41\", \"weekly_attendance\": 4, \"weekly_history\": {}}')")
+    conn.execute("INSERT INTO attendance VALUES ('43', 'Formato anterior', 2, 0, NULL)")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(db_file)
+    data = storage.load_attendance()
+    assert data["42"]['week'] == "2026-W41"
+    assert data["42"]['weekly_attendance'] == 4
+    assert 'week' not in data["43"]
+    storage.close()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supervisor import TaskSupervisor  # noqa: E402
+
+
+def test_failed_job_is_restarted_with_backoff():
+    runs = []
+
+    async def job(supervised):
+        runs.append(supervised.restarts)
+        supervised.beat()
+        if len(runs) < 3:
+            raise RuntimeError(f"falla {len(runs)}")
+        await asyncio.Event().wait()
+
+    async def scenario():
+        supervisor = TaskSupervisor(base_backoff=0.01, max_backoff=1.0, check_interval=0.01)
+        supervisor.register("trabajo", job)
+        assert supervisor.start() == ["trabajo"]
+        # Ya está corriendo: volver a llamar start() no lanza otra copia
+        assert supervisor.start() == []
+        await asyncio.sleep(0.2)
+        supervised = supervisor.jobs["trabajo"]
+        status = supervisor.status()
+        await supervisor.stop()
+        return supervised, status
+
+    supervised, status = asyncio.run(scenario())
+    assert runs == [0, 1, 2]
+    assert supervised.restarts == 2
+    assert supervised.last_error == "RuntimeError: falla 2"
+    assert status[0].startswith("trabajo: activo, reinicios 2")
+    assert supervised.task.done()
+
+
+def test_stalled_job_is_cancelled_and_restarted():
+    runs = []
+    cancelled = []
+
+    async def job(supervised):
+        runs.append(len(runs))
+        supervised.beat()
+        try:
+            # Nunca vuelve a latir
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(len(runs))
+            raise
+
+    async def scenario():
+        supervisor = TaskSupervisor(base_backoff=0.01, max_backoff=1.0, check_interval=0.01)
+        supervisor.register("bloqueado", job, stall_after=0.05)
+        supervisor.start()
+        await asyncio.sleep(0.15)
+        supervised = supervisor.jobs["bloqueado"]
+        await supervisor.stop()
+        return supervised
+
+    supervised = asyncio.run(scenario())
+    assert len(runs) >= 2
+    assert cancelled[0] == 1
+    assert supervised.last_error == "sin latido por más de 0s"
+
+
+def test_register_keeps_existing_job():
+    async def job(supervised):
+        pass
+
+    async def other(supervised):
+        pass
+
+    supervisor = TaskSupervisor()
+    first = supervisor.register("trabajo", job)
+    assert supervisor.register("trabajo", other) is first
+    assert first.factory is job
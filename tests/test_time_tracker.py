@@ -0,0 +1,139 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JsonStorage, SQLiteStorage  # noqa: E402
+from time_tracker import TimeTracker  # noqa: E402
+
+
+def make_tracker(tmp_path):
+    storage = JsonStorage(str(tmp_path / "user_times.json"), str(tmp_path / "attendance_data.json"),
+                          str(tmp_path / "preregistrations.json"))
+    return TimeTracker(storage=storage)
+
+
+def test_batch_rollback_restores_touched_records(tmp_path):
+    tracker = make_tracker(tmp_path)
+    tracker.start_tracking(1, "Uno")
+    tracker.add_minutes(1, "Uno", 30)
+    tracker.preregister_user(3, "Tres", 42, "Admin")
+    tracker.add_attendance(42, "Admin")
+    before_total = tracker.get_user_data(1).total_time
+
+    with pytest.raises(RuntimeError):
+        with tracker.batch():
+            tracker.add_minutes(1, "Uno", 60)
+            tracker.start_tracking(2, "Dos")
+            tracker.remove_preregistrations(["3"])
+            tracker.add_attendance(42, "Admin")
+            raise RuntimeError("falla a mitad del batch")
+
+    assert tracker.get_user_data(1).total_time == before_total
+    assert tracker.get_user_data(2) is None
+    assert "3" in tracker.get_preregistered_users()
+    assert tracker.get_total_attendance(42) == 1
+    assert tracker.pending_changes() == 0
+
+
+def test_batch_rollback_restores_cleared_collection(tmp_path):
+    tracker = make_tracker(tmp_path)
+    tracker.start_tracking(1, "Uno")
+    tracker.start_tracking(2, "Dos")
+
+    with pytest.raises(RuntimeError):
+        with tracker.batch():
+            tracker.stop_tracking(1)
+            tracker.clear_all_data()
+            tracker.start_tracking(3, "Tres")
+            raise RuntimeError("falla a mitad del batch")
+
+    assert sorted(tracker.users) == ["1", "2"]
+    assert tracker.get_user_data(1).is_active
+    assert sorted(tracker.get_active_user_ids()) == ["1", "2"]
+
+
+def test_batch_only_copies_touched_records(tmp_path):
+    tracker = make_tracker(tmp_path)
+    for user_id in range(1, 6):
+        tracker.start_tracking(user_id, f"Usuario {user_id}")
+
+    with tracker.batch():
+        tracker.stop_tracking(1)
+        assert set(tracker._undo) == {('users', '1')}
+    assert tracker._undo is None
+
+
+def test_weekly_rollover_archives_closed_week(tmp_path):
+    tracker = make_tracker(tmp_path)
+    tracker.add_manual_attendance(42, "Admin", 5)
+    # Simular que esas asistencias quedaron en una semana ya cerrada
+    tracker.attendance_data["42"]['week'] = "2020-W01"
+
+    assert tracker.get_weekly_attendance(42) == 0
+    assert tracker.get_weekly_history(42) == {"2020-W01": 5}
+    assert tracker.rollover_attendance_week() == 1
+    assert tracker.rollover_attendance_week() == 0
+
+    admin_data = tracker.attendance_data["42"]
+    assert admin_data['weekly_history'] == {"2020-W01": 5}
+    assert admin_data['weekly_attendance'] == 0
+    assert admin_data['manual_weekly_attendance'] == 0
+    assert tracker.get_total_attendance(42) == 5
+
+    reloaded = make_tracker(tmp_path)
+    assert reloaded.get_weekly_history(42) == {"2020-W01": 5}
+
+
+class CountingStorage(JsonStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = []
+
+    def prepare_write(self, collection, data, key=None):
+        self.writes.append((collection, key))
+        return super().prepare_write(collection, data, key)
+
+
+def test_batch_activation_persists_once_with_same_start(tmp_path):
+    storage = CountingStorage(str(tmp_path / "user_times.json"), str(tmp_path / "attendance_data.json"),
+                              str(tmp_path / "preregistrations.json"))
+    tracker = TimeTracker(storage=storage)
+    with tracker.batch():
+        for user_id in range(1, 51):
+            tracker.preregister_user(user_id, f"Usuario {user_id}", 42, "Admin")
+    storage.writes.clear()
+
+    activated = tracker.activate_preregistrations([str(user_id) for user_id in range(1, 51)] + ["999"], now=1000.0)
+    assert sorted(activated, key=int) == [str(user_id) for user_id in range(1, 51)]
+    # Un solo archivo de usuarios y uno de pre-registros para toda la cohorte
+    assert sorted(storage.writes) == [('preregistrations', None), ('users', None)]
+    assert {tracker.get_user_data(user_id).last_start for user_id in range(1, 51)} == {1000.0}
+    assert tracker.get_preregistered_users() == {}
+    assert all(tracker.get_time_initiator(user_id).admin_id == 42 for user_id in range(1, 51))
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_active_sessions_survive_restart_for_catch_up(tmp_path, backend):
+    # La recuperación al iniciar (run_startup_catch_up en bot.py) se basa solo en
+    # last_start de los usuarios activos: tiene que volver igual tras un reinicio
+    def open_tracker():
+        if backend == "sqlite":
+            return TimeTracker(storage=SQLiteStorage(str(tmp_path / "time_tracker.db")))
+        return make_tracker(tmp_path)
+
+    tracker = open_tracker()
+    tracker.start_tracking(1, "Vencido", now=1000.0)
+    tracker.start_tracking(2, "A tiempo", now=5000.0)
+    tracker.start_tracking(3, "Pausado", now=1000.0)
+    tracker.pause_tracking(3)
+    tracker.close()
+
+    reloaded = open_tracker()
+    active = {user_id_str: user_data.last_start for user_id_str, user_data in reloaded.iter_active()}
+    assert active == {"1": 1000.0, "2": 5000.0}
+    overdue = sorted(user_id_str for user_id_str, last_start in active.items() if last_start + 3600 <= 5000.0)
+    assert overdue == ["1"]
+    reloaded.close()
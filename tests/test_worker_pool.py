@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_pool import AdaptiveWorkerPool  # noqa: E402
+
+
+class RecordingPool(AdaptiveWorkerPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = []
+
+    def _adjust(self, duration):
+        super()._adjust(duration)
+        self.limits.append(self.limit)
+
+
+def test_in_flight_never_exceeds_limit_after_decrease():
+    pool = RecordingPool(min_concurrency=1, max_concurrency=8, target_latency=0.02, task_timeout=1.0)
+    started_over_limit = []
+
+    async def task(duration):
+        # Al empezar, las tareas en curso (incluida esta) no pueden superar el límite
+        if pool.active > pool.limit:
+            started_over_limit.append((pool.active, pool.limit))
+        await asyncio.sleep(duration)
+
+    # Tareas rápidas que suben el límite, luego lentas que lo bajan a la mitad
+    durations = [0] * 30 + [0.05, 0, 0, 0.05, 0, 0, 0, 0.05] + [0] * 20
+
+    report = asyncio.run(pool.run_cycle("prueba", durations, task))
+    assert report.processed == len(durations)
+    # El límite llegó al máximo y después se redujo con las tareas lentas
+    peak = pool.limits.index(8)
+    assert min(pool.limits[peak:]) < 8
+    assert started_over_limit == []
+    assert pool.active == 0
+
+
+def test_waiting_task_cancelled_after_wake_passes_its_turn():
+    pool = AdaptiveWorkerPool(min_concurrency=1, max_concurrency=1, target_latency=10.0)
+
+    async def scenario():
+        release = asyncio.Event()
+        first = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pool.run(lambda: asyncio.sleep(0)))
+        third = asyncio.create_task(pool.run(lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+
+        release.set()
+        await first
+        second.cancel()
+        await asyncio.wait_for(third, 1.0)
+        return second
+
+    second = asyncio.run(scenario())
+    assert second.cancelled()
+    assert pool.active == 0
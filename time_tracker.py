@@ -1,71 +1,384 @@
 
-import json
-import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+import copy
+import time
+from types import MappingProxyType
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from records import UserRecord, Initiator, Link, Session, epoch_to_iso
+from storage import StorageBackend, JsonStorage, PersistenceWorker
+
+# Marca en el registro de deshacer de un batch las claves que no existían antes de modificarlas
+_MISSING = object()
 
 class TimeTracker:
-    def __init__(self, data_file: str = "user_times.json"):
-        self.data_file = data_file
+    def __init__(self, data_file: str = "user_times.json", journal_file: Optional[str] = None,
+                 checkpoint_every: int = 500, storage: Optional[StorageBackend] = None,
+                 save_interval: float = 0, max_pending_changes: int = 500,
+                 max_pending_age: Optional[float] = None, background_writes: bool = False,
+                 timezone=None):
+        # Por defecto se usan los archivos JSON; se puede pasar otro backend (por ejemplo SQLite)
+        if storage is None:
+            storage = JsonStorage(data_file, "attendance_data.json", "preregistrations.json",
+                                  journal_file=journal_file, checkpoint_every=checkpoint_every)
+        self.storage = storage
+
+        # Write-behind: con save_interval > 0 (segundos) los cambios solo se marcan como
+        # pendientes y se escriben juntos en flush(); con 0 cada cambio se escribe al momento
+        self.save_interval = save_interval
+        self.max_pending_changes = max_pending_changes
+        self.max_pending_age = max_pending_age if max_pending_age is not None else save_interval
+        self._pending_keys = {'users': set(), 'attendance': set(), 'preregistrations': set()}
+        self._pending_full = set()
+        self._pending_since = None
+        self._last_flush = time.monotonic()
+        self._batch_depth = 0
+        # Registro de deshacer del batch abierto: (colección, clave) -> estado previo;
+        # clave None guarda la colección completa. None fuera de un batch
+        self._undo: Optional[Dict[Tuple[str, Optional[str]], Any]] = None
+
+        # Con background_writes las escrituras se preparan aquí y un único hilo las
+        # ejecuta, así el event loop del bot nunca espera al disco
+        self.writer = PersistenceWorker() if background_writes else None
+
+        # Índices secundarios en memoria; se actualizan en _save_user y se reconstruyen al cargar
+        self._active_ids: Set[str] = set()
+        self._by_initiator: Dict[int, Set[str]] = {}
+        self._index_entries: Dict[str, Tuple[bool, Optional[int]]] = {}
+
         self.data = self.load_data()
-        self.attendance_file = "attendance_data.json"
+        self._rebuild_indexes()
+
+        # Vista de solo lectura sobre self.data (no copia) y contador de cambios: cada
+        # modificación de usuarios lo incrementa, así quien recorre puede saber si algo cambió
+        self.users: Mapping[str, UserRecord] = MappingProxyType(self.data)
+        self.generation = 0
+        self._user_listeners: List[Callable[[Optional[str]], None]] = []
+        # Zona horaria (tzinfo) de los días y semanas de asistencias; None = hora del servidor
+        self.timezone = timezone
         self.attendance_data = self.load_attendance_data()
-        self.preregistration_file = "preregistrations.json"
+        self._migrate_attendance()
         self.preregistration_data = self.load_preregistration_data()
 
-    def load_data(self) -> Dict[str, Any]:
-        """Cargar datos desde el archivo JSON"""
+    def load_data(self) -> Dict[str, UserRecord]:
+        """Cargar datos de usuarios desde el almacenamiento"""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
+            users = self.storage.load_users()
+            return {user_id_str: UserRecord.from_dict(user_data) for user_id_str, user_data in users.items()}
         except Exception as e:
             print(f"Error cargando datos: {e}")
             return {}
 
     def save_data(self) -> None:
-        """Guardar datos al archivo JSON"""
+        """Guardar todos los datos de usuarios (en modo journal funciona como checkpoint)"""
+        self._rebuild_indexes()
+        self.generation += 1
+        self._notify_user_changed(None)
+        self._persist('users')
+
+    def save_user_data(self, user_id: int) -> None:
+        """Guardar los datos de un solo usuario (tras modificarlos desde fuera del tracker)"""
+        self._save_user(str(user_id))
+
+    def _save_user(self, user_id_str: str) -> None:
+        """Persistir el cambio de un solo usuario"""
+        self._reindex_user(user_id_str)
+        self.generation += 1
+        self._notify_user_changed(user_id_str)
+        self._persist('users', user_id_str)
+
+    def add_user_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """Registrar una función que se llama con el ID de cada usuario modificado.
+
+        Se llama con None cuando cambian todos los usuarios a la vez (carga completa,
+        limpieza o rollback de un batch).
+        """
+        self._user_listeners.append(listener)
+
+    def _notify_user_changed(self, user_id_str: Optional[str]) -> None:
+        for listener in self._user_listeners:
+            try:
+                listener(user_id_str)
+            except Exception as e:
+                print(f"Error notificando cambio de usuario {user_id_str}: {e}")
+
+    def _reindex_user(self, user_id_str: str) -> None:
+        """Actualizar los índices secundarios de un usuario tras modificarlo o eliminarlo"""
+        user_data = self.data.get(user_id_str)
+        if user_data is None:
+            entry = None
+        else:
+            entry = (
+                user_data.is_active,
+                user_data.time_initiator.admin_id if user_data.time_initiator else None
+            )
+
+        old_entry = self._index_entries.get(user_id_str)
+        if entry == old_entry:
+            return
+
+        if old_entry is not None:
+            _, old_initiator = old_entry
+            self._active_ids.discard(user_id_str)
+            self._remove_from_index(self._by_initiator, old_initiator, user_id_str)
+
+        if entry is None:
+            self._index_entries.pop(user_id_str, None)
+            return
+
+        is_active, initiator_id = entry
+        if is_active:
+            self._active_ids.add(user_id_str)
+        if initiator_id is not None:
+            self._by_initiator.setdefault(initiator_id, set()).add(user_id_str)
+        self._index_entries[user_id_str] = entry
+
+    @staticmethod
+    def _remove_from_index(index: Dict[int, Set[str]], admin_id: Optional[int], user_id_str: str) -> None:
+        if admin_id is None:
+            return
+        user_ids = index.get(admin_id)
+        if user_ids is not None:
+            user_ids.discard(user_id_str)
+            if not user_ids:
+                del index[admin_id]
+
+    def _rebuild_indexes(self) -> None:
+        """Reconstruir todos los índices secundarios desde self.data"""
+        self._active_ids = set()
+        self._by_initiator = {}
+        self._index_entries = {}
+        for user_id_str in self.data:
+            self._reindex_user(user_id_str)
+
+    def get_active_user_ids(self) -> List[str]:
+        """IDs de los usuarios con tiempo activo"""
+        return list(self._active_ids)
+
+    def get_user_ids_initiated_by(self, admin_id: int) -> List[str]:
+        """IDs de los usuarios cuyo tiempo inició un admin"""
+        return list(self._by_initiator.get(admin_id, ()))
+
+    def _save_admin_attendance(self, admin_id_str: str) -> None:
+        """Persistir las asistencias de un solo administrador"""
+        self._persist('attendance', admin_id_str)
+
+    def _save_preregistration(self, user_id_str: str) -> None:
+        """Persistir el cambio de un solo pre-registro"""
+        self._persist('preregistrations', user_id_str)
+
+    def _persist(self, collection: str, key: Optional[str] = None) -> None:
+        """Escribir un cambio ahora o dejarlo pendiente si hay write-behind o un batch abierto"""
+        if self.save_interval > 0 or self._batch_depth > 0:
+            self._mark_pending(collection, key)
+        elif not self._write(collection, key):
+            self._mark_pending(collection, key)
+
+    def _mark_pending(self, collection: str, key: Optional[str] = None) -> None:
+        """Marcar una colección completa (key=None) o una sola clave como pendiente de guardar"""
+        if key is None:
+            self._pending_full.add(collection)
+            self._pending_keys[collection].clear()
+        elif collection not in self._pending_full:
+            self._pending_keys[collection].add(key)
+
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def _collection(self, collection: str) -> Dict[str, Any]:
+        return {
+            'users': self.data,
+            'attendance': self.attendance_data,
+            'preregistrations': self.preregistration_data,
+        }[collection]
+
+    def _touch(self, collection: str, key: Optional[str] = None) -> None:
+        """Guardar en el registro de deshacer el estado de una clave (o de la colección completa
+        con key=None) antes de modificarla por primera vez dentro del batch"""
+        if self._undo is None or (collection, None) in self._undo or (collection, key) in self._undo:
+            return
+        data = self._collection(collection)
+        if key is None:
+            self._undo[(collection, None)] = copy.deepcopy(data)
+        else:
+            self._undo[(collection, key)] = copy.deepcopy(data[key]) if key in data else _MISSING
+
+    def _write(self, collection: str, key: Optional[str] = None) -> bool:
+        """Escribir en el almacenamiento una colección completa o una sola clave"""
+        data = self._collection(collection)
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            job = self.storage.prepare_write(collection, data, key)
+            if self.writer is not None:
+                self.writer.submit(collection, key, job)
+            else:
+                job()
+            return True
         except Exception as e:
-            print(f"Error guardando datos: {e}")
+            print(f"Error guardando {collection}{f' ({key})' if key else ''}: {e}")
+            return False
+
+    def pending_changes(self) -> int:
+        """Cantidad de cambios pendientes de escribir (incluye los que esperan en el hilo de escritura)"""
+        pending = len(self._pending_full) + sum(len(keys) for keys in self._pending_keys.values())
+        if self.writer is not None:
+            pending += self.writer.pending()
+        return pending
+
+    def flush_due(self) -> bool:
+        """Verificar si corresponde escribir los cambios pendientes (intervalo, tamaño o antigüedad)"""
+        if self._pending_since is None or self._batch_depth > 0:
+            return False
+
+        now = time.monotonic()
+        if self.pending_changes() >= self.max_pending_changes:
+            return True
+        if now - self._pending_since >= self.max_pending_age:
+            return True
+        return now - self._last_flush >= self.save_interval
+
+    def flush(self, wait: bool = False) -> int:
+        """Escribir todos los cambios pendientes y devolver cuántos se escribieron.
+
+        Con el hilo de escritura activo los cambios se encolan; wait=True espera a que
+        lleguen al almacenamiento (para operaciones críticas y el cierre).
+        """
+        # Dentro de un batch no se escribe nada: se escribe todo junto al cerrarlo
+        if self._batch_depth > 0:
+            return 0
 
-    def start_tracking(self, user_id: int, user_name: str) -> bool:
-        """Iniciar seguimiento de tiempo para un usuario"""
+        if self.writer is not None:
+            # Reintentar en esta pasada lo que el hilo de escritura no pudo guardar
+            for collection, key in self.writer.take_failed():
+                self._mark_pending(collection, key)
+
+        pending_full = self._pending_full
+        pending_keys = self._pending_keys
+        self._pending_full = set()
+        self._pending_keys = {collection: set() for collection in pending_keys}
+        self._pending_since = None
+        self._last_flush = time.monotonic()
+
+        written = 0
+        for collection in pending_full:
+            if self._write(collection):
+                written += 1
+            else:
+                self._mark_pending(collection)
+        for collection, keys in pending_keys.items():
+            if len(keys) > 1 and not self.storage.writes_single_keys(collection):
+                # Cada clave reescribiría la colección completa: escribirla una sola vez
+                if self._write(collection):
+                    written += 1
+                else:
+                    self._mark_pending(collection)
+                continue
+            for key in keys:
+                if self._write(collection, key):
+                    written += 1
+                else:
+                    self._mark_pending(collection, key)
+
+        if wait and self.writer is not None:
+            self.writer.wait_idle()
+            for collection, key in self.writer.take_failed():
+                self._mark_pending(collection, key)
+        return written
+
+    @contextmanager
+    def batch(self):
+        """Agrupar varias operaciones en una transacción.
+
+        Dentro del bloque los cambios no se escriben; al salir se persisten una sola vez
+        (o quedan pendientes para el write-behind). Si ocurre una excepción se restauran
+        los datos en memoria al estado anterior al batch más externo: cada método del
+        tracker copia un registro la primera vez que lo modifica (_touch), así el costo
+        depende de lo que el batch toca y no del tamaño de los datos. Los registros
+        modificados desde fuera (get_user_data + save_user_data) no se revierten.
+        """
+        snapshot = None
+        if self._batch_depth == 0:
+            self._undo = {}
+            snapshot = (
+                self._undo,
+                set(self._pending_full),
+                {collection: set(keys) for collection, keys in self._pending_keys.items()},
+                self._pending_since
+            )
+
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if snapshot is not None:
+                self._undo = None
+                self._restore_snapshot(snapshot)
+            raise
+        else:
+            self._batch_depth -= 1
+            if snapshot is not None:
+                self._undo = None
+            if self._batch_depth == 0 and self.save_interval <= 0:
+                self.flush()
+
+    def _restore_snapshot(self, snapshot: Tuple) -> None:
+        """Revertir los datos en memoria y los cambios pendientes con el registro de deshacer"""
+        undo, pending_full, pending_keys, pending_since = snapshot
+        # Restaurar sobre los mismos diccionarios para no invalidar referencias existentes.
+        # Primero las colecciones completas: las claves copiadas antes que ellas son más viejas
+        for (collection, key), previous in undo.items():
+            if key is None:
+                data = self._collection(collection)
+                data.clear()
+                data.update(previous)
+        for (collection, key), previous in undo.items():
+            if key is None:
+                continue
+            data = self._collection(collection)
+            if previous is _MISSING:
+                data.pop(key, None)
+            else:
+                data[key] = previous
+        self._pending_full = pending_full
+        self._pending_keys = pending_keys
+        self._pending_since = pending_since
+        self._rebuild_indexes()
+        self.generation += 1
+        self._notify_user_changed(None)
+
+    def close(self) -> None:
+        """Escribir los cambios pendientes y cerrar el almacenamiento"""
+        self.flush(wait=True)
+        if self.writer is not None:
+            self.writer.stop()
+        self.storage.close()
+
+    def start_tracking(self, user_id: int, user_name: str, now: Optional[float] = None) -> bool:
+        """Iniciar seguimiento de tiempo para un usuario (en `now`, por defecto la hora actual)"""
         user_id_str = str(user_id)
-        current_time = datetime.now().isoformat()
 
+        self._touch('users', user_id_str)
         if user_id_str not in self.data:
-            self.data[user_id_str] = {
-                'name': user_name,
-                'total_time': 0,
-                'sessions': [],
-                'is_active': False,
-                'is_paused': False,
-                'pause_count': 0,
-                'notified_milestones': [],
-                'milestone_completed': False
-            }
+            self.data[user_id_str] = UserRecord(user_name)
 
         user_data = self.data[user_id_str]
 
         # Si ya está activo, no hacer nada
-        if user_data.get('is_active', False):
+        if user_data.is_active:
             return False
 
         # Si está pausado, no permitir iniciar nuevo tracking
-        if user_data.get('is_paused', False):
+        if user_data.is_paused:
             return False
 
         # Iniciar nueva sesión
-        user_data['is_active'] = True
-        user_data['is_paused'] = False
-        user_data['last_start'] = current_time
-        user_data['name'] = user_name  # Actualizar nombre
+        user_data.is_active = True
+        user_data.is_paused = False
+        user_data.last_start = time.time() if now is None else now
+        user_data.name = user_name  # Actualizar nombre
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def stop_tracking(self, user_id: int) -> bool:
@@ -75,35 +388,27 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
 
-        if not user_data.get('is_active', False):
+        if not user_data.is_active:
             return False
 
-        # Calcular tiempo de sesión
-        if user_data.get('last_start'):
-            session_start = datetime.fromisoformat(user_data['last_start'])
-            session_time = (datetime.now() - session_start).total_seconds()
-            
-            # Añadir tiempo de sesión al total
-            user_data['total_time'] = user_data.get('total_time', 0) + session_time
+        # Calcular tiempo de sesión y añadirlo al total
+        now = time.time()
+        session_time = 0
+        if user_data.last_start is not None:
+            session_time = now - user_data.last_start
+            user_data.total_time += session_time
 
         # Marcar como inactivo
-        user_data['is_active'] = False
-        user_data['is_paused'] = False
+        user_data.is_active = False
+        user_data.is_paused = False
 
         # Agregar sesión al historial
-        if 'sessions' not in user_data:
-            user_data['sessions'] = []
-
-        session_record = {
-            'start': user_data.get('last_start'),
-            'end': datetime.now().isoformat(),
-            'duration': session_time if user_data.get('last_start') else 0
-        }
-        user_data['sessions'].append(session_record)
+        user_data.sessions.append(Session(user_data.last_start, now, session_time))
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def pause_tracking(self, user_id: int) -> bool:
@@ -113,24 +418,24 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
 
-        if not user_data.get('is_active', False):
+        if not user_data.is_active:
             return False
 
         # Calcular tiempo de sesión actual y añadirlo al total
-        if user_data.get('last_start'):
-            session_start = datetime.fromisoformat(user_data['last_start'])
-            session_time = (datetime.now() - session_start).total_seconds()
-            user_data['total_time'] = user_data.get('total_time', 0) + session_time
+        now = time.time()
+        if user_data.last_start is not None:
+            user_data.total_time += now - user_data.last_start
 
         # Marcar como pausado
-        user_data['is_active'] = False
-        user_data['is_paused'] = True
-        user_data['pause_start'] = datetime.now().isoformat()
-        user_data['pause_count'] = user_data.get('pause_count', 0) + 1
+        user_data.is_active = False
+        user_data.is_paused = True
+        user_data.pause_start = now
+        user_data.pause_count += 1
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def resume_tracking(self, user_id: int) -> bool:
@@ -140,49 +445,65 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
 
-        if not user_data.get('is_paused', False):
+        if not user_data.is_paused:
             return False
 
         # Reanudar seguimiento
-        user_data['is_active'] = True
-        user_data['is_paused'] = False
-        user_data['last_start'] = datetime.now().isoformat()
+        user_data.is_active = True
+        user_data.is_paused = False
+        user_data.last_start = time.time()
+        user_data.pause_start = None
 
-        # Limpiar pause_start
-        if 'pause_start' in user_data:
-            del user_data['pause_start']
-
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
-    def get_total_time(self, user_id: int) -> float:
-        """Obtener tiempo total acumulado de un usuario"""
-        user_id_str = str(user_id)
+    def get_total_time(self, user_id: int, now: Optional[float] = None) -> float:
+        """Obtener tiempo total acumulado de un usuario.
 
-        if user_id_str not in self.data:
+        `now` (segundos epoch) permite calcular varios totales con el mismo instante.
+        """
+        user_data = self.data.get(str(user_id))
+        if user_data is None:
             return 0.0
 
-        user_data = self.data[user_id_str]
-        total_time = user_data.get('total_time', 0)
+        total_time = user_data.total_time
 
-        # Si está activo, añadir tiempo de sesión actual
-        if user_data.get('is_active', False) and user_data.get('last_start'):
-            session_start = datetime.fromisoformat(user_data['last_start'])
-            current_session_time = (datetime.now() - session_start).total_seconds()
-            total_time += current_session_time
+        # Si está activo, añadir tiempo de sesión actual (last_start ya es epoch, no hay que parsear)
+        if user_data.is_active and user_data.last_start is not None:
+            total_time += (time.time() if now is None else now) - user_data.last_start
 
         return total_time
 
-    def get_user_data(self, user_id: int) -> Optional[Dict[str, Any]]:
+    def get_total_times(self, user_ids: Iterable[Any], now: Optional[float] = None) -> Dict[str, float]:
+        """Obtener el tiempo total de varios usuarios calculado con un único `now`"""
+        if now is None:
+            now = time.time()
+        return {str(user_id): self.get_total_time(user_id, now) for user_id in user_ids}
+
+    def get_user_data(self, user_id: int) -> Optional[UserRecord]:
         """Obtener datos completos de un usuario"""
         user_id_str = str(user_id)
         return self.data.get(user_id_str)
 
-    def get_all_tracked_users(self) -> Dict[str, Any]:
-        """Obtener todos los usuarios con seguimiento"""
-        return self.data.copy()
+    def get_all_tracked_users(self) -> Mapping[str, UserRecord]:
+        """Obtener todos los usuarios con seguimiento (vista de solo lectura, sin copiar)"""
+        return self.users
+
+    def iter_users(self) -> Iterator[Tuple[str, UserRecord]]:
+        """Recorrer todos los usuarios sin copiar.
+
+        No modificar usuarios ni hacer await mientras se recorre; si hace falta, tomar
+        primero la porción necesaria (por ejemplo con itertools.islice).
+        """
+        return iter(self.data.items())
+
+    def iter_active(self) -> Iterator[Tuple[str, UserRecord]]:
+        """Recorrer solo los usuarios con tiempo activo (usa el índice de activos)"""
+        for user_id_str in self._active_ids:
+            yield user_id_str, self.data[user_id_str]
 
     def reset_user_time(self, user_id: int) -> bool:
         """Reiniciar tiempo de un usuario a cero"""
@@ -191,31 +512,31 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
-        user_data['total_time'] = 0
-        user_data['is_active'] = False
-        user_data['is_paused'] = False
-        user_data['pause_count'] = 0
-        user_data['sessions'] = []
-        user_data['notified_milestones'] = []
-        user_data['milestone_completed'] = False
+        user_data.total_time = 0
+        user_data.is_active = False
+        user_data.is_paused = False
+        user_data.pause_count = 0
+        user_data.sessions = []
+        user_data.highest_notified_hour = 0
+        user_data.milestone_completed = False
 
         # Limpiar campos de seguimiento
-        if 'last_start' in user_data:
-            del user_data['last_start']
-        if 'pause_start' in user_data:
-            del user_data['pause_start']
+        user_data.last_start = None
+        user_data.pause_start = None
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def reset_all_user_times(self) -> int:
         """Reiniciar todos los tiempos de usuarios"""
         count = 0
-        for user_id_str in list(self.data.keys()):
-            user_id = int(user_id_str)
-            if self.reset_user_time(user_id):
-                count += 1
+        with self.batch():
+            for user_id_str in list(self.data.keys()):
+                user_id = int(user_id_str)
+                if self.reset_user_time(user_id):
+                    count += 1
         return count
 
     def cancel_user_tracking(self, user_id: int) -> bool:
@@ -226,15 +547,19 @@ class TimeTracker:
             return False
 
         # Eliminar completamente al usuario
+        self._touch('users', user_id_str)
         del self.data[user_id_str]
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def clear_all_data(self) -> bool:
         """Limpiar completamente todos los datos"""
         try:
-            self.data = {}
+            self._touch('users')
+            self.data.clear()
             self.save_data()
+            # Operación crítica: escribir de inmediato aunque esté activo el write-behind
+            self.flush(wait=True)
             return True
         except Exception as e:
             print(f"Error limpiando datos: {e}")
@@ -248,11 +573,12 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
-        user_data['total_time'] = user_data.get('total_time', 0) + (minutes * 60)
-        user_data['name'] = user_name  # Actualizar nombre
+        user_data.total_time += minutes * 60
+        user_data.name = user_name  # Actualizar nombre
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def subtract_minutes(self, user_id: int, minutes: int) -> bool:
@@ -262,12 +588,11 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
 
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
-        current_time = user_data.get('total_time', 0)
-        new_time = max(0, current_time - (minutes * 60))
-        user_data['total_time'] = new_time
+        user_data.total_time = max(0, user_data.total_time - (minutes * 60))
 
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def get_pause_count(self, user_id: int) -> int:
@@ -275,7 +600,7 @@ class TimeTracker:
         user_id_str = str(user_id)
         if user_id_str not in self.data:
             return 0
-        return self.data[user_id_str].get('pause_count', 0)
+        return self.data[user_id_str].pause_count
 
     def get_paused_duration(self, user_id: int) -> float:
         """Obtener duración pausada actual de un usuario"""
@@ -286,11 +611,10 @@ class TimeTracker:
 
         user_data = self.data[user_id_str]
 
-        if not user_data.get('is_paused', False) or not user_data.get('pause_start'):
+        if not user_data.is_paused or user_data.pause_start is None:
             return 0.0
 
-        pause_start = datetime.fromisoformat(user_data['pause_start'])
-        return (datetime.now() - pause_start).total_seconds()
+        return time.time() - user_data.pause_start
 
     def format_time_human(self, seconds: float) -> str:
         """Formatear tiempo en formato humano legible"""
@@ -312,23 +636,99 @@ class TimeTracker:
         return ", ".join(parts)
 
     def load_attendance_data(self) -> Dict[str, Any]:
-        """Cargar datos de asistencias desde archivo JSON"""
+        """Cargar datos de asistencias desde el almacenamiento"""
         try:
-            if os.path.exists(self.attendance_file):
-                with open(self.attendance_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
+            return self.storage.load_attendance()
         except Exception as e:
             print(f"Error cargando datos de asistencias: {e}")
             return {}
 
     def save_attendance_data(self) -> None:
-        """Guardar datos de asistencias al archivo JSON"""
-        try:
-            with open(self.attendance_file, 'w', encoding='utf-8') as f:
-                json.dump(self.attendance_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error guardando datos de asistencias: {e}")
+        """Guardar todos los datos de asistencias"""
+        self._persist('attendance')
+
+    # Cada admin guarda los contadores de su semana ISO actual ('week', 'weekly_attendance',
+    # 'daily_attendance' solo con los días de esa semana) y un historial compacto de
+    # semanas cerradas ('weekly_history': semana -> asistencias). Leer es O(1); al cambiar
+    # de semana los contadores se archivan (rollover_attendance_week o al modificar).
+
+    def _attendance_now(self) -> datetime:
+        return datetime.now(self.timezone) if self.timezone is not None else datetime.now()
+
+    @staticmethod
+    def _week_key(day) -> str:
+        """Semana ISO de una fecha, por ejemplo '2025-W27'"""
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def _migrate_attendance(self) -> None:
+        """Convertir asistencias del formato anterior (solo daily_attendance) a contadores por semana"""
+        now = self._attendance_now()
+        current_week = self._week_key(now)
+        for admin_data in self.attendance_data.values():
+            if 'week' in admin_data:
+                continue
+            history: Dict[str, int] = {}
+            current_days = {}
+            for date_str, count in admin_data.get('daily_attendance', {}).items():
+                day = datetime.strptime(date_str, "%Y-%m-%d")
+                week = self._week_key(day)
+                if week == current_week:
+                    current_days[date_str] = count
+                # Igual que antes, la semana solo cuenta de lunes a viernes
+                if day.weekday() < 5:
+                    history[week] = history.get(week, 0) + count
+            admin_data['manual_weekly_attendance'] = admin_data.get('manual_weekly_attendance', 0)
+            admin_data['week'] = current_week
+            admin_data['weekly_attendance'] = history.pop(current_week, 0) + admin_data['manual_weekly_attendance']
+            admin_data['weekly_history'] = history
+            admin_data['daily_attendance'] = current_days
+
+    def _roll_admin_week(self, admin_data: Dict[str, Any], week: str) -> bool:
+        """Archivar la semana cerrada de un admin y empezar `week` en cero"""
+        if admin_data['week'] == week:
+            return False
+        if admin_data['weekly_attendance']:
+            admin_data['weekly_history'][admin_data['week']] = admin_data['weekly_attendance']
+        admin_data['week'] = week
+        admin_data['weekly_attendance'] = 0
+        admin_data['manual_weekly_attendance'] = 0
+        admin_data['daily_attendance'] = {}
+        return True
+
+    def _admin_attendance_for_update(self, admin_id_str: str, admin_name: str, now: datetime) -> Dict[str, Any]:
+        """Datos de asistencias del admin para modificar, creados si no existen y con la semana al día"""
+        week = self._week_key(now)
+        self._touch('attendance', admin_id_str)
+        admin_data = self.attendance_data.get(admin_id_str)
+        if admin_data is None:
+            admin_data = self.attendance_data[admin_id_str] = {
+                'name': admin_name,
+                'daily_attendance': {},
+                'total_attendance': 0,
+                'manual_weekly_attendance': 0,
+                'week': week,
+                'weekly_attendance': 0,
+                'weekly_history': {}
+            }
+        else:
+            self._roll_admin_week(admin_data, week)
+        admin_data['name'] = admin_name  # Actualizar nombre
+        return admin_data
+
+    def rollover_attendance_week(self) -> int:
+        """Archivar la semana anterior de todos los admins; devuelve cuántos cambiaron"""
+        week = self._week_key(self._attendance_now())
+        rolled = 0
+        with self.batch():
+            for admin_id_str, admin_data in self.attendance_data.items():
+                if admin_data['week'] == week:
+                    continue
+                self._touch('attendance', admin_id_str)
+                if self._roll_admin_week(admin_data, week):
+                    self._save_admin_attendance(admin_id_str)
+                    rolled += 1
+        return rolled
 
     def add_manual_attendance(self, admin_id: int, admin_name: str, quantity: int) -> bool:
         """Agregar asistencias manualmente (para comando /sumar_asistencias) - hasta 15 asistencias sin límites"""
@@ -338,146 +738,107 @@ class TimeTracker:
         if quantity < 1 or quantity > 15:
             return False
         
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0,
-                'manual_weekly_attendance': 0  # Nuevo campo para asistencias manuales semanales
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
-        
-        # Inicializar campo manual semanal si no existe
-        if 'manual_weekly_attendance' not in admin_data:
-            admin_data['manual_weekly_attendance'] = 0
+        admin_data = self._admin_attendance_for_update(admin_id_str, admin_name, self._attendance_now())
         
-        # Solo agregar al total y al contador semanal manual (NO al diario)
+        # Solo agregar al total y a la semana (NO al diario)
         admin_data['manual_weekly_attendance'] += quantity
+        admin_data['weekly_attendance'] += quantity
         admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + quantity
-        self.save_attendance_data()
+        self._save_admin_attendance(admin_id_str)
         return True
 
     def add_daily_manual_attendance(self, admin_id: int, admin_name: str, quantity: int) -> bool:
         """Agregar asistencias diarias manualmente (para comando /agregar_asistencias_diarias) - máximo 3 por día"""
         admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
+        now = self._attendance_now()
+        today = now.strftime("%Y-%m-%d")
         
         # Verificar que la cantidad esté entre 1 y 3
         if quantity < 1 or quantity > 3:
             return False
         
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0,
-                'manual_weekly_attendance': 0
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
-        
-        # Inicializar día si no existe
-        if today not in admin_data['daily_attendance']:
-            admin_data['daily_attendance'][today] = 0
+        admin_data = self._admin_attendance_for_update(admin_id_str, admin_name, now)
+        daily = admin_data['daily_attendance']
         
         # Verificar que no exceda 3 asistencias diarias
-        if admin_data['daily_attendance'][today] + quantity > 3:
+        if daily.get(today, 0) + quantity > 3:
             return False
         
-        # SOLO agregar a diarias y totales
-        # NO agregar a manual_weekly_attendance porque get_weekly_attendance ya cuenta las diarias
-        admin_data['daily_attendance'][today] += quantity
+        # Agregar a diarias y totales; la semana solo cuenta de lunes a viernes
+        daily[today] = daily.get(today, 0) + quantity
+        if now.weekday() < 5:
+            admin_data['weekly_attendance'] += quantity
         admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + quantity
         
-        # Inicializar campo manual semanal si no existe (pero no sumar aquí)
-        if 'manual_weekly_attendance' not in admin_data:
-            admin_data['manual_weekly_attendance'] = 0
-        
-        self.save_attendance_data()
+        self._save_admin_attendance(admin_id_str)
         return True
 
     def add_attendance(self, admin_id: int, admin_name: str, attendances_to_add: int = 1) -> bool:
         """Agregar asistencia para un administrador (por defecto 1 asistencia)"""
         admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
+        now = self._attendance_now()
+        today = now.strftime("%Y-%m-%d")
         
-        # Inicializar día si no existe
-        if today not in admin_data['daily_attendance']:
-            admin_data['daily_attendance'][today] = 0
+        admin_data = self._admin_attendance_for_update(admin_id_str, admin_name, now)
+        daily = admin_data['daily_attendance']
+        daily_count = daily.get(today, 0)
         
         # Verificar límite diario (máximo 3 por día)
-        if admin_data['daily_attendance'][today] >= 3:
+        if daily_count >= 3:
             return False
         
         # Verificar límite semanal (máximo 15 por semana)
-        weekly_count = self.get_weekly_attendance(admin_id)
+        weekly_count = admin_data['weekly_attendance']
         if weekly_count >= 15:
             return False
         
         # Verificar que no exceda el límite diario
-        if admin_data['daily_attendance'][today] + attendances_to_add > 3:
-            attendances_to_add = 3 - admin_data['daily_attendance'][today]
+        if daily_count + attendances_to_add > 3:
+            attendances_to_add = 3 - daily_count
         
         # Verificar que no exceda el límite semanal
         if weekly_count + attendances_to_add > 15:
             attendances_to_add = 15 - weekly_count
         
         if attendances_to_add > 0:
-            admin_data['daily_attendance'][today] += attendances_to_add
+            daily[today] = daily_count + attendances_to_add
+            if now.weekday() < 5:
+                admin_data['weekly_attendance'] += attendances_to_add
             admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + attendances_to_add
-            self.save_attendance_data()
+            self._save_admin_attendance(admin_id_str)
             return True
         
         return False
 
     def get_daily_attendance(self, admin_id: int) -> int:
         """Obtener asistencias del día actual"""
-        admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        if admin_id_str not in self.attendance_data:
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
             return 0
         
-        return self.attendance_data[admin_id_str]['daily_attendance'].get(today, 0)
+        today = self._attendance_now().strftime("%Y-%m-%d")
+        return admin_data['daily_attendance'].get(today, 0)
 
     def get_weekly_attendance(self, admin_id: int) -> int:
-        """Obtener asistencias de la semana actual"""
-        admin_id_str = str(admin_id)
-        
-        if admin_id_str not in self.attendance_data:
+        """Obtener asistencias de la semana actual (lunes a viernes más las manuales)"""
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
             return 0
         
-        admin_data = self.attendance_data[admin_id_str]
-        
-        # Calcular fechas de la semana actual (lunes a viernes)
-        today = datetime.now()
-        start_of_week = today - timedelta(days=today.weekday())
-        
-        weekly_count = 0
-        for i in range(5):  # Solo 5 días: lunes a viernes
-            date = (start_of_week + timedelta(days=i)).strftime("%Y-%m-%d")
-            weekly_count += admin_data['daily_attendance'].get(date, 0)
-        
-        # Agregar asistencias manuales semanales
-        weekly_count += admin_data.get('manual_weekly_attendance', 0)
-        
-        return weekly_count
+        # Si la semana guardada ya cerró, esta semana todavía no tiene asistencias
+        if admin_data['week'] != self._week_key(self._attendance_now()):
+            return 0
+        return admin_data['weekly_attendance']
+
+    def get_weekly_history(self, admin_id: int) -> Dict[str, int]:
+        """Asistencias de las semanas cerradas (semana ISO -> cantidad)"""
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
+            return {}
+        history = dict(admin_data['weekly_history'])
+        if admin_data['week'] != self._week_key(self._attendance_now()) and admin_data['weekly_attendance']:
+            history[admin_data['week']] = admin_data['weekly_attendance']
+        return history
 
     def get_total_attendance(self, admin_id: int) -> int:
         """Obtener total de asistencias"""
@@ -500,32 +861,24 @@ class TimeTracker:
         """Registrar quién inició el tiempo para un usuario"""
         user_id_str = str(user_id)
         if user_id_str in self.data:
-            self.data[user_id_str]['time_initiator'] = {
-                'admin_id': admin_id,
-                'admin_name': admin_name,
-                'timestamp': datetime.now().isoformat()
-            }
-            self.save_data()
+            self._touch('users', user_id_str)
+            self.data[user_id_str].time_initiator = Initiator(admin_id, admin_name, time.time())
+            self._save_user(user_id_str)
 
-    def get_time_initiator(self, user_id: int) -> Optional[Dict[str, Any]]:
+    def get_time_initiator(self, user_id: int) -> Optional[Initiator]:
         """Obtener información de quién inició el tiempo para un usuario"""
         user_id_str = str(user_id)
         if user_id_str in self.data:
-            return self.data[user_id_str].get('time_initiator')
+            return self.data[user_id_str].time_initiator
         return None
 
     def clear_time_initiator(self, user_id: int) -> None:
         """Limpiar información del iniciador del tiempo"""
         user_id_str = str(user_id)
-        if user_id_str in self.data and 'time_initiator' in self.data[user_id_str]:
-            del self.data[user_id_str]['time_initiator']
-            self.save_data()
-
-    def reset_weekly_manual_attendances(self) -> None:
-        """Resetear solo las asistencias manuales semanales (para nueva semana)"""
-        for admin_id_str in self.attendance_data:
-            self.attendance_data[admin_id_str]['manual_weekly_attendance'] = 0
-        self.save_attendance_data()
+        if user_id_str in self.data and self.data[user_id_str].time_initiator is not None:
+            self._touch('users', user_id_str)
+            self.data[user_id_str].time_initiator = None
+            self._save_user(user_id_str)
 
     def link_time_to_user(self, user_id: int, admin_id: int, admin_name: str) -> bool:
         """Ligar el tiempo de un usuario a otro (para que reciba asistencias)"""
@@ -534,20 +887,17 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
         
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
         
         # Verificar que el usuario tenga tiempo activo
-        if not user_data.get('is_active', False):
+        if not user_data.is_active:
             return False
         
         # Establecer el ligado
-        user_data['linked_to'] = {
-            'admin_id': admin_id,
-            'admin_name': admin_name,
-            'linked_at': datetime.now().isoformat()
-        }
+        user_data.linked_to = Link(admin_id, admin_name, time.time())
         
-        self.save_data()
+        self._save_user(user_id_str)
         return True
 
     def unlink_time(self, user_id: int) -> bool:
@@ -557,11 +907,12 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
         
+        self._touch('users', user_id_str)
         user_data = self.data[user_id_str]
         
-        if 'linked_to' in user_data:
-            del user_data['linked_to']
-            self.save_data()
+        if user_data.linked_to is not None:
+            user_data.linked_to = None
+            self._save_user(user_id_str)
             return True
         
         return False
@@ -573,16 +924,16 @@ class TimeTracker:
         if user_id_str not in self.data:
             return False
         
-        return 'linked_to' in self.data[user_id_str]
+        return self.data[user_id_str].linked_to is not None
 
-    def get_linked_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+    def get_linked_user(self, user_id: int) -> Optional[Link]:
         """Obtener información del usuario al que está ligado el tiempo"""
         user_id_str = str(user_id)
         
         if user_id_str not in self.data:
             return None
         
-        return self.data[user_id_str].get('linked_to')
+        return self.data[user_id_str].linked_to
 
     def can_receive_daily_attendance(self, user_id: int) -> bool:
         """Verificar si un usuario puede recibir asistencias diarias (siempre True ahora que no hay transferencias)"""
@@ -591,34 +942,31 @@ class TimeTracker:
     def reset_all_attendances(self) -> bool:
         """Resetear completamente todas las asistencias de todos los usuarios"""
         try:
-            self.attendance_data = {}
+            self._touch('attendance')
+            self.attendance_data.clear()
             self.save_attendance_data()
+            # Operación crítica: escribir de inmediato aunque esté activo el write-behind
+            self.flush(wait=True)
             return True
         except Exception as e:
             print(f"Error reseteando asistencias: {e}")
             return False
 
     def load_preregistration_data(self) -> Dict[str, Any]:
-        """Cargar datos de pre-registros desde archivo JSON"""
+        """Cargar datos de pre-registros desde el almacenamiento"""
         try:
-            if os.path.exists(self.preregistration_file):
-                with open(self.preregistration_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
+            return self.storage.load_preregistrations()
         except Exception as e:
             print(f"Error cargando datos de pre-registros: {e}")
             return {}
 
     def save_preregistration_data(self) -> None:
-        """Guardar datos de pre-registros al archivo JSON"""
-        try:
-            with open(self.preregistration_file, 'w', encoding='utf-8') as f:
-                json.dump(self.preregistration_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error guardando datos de pre-registros: {e}")
+        """Guardar todos los datos de pre-registros"""
+        self._persist('preregistrations')
 
-    def preregister_user(self, user_id: int, user_name: str, admin_id: int, admin_name: str) -> bool:
-        """Pre-registrar un usuario para inicio automático a las 5 PM"""
+    def preregister_user(self, user_id: int, user_name: str, admin_id: int, admin_name: str,
+                         activate_at: Optional[datetime] = None) -> bool:
+        """Pre-registrar un usuario para inicio automático en `activate_at` (inicio de la próxima ventana)"""
         user_id_str = str(user_id)
         
         # Verificar si ya está pre-registrado
@@ -628,25 +976,28 @@ class TimeTracker:
         # Verificar si ya tiene tiempo activo o pausado
         if user_id_str in self.data:
             user_data = self.data[user_id_str]
-            if user_data.get('is_active', False) or user_data.get('is_paused', False):
+            if user_data.is_active or user_data.is_paused:
                 return False
         
         # Crear pre-registro
+        self._touch('preregistrations', user_id_str)
         self.preregistration_data[user_id_str] = {
             'name': user_name,
             'registered_by_id': admin_id,
             'registered_by_name': admin_name,
             'registered_at': datetime.now().isoformat()
         }
+        if activate_at is not None:
+            self.preregistration_data[user_id_str]['activate_at'] = activate_at.isoformat()
         
-        self.save_preregistration_data()
+        self._save_preregistration(user_id_str)
         return True
 
     def get_preregistered_users(self) -> Dict[str, Any]:
         """Obtener todos los usuarios pre-registrados"""
         return self.preregistration_data.copy()
 
-    def activate_preregistration(self, user_id: int) -> bool:
+    def activate_preregistration(self, user_id: int, now: Optional[float] = None) -> bool:
         """Activar un pre-registro (convertirlo en tiempo activo)"""
         user_id_str = str(user_id)
         
@@ -660,27 +1011,46 @@ class TimeTracker:
         admin_name = prereg_data['registered_by_name']
         
         # Iniciar el tracking normal
-        success = self.start_tracking(user_id, user_name)
+        success = self.start_tracking(user_id, user_name, now)
         if success:
             # Establecer información del iniciador
             self.set_time_initiator(user_id, admin_id, admin_name)
             
             # Remover del pre-registro
+            self._touch('preregistrations', user_id_str)
             del self.preregistration_data[user_id_str]
-            self.save_preregistration_data()
+            self._save_preregistration(user_id_str)
             
             return True
         
         return False
 
+    def activate_preregistrations(self, user_ids: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Activar varios pre-registros con un solo guardado y el mismo instante de inicio.
+
+        Devuelve los IDs activados; los que no se pudieron activar siguen pre-registrados.
+        """
+        now = time.time() if now is None else now
+        activated = []
+        with self.batch():
+            for user_id_str in user_ids:
+                try:
+                    if self.activate_preregistration(int(user_id_str), now):
+                        activated.append(user_id_str)
+                except (KeyError, ValueError) as e:
+                    print(f"Error activando pre-registro {user_id_str}: {e}")
+        return activated
+
     def clean_expired_preregistrations(self) -> int:
         """Limpiar pre-registros expirados (después de las 5 PM)"""
         cleaned_count = 0
         try:
-            # Limpiar todos los pre-registros
+            # Limpiar todos los pre-registros; sin pre-registros no hay nada que guardar
             cleaned_count = len(self.preregistration_data)
-            self.preregistration_data = {}
-            self.save_preregistration_data()
+            if cleaned_count:
+                self._touch('preregistrations')
+                self.preregistration_data.clear()
+                self.save_preregistration_data()
         except Exception as e:
             print(f"Error limpiando pre-registros expirados: {e}")
         
@@ -690,31 +1060,39 @@ class TimeTracker:
         """Remover un pre-registro específico"""
         user_id_str = str(user_id)
         if user_id_str in self.preregistration_data:
+            self._touch('preregistrations', user_id_str)
             del self.preregistration_data[user_id_str]
-            self.save_preregistration_data()
+            self._save_preregistration(user_id_str)
             return True
         return False
 
+    def remove_preregistrations(self, user_ids: Iterable[str]) -> int:
+        """Remover varios pre-registros con un solo guardado"""
+        removed = 0
+        with self.batch():
+            for user_id_str in user_ids:
+                if self.remove_preregistration(int(user_id_str)):
+                    removed += 1
+        return removed
+
     def get_users_initiated_by_admin(self, admin_id: int) -> list:
         """Obtener lista de usuarios que fueron iniciados por un admin específico"""
         initiated_users = []
-        
-        for user_id_str, user_data in self.data.items():
-            # Verificar si el admin inició este tiempo
-            initiator_info = user_data.get('time_initiator')
-            if initiator_info and initiator_info.get('admin_id') == admin_id:
-                user_id = int(user_id_str)
-                total_time = self.get_total_time(user_id)
-                
-                initiated_users.append({
-                    'user_id': user_id,
-                    'name': user_data.get('name', f'Usuario {user_id}'),
-                    'total_time': total_time,
-                    'is_active': user_data.get('is_active', False),
-                    'is_paused': user_data.get('is_paused', False),
-                    'milestone_completed': user_data.get('milestone_completed', False),
-                    'initiated_at': initiator_info.get('timestamp', '')
-                })
+
+        # El índice de iniciadores da directamente los usuarios de este admin
+        now = time.time()
+        for user_id_str in self.get_user_ids_initiated_by(admin_id):
+            user_data = self.data[user_id_str]
+            user_id = int(user_id_str)
+            initiated_users.append({
+                'user_id': user_id,
+                'name': user_data.name or f'Usuario {user_id}',
+                'total_time': self.get_total_time(user_id, now),
+                'is_active': user_data.is_active,
+                'is_paused': user_data.is_paused,
+                'milestone_completed': user_data.milestone_completed,
+                'initiated_at': epoch_to_iso(user_data.time_initiator.timestamp) or ''
+            })
         
         # Ordenar por nombre
         initiated_users.sort(key=lambda x: x['name'].lower())
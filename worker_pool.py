@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Iterable, Optional
+
+
+class CycleReport:
+    """Resultado de procesar un ciclo completo de elementos"""
+    __slots__ = ('name', 'eligible', 'processed', 'failed', 'timed_out', 'duration', 'concurrency')
+
+    def __init__(self, name: str, eligible: int):
+        self.name = name
+        self.eligible = eligible
+        self.processed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.duration = 0.0
+        self.concurrency = 0
+
+    @property
+    def coverage(self) -> float:
+        """Fracción de los elementos elegibles que se procesaron sin error"""
+        return self.processed / self.eligible if self.eligible else 1.0
+
+    def __str__(self) -> str:
+        text = (f"{self.name}: {self.processed}/{self.eligible} procesados "
+                f"({self.coverage:.0%}) en {self.duration:.1f}s, concurrencia {self.concurrency}")
+        if self.failed or self.timed_out:
+            text += f" - {self.failed} con error, {self.timed_out} con timeout"
+        return text
+
+
+class AdaptiveWorkerPool:
+    """Ejecuta corrutinas con concurrencia limitada: una tarea nueva solo empieza si hay
+    menos de `limit` en curso.
+
+    El límite se ajusta con cada tarea terminada según su duración (todo lo que la
+    tarea espera, incluidas las llamadas a Discord que haga): si supera
+    `target_latency` se reduce a la mitad, si no crece de a uno hasta
+    `max_concurrency` (AIMD). Reducir el límite no cancela nada: las tareas en curso
+    terminan y no empieza ninguna otra hasta que queden menos que el nuevo límite.
+    """
+
+    def __init__(self, min_concurrency: int = 2, max_concurrency: int = 20,
+                 target_latency: float = 2.0, task_timeout: float = 15.0):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.task_timeout = task_timeout
+        self.limit = min_concurrency
+        self.latency = 0.0
+        # Tareas en curso y las que esperan lugar, en orden de llegada
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _adjust(self, duration: float) -> None:
+        self.latency = duration if self.latency == 0.0 else 0.8 * self.latency + 0.2 * duration
+        if duration > self.target_latency:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+        elif self.limit < self.max_concurrency:
+            self.limit += 1
+
+    def _wake(self) -> None:
+        """Despertar a tantas tareas en espera como lugares libres haya"""
+        free = self.limit - self.active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def _acquire(self) -> None:
+        while self.active >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Si ya la habían despertado, el lugar pasa a la siguiente
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.active += 1
+
+    async def run(self, func: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Ejecutar una corrutina respetando el límite de concurrencia"""
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            return await asyncio.wait_for(func(), timeout or self.task_timeout)
+        finally:
+            self.active -= 1
+            self._adjust(time.monotonic() - start)
+            self._wake()
+
+    def submit(self, name: Any, func: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Ejecutar una corrutina en segundo plano dentro del pool"""
+        async def runner():
+            try:
+                await self.run(func)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Timeout procesando {name}")
+            except Exception as e:
+                print(f"⚠️ Error procesando {name}: {e}")
+
+        return asyncio.get_running_loop().create_task(runner())
+
+    async def run_cycle(self, name: str, items: Iterable[Any],
+                        func: Callable[[Any], Awaitable[Any]]) -> CycleReport:
+        """Procesar todos los elementos con concurrencia limitada y devolver el reporte del ciclo"""
+        items = list(items)
+        report = CycleReport(name, len(items))
+        start = time.monotonic()
+        pending = iter(items)
+
+        async def process(item):
+            try:
+                await self.run(lambda: func(item))
+                report.processed += 1
+            except asyncio.TimeoutError:
+                report.timed_out += 1
+            except Exception as e:
+                report.failed += 1
+                print(f"⚠️ Error en {name}: {e}")
+            report.concurrency = max(report.concurrency, self.limit)
+
+        async def worker():
+            # Cada worker toma el siguiente elemento libre; el límite decide cuántos corren a la vez
+            for item in pending:
+                await process(item)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_concurrency, len(items)))))
+        report.duration = time.monotonic() - start
+        return report